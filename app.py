@@ -3,19 +3,51 @@ import sys
 import socket
 import sqlite3
 import re
+import codecs
+import csv
+import difflib
+import hashlib
+import io
+import heapq
+import json
+import math
+import mmap
+import multiprocessing
+import pickle
+import random
+import signal
+import tempfile
+import time
+import zlib
 from datetime import datetime
+from html import escape
+from queue import Empty
 import logging
 import argparse
-
+import gzip
+import bz2
+import lzma
+import threading
+
+from array import array
+from collections import Counter
+from bisect import bisect_left, insort
+from itertools import accumulate, compress, repeat
 from functools import partial
-from typing import Dict, Optional, List
+from operator import and_, not_
+from typing import Callable, Dict, Iterable, Iterator, Optional, List, Tuple
 
 from PyQt6.QtGui import (
     QAction,
     QIcon,
+    QFontDatabase,
+    QPainter,
     QDragEnterEvent,
     QDropEvent,
     QKeySequence,
+    QTextCursor,
+    QTextCharFormat,
+    QTextDocument,
 )
 from PyQt6.QtWidgets import (
     QApplication,
@@ -34,52 +66,5518 @@ from PyQt6.QtWidgets import (
     QMainWindow,
     QDialog,
     QTextBrowser,
+    QListWidget,
+    QListWidgetItem,
+    QProgressDialog,
+    QDockWidget,
+    QSpinBox,
+    QComboBox,
+    QCheckBox,
+    QAbstractScrollArea,
+    QTableView,
+    QHeaderView,
+    QSplitter,
+    QTextEdit,
+    QCompleter,
+)
+from PyQt6.QtCore import (
+    Qt,
+    QStringListModel,
+    QAbstractTableModel,
+    QModelIndex,
+    QTimer,
+    QEvent,
+    QObject,
+    QRunnable,
+    QThreadPool,
+    QEventLoop,
+    pyqtSignal,
 )
-from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QActionGroup
 
 
-def setup_logging(enable_debug):
-    if enable_debug:
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format="%(asctime)s - %(levelname)s - %(message)s",
+RECENT_FILES_LIMIT = 5000
+RECENT_FILES_HALF_LIFE = 7 * 24 * 60 * 60
+QUICK_OPEN_LIMIT = 200
+FILE_METADATA_LIMIT = 5000
+UNDO_CAPTURE_WINDOW = 1024
+UNDO_STEP_OVERHEAD = 200
+UNDO_EDIT_KEYS = (
+    QKeySequence.StandardKey.Cut,
+    QKeySequence.StandardKey.Paste,
+    QKeySequence.StandardKey.Delete,
+    QKeySequence.StandardKey.Backspace,
+    QKeySequence.StandardKey.DeleteStartOfWord,
+    QKeySequence.StandardKey.DeleteEndOfWord,
+    QKeySequence.StandardKey.DeleteEndOfLine,
+    QKeySequence.StandardKey.DeleteCompleteLine,
+    QKeySequence.StandardKey.InsertParagraphSeparator,
+    QKeySequence.StandardKey.InsertLineSeparator,
+)
+LARGE_INSERT_THRESHOLD = 1024 * 1024
+LARGE_INSERT_CHUNK = 256 * 1024
+LARGE_INSERT_SLICE = 0.025
+STATISTICS_CHUNK = 16 * 1024 * 1024
+COMPRESSED_READ_CHUNK = 1024 * 1024
+COMPRESSED_PENDING_CHUNKS = 4
+COMPRESSION_MAGIC = (
+    (re.compile(b"\x1f\x8b"), "gzip"),
+    (re.compile(b"BZh[1-9]"), "bz2"),
+    (re.compile(b"\xfd7zXZ\x00"), "xz"),
+)
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+SAVE_ALL_THREADS = 4
+HISTORY_LINE_SEED = 0x9E3779B9
+HISTORY_LINE_MASK = 0x7F
+HISTORY_GROUP_MASK = 0x3F
+HISTORY_CHUNK_MIN = 2 * 1024
+HISTORY_CHUNK_MAX = 64 * 1024
+HISTORY_SCAN_BLOCK = 4 * 1024 * 1024
+HISTORY_DIGEST_SIZE = 16
+HISTORY_QUERY_BATCH = 500
+HISTORY_GC_INTERVAL = 50
+HISTORY_GC_DELAY = 10000
+HISTORY_DIFF_LIMIT = 4 * 1024 * 1024
+PIECE_ORIGINAL = 0
+PIECE_ADDED = 1
+PIECE_READ_CHUNK = 1024 * 1024
+PIECE_LINE_BLOCK = 64 * 1024
+PIECE_INDEX_SLAB = 16 * 1024 * 1024
+PIECE_UNDO_LIMIT = 10000
+LARGE_FILE_THRESHOLD = 128 * 1024 * 1024
+LARGE_FILE_LINE_LIMIT = 4096
+LARGE_FILE_SCAN = 1024 * 1024
+LARGE_FILE_TAB_WIDTH = 4
+LARGE_FILE_WHEEL_LINES = 3
+BINARY_SAMPLE_SIZE = 8192
+BINARY_CONTROL_RATIO = 0.3
+BINARY_CONTROL_BYTES = bytes(
+    byte for byte in range(32) if byte not in b"\b\t\n\f\r\x1b"
+)
+HEX_VIEW_ROW_BYTES = 16
+HEX_VIEW_SEARCH_CHUNK = 64 * 1024 * 1024
+TABLE_INDEX_CHUNK = 16 * 1024 * 1024
+TABLE_SAMPLE_SIZE = 1024 * 1024
+TABLE_SAMPLE_ROWS = 1000
+TABLE_ROW_CACHE = 4096
+TABLE_PROGRESS_ROWS = 65536
+TABLE_FORMATS = {
+    ".jsonl": ("jsonl", ""),
+    ".ndjson": ("jsonl", ""),
+    ".csv": ("csv", ","),
+    ".tsv": ("csv", "\t"),
+}
+SPELL_SYSTEM_DICTIONARIES = (
+    "/usr/share/dict/words",
+    "/usr/share/dict/american-english",
+    "/usr/share/dict/british-english",
+)
+SPELL_WORD_PATTERN = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+SPELL_CACHE_LIMIT = 20000
+SPELL_MEMO_LIMIT = 50000
+SPELL_BATCH_LIMIT = 500
+SPELL_EDITED_LIMIT = 200
+SPELL_REFRESH_DELAY = 150
+SPELL_SUGGESTION_LIMIT = 8
+SPELL_ALPHABET = "abcdefghijklmnopqrstuvwxyz'"
+COMPLETION_WORD_PATTERN = re.compile(r"[^\W\d][\w.\-]*\w")
+COMPLETION_PREFIX_PATTERN = re.compile(r"[^\W\d][\w.\-]*$")
+COMPLETION_MIN_LENGTH = 4
+COMPLETION_MAX_LENGTH = 64
+COMPLETION_MIN_PREFIX = 3
+COMPLETION_LIMIT = 10
+COMPLETION_SCAN_LIMIT = 2000
+COMPLETION_MERGE_LIMIT = 50000
+COMPLETION_NEARBY_BLOCKS = 20
+COMPLETION_INDEX_CHUNK = 64 * 1024
+COMPLETION_INDEX_SLICE = 0.01
+COMPLETION_EDIT_CONTEXT = 256
+COMPLETION_NEARBY_CHARS = 8 * 1024
+COMPLETION_BOUNDARY_PATTERN = re.compile(r"[^\w.\-]")
+HEX_VIEW_PRINTABLE = bytes(
+    byte if 32 <= byte < 127 else ord(".") for byte in range(256)
+)
+LINE_OPERATION_MEMORY = 64 * 1024 * 1024
+LINE_OPERATION_BUCKETS = 64
+NUMBER_PATTERN = re.compile(r"\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+STATISTICS_REPORT_INTERVAL = 0.25
+STATISTICS_STOP_TIMEOUT = 1.0
+WORD_SEPARATORS = str.maketrans(
+    {chr(code): " " for code in range(128) if not chr(code).isalpha()}
+)
+ASCII_COMPATIBLE_ENCODINGS = ("utf-8", "utf-8-sig", "iso8859-1", "cp1252")
+
+
+def frecency_boost(timestamp: float) -> float:
+    """Return the log-domain weight of a single open at the given time."""
+    return timestamp * math.log(2) / RECENT_FILES_HALF_LIFE
+
+
+def logaddexp(a: float, b: float) -> float:
+    """Return log(exp(a) + exp(b)) without overflowing."""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def fuzzy_score(pattern: str, text: str) -> Optional[float]:
+    """Score text against a subsequence pattern, or None if it misses."""
+    if not pattern:
+        return 0.0
+    pattern = pattern.lower()
+    text = text.lower()
+    name_start = max(text.rfind("/"), text.rfind("\\")) + 1
+    score = 0.0
+    position = -1
+    for char in pattern:
+        found = text.find(char, position + 1)
+        if found == -1:
+            return None
+        if found == position + 1:
+            score += 2.0
+        if found >= name_start:
+            score += 1.0
+        if found == name_start or text[found - 1] in "/\\._- ":
+            score += 1.5
+        position = found
+    return score - (len(text) - name_start) * 0.01
+
+
+def content_hash(data: bytes) -> str:
+    """Return the hash used to recognize unchanged file content."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def detect_encoding(raw: bytes, final: bool = True) -> str:
+    """Guess the text encoding of raw file content.
+
+    Pass ``final=False`` when ``raw`` is only the start of the content, so
+    that a character cut off at the end does not count as invalid.
+    """
+    if raw.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if raw.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(raw, final)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def detect_newline(text: str) -> str:
+    """Guess the newline style of decoded text."""
+    if "\r\n" in text:
+        return "\r\n"
+    if "\r" in text:
+        return "\r"
+    return "\n"
+
+
+def canonical_path(file_path: str) -> str:
+    """Return the key that identifies a file however its path is spelled."""
+    return os.path.normcase(os.path.realpath(file_path))
+
+
+def detect_compression(file_path: str) -> Optional[str]:
+    """Return the compression format of a file from its magic bytes."""
+    try:
+        with open(file_path, "rb") as file:
+            header = file.read(6)
+    except OSError:
+        return None
+    for magic, compression in COMPRESSION_MAGIC:
+        if magic.match(header):
+            return compression
+    return None
+
+
+def is_binary_file(file_path: str) -> bool:
+    """Guess whether a file is binary from a sample of its first bytes."""
+    try:
+        with open(file_path, "rb") as file:
+            sample = file.read(BINARY_SAMPLE_SIZE)
+    except OSError:
+        return False
+    if sample.startswith(
+        (codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+    ):
+        return False
+    if b"\x00" in sample:
+        return True
+    controls = len(sample) - len(sample.translate(None, BINARY_CONTROL_BYTES))
+    return bool(sample) and controls / len(sample) > BINARY_CONTROL_RATIO
+
+
+def open_compressed(file_path: str, compression: str, mode: str = "rb"):
+    """Open a compressed file as a binary stream of its contents."""
+    opener = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+    return opener[compression](file_path, mode)
+
+
+def encode_text(content: str, encoding: str, newline: str) -> bytes:
+    """Encode editor text with the file's encoding and newline style."""
+    if newline != "\n":
+        content = content.replace("\n", newline)
+    return content.encode(encoding)
+
+
+def atomic_write(
+    file_path: str, data: bytes, compression: Optional[str] = None
+) -> None:
+    """Write a file through a temporary file and an atomic rename.
+
+    An existing file is never left half-written: the new content is
+    flushed to disk next to it first and then renamed over it, keeping
+    its permissions. Symbolic links are followed.
+    """
+    if compression:
+        compressor = {
+            "gzip": gzip.compress,
+            "bz2": bz2.compress,
+            "xz": lzma.compress,
+        }
+        data = compressor[compression](data)
+    target = os.path.realpath(file_path)
+    if not os.path.exists(target):
+        with open(target, "wb") as file:
+            file.write(data)
+        return
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(target)}.",
+        suffix=".tmp",
+        dir=os.path.dirname(target),
+    )
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, os.stat(target).st_mode & 0o7777)
+        os.replace(temp_path, target)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def detect_table_format(file_path: str, sample: str) -> Tuple[str, str]:
+    """Return the table format and CSV delimiter of a file."""
+    suffix = os.path.splitext(file_path)[1].lower()
+    if suffix in TABLE_FORMATS:
+        return TABLE_FORMATS[suffix]
+    first_line = sample.lstrip().split("\n", 1)[0]
+    if first_line.startswith(("{", "[")):
+        return "jsonl", ""
+    try:
+        return "csv", csv.Sniffer().sniff(sample, ",\t;|").delimiter
+    except csv.Error:
+        return "csv", ","
+
+
+def infer_table_columns(
+    sample: str, table_format: str, delimiter: str
+) -> Tuple[List[str], bool]:
+    """Infer column names, and whether a CSV has a header, from a sample."""
+    sample = sample.replace("\r\n", "\n")
+    lines = sample.split("\n")[:-1] or sample.split("\n")
+    if table_format == "jsonl":
+        columns: Dict[str, None] = {}
+        width = 1
+        for line in lines[:TABLE_SAMPLE_ROWS]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                columns.update(dict.fromkeys(record))
+            elif isinstance(record, list):
+                width = max(width, len(record))
+        names = list(columns) or [f"Column {i + 1}" for i in range(width)]
+        return names, False
+    rows = list(csv.reader(lines[:TABLE_SAMPLE_ROWS], delimiter=delimiter))
+    width = max((len(row) for row in rows), default=1)
+    try:
+        has_header = csv.Sniffer().has_header("\n".join(lines[:100]))
+    except csv.Error:
+        has_header = False
+    if has_header and rows:
+        names = rows[0] + [
+            f"Column {i + 1}" for i in range(len(rows[0]), width)
+        ]
+        return names, True
+    return [f"Column {i + 1}" for i in range(width)], False
+
+
+def parse_table_record(
+    raw: bytes, table_format: str, delimiter: str, encoding: str
+):
+    """Parse one JSON-lines or CSV record, falling back to its raw text."""
+    text = raw.decode(encoding, "replace").rstrip("\r\n")
+    if table_format == "jsonl":
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+    return next(csv.reader([text], delimiter=delimiter), [])
+
+
+def table_value(record, columns: List[str], column: int):
+    """Return the raw value of a parsed record's column."""
+    if isinstance(record, dict):
+        return record.get(columns[column])
+    if isinstance(record, list):
+        return record[column] if column < len(record) else None
+    return record if column == 0 else None
+
+
+def table_cell(record, columns: List[str], column: int) -> str:
+    """Return the display text of a parsed record's column."""
+    value = table_value(record, columns, column)
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+def spell_candidates(word: str) -> Iterator[str]:
+    """Yield the words one deletion, swap, change or insertion away."""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    for left, right in splits:
+        if right:
+            yield left + right[1:]
+        if len(right) > 1:
+            yield left + right[1] + right[0] + right[2:]
+        for letter in SPELL_ALPHABET:
+            if right:
+                yield left + letter + right[1:]
+            yield left + letter + right
+
+
+def statistics_snapshot(stats: Dict, top_n: int) -> Dict:
+    """Return a picklable copy of running statistics for the panel."""
+    snapshot = {
+        key: value
+        for key, value in stats.items()
+        if key not in ("words", "tokens")
+    }
+    snapshot["pattern_hits"] = dict(stats["pattern_hits"])
+    snapshot["top_words"] = stats["words"].most_common(top_n)
+    snapshot["top_tokens"] = stats["tokens"].most_common(top_n)
+    return snapshot
+
+
+def count_statistics_chunk(text: str, patterns: List[str]) -> Dict:
+    """Count a chunk of whole lines using C-level string operations."""
+    text = text.replace("\r\n", "\n")
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    lengths = list(map(len, lines))
+    longest = max(lengths, default=0)
+    tokens = text.split()
+    return {
+        "lines": len(lines),
+        "blank_lines": len(lines) - sum(map(bool, map(str.strip, lines))),
+        "longest_line": longest,
+        "longest_index": lengths.index(longest) if lengths else 0,
+        "chars": len(text),
+        "word_count": len(tokens),
+        "tokens": Counter(tokens),
+        "words": Counter(text.lower().translate(WORD_SEPARATORS).split()),
+        "pattern_hits": {
+            pattern: len(re.findall(pattern, text)) for pattern in patterns
+        },
+    }
+
+
+def count_statistics_range(task: Tuple) -> Tuple[int, Dict]:
+    """Decode and count one newline-aligned byte range of a file."""
+    source_index, path, encoding, start, end, patterns = task
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = mapped[start:end]
+    if start == 0 and encoding == "utf-8-sig":
+        data = data.removeprefix(codecs.BOM_UTF8)
+    if encoding == "utf-8-sig":
+        encoding = "utf-8"
+    text = data.decode(encoding, errors="replace")
+    result = count_statistics_chunk(text, patterns)
+    result["size"] = end - start
+    return source_index, result
+
+
+def statistics_ranges(
+    sources: List[Tuple[str, str]], patterns: List[str]
+) -> Iterator[Tuple]:
+    """Split ASCII-compatible sources into newline-aligned byte ranges."""
+    for source_index, (path, encoding) in enumerate(sources):
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if not size:
+                continue
+            with mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                start = 0
+                while start < size:
+                    end = mapped.find(b"\n", start + STATISTICS_CHUNK)
+                    end = size if end == -1 else end + 1
+                    yield (source_index, path, encoding, start, end, patterns)
+                    start = end
+
+
+def statistics_text_chunks(
+    sources: List[Tuple[str, str]], patterns: List[str]
+) -> Iterator[Tuple[int, Dict]]:
+    """Decode and count sources whose newlines are not single bytes."""
+    for source_index, (path, encoding) in enumerate(sources):
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if not size:
+                continue
+            with mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                decoder = codecs.getincrementaldecoder(encoding)(
+                    errors="replace"
+                )
+                carry = ""
+                for offset in range(0, size, STATISTICS_CHUNK):
+                    final = offset + STATISTICS_CHUNK >= size
+                    text = carry + decoder.decode(
+                        mapped[offset : offset + STATISTICS_CHUNK], final
+                    )
+                    if final:
+                        carry = ""
+                    else:
+                        cut = text.rfind("\n") + 1
+                        text, carry = text[:cut], text[cut:]
+                    result = count_statistics_chunk(text, patterns)
+                    result["size"] = min(STATISTICS_CHUNK, size - offset)
+                    yield source_index, result
+
+
+def compute_statistics(
+    sources: List[Tuple[str, str]],
+    patterns: List[str],
+    top_n: int,
+    queue,
+    cancelled,
+) -> None:
+    """Compute document statistics in a worker process.
+
+    Sources are memory-mapped and counted in newline-aligned chunks,
+    spread over a process pool when more than one CPU is available, and
+    running results are streamed back through the queue. Setting the
+    ``cancelled`` event stops the count and terminates the pool, as does
+    terminating the worker itself where SIGTERM can be handled.
+    """
+
+    def stop(signum, frame):
+        queue.cancel_join_thread()
+        raise SystemExit(1)
+
+    signal.signal(signal.SIGTERM, stop)
+    pool = None
+    try:
+        stats = {
+            "lines": 0,
+            "blank_lines": 0,
+            "longest_line": 0,
+            "longest_line_number": 0,
+            "longest_line_file": "",
+            "chars": 0,
+            "word_count": 0,
+            "pattern_hits": Counter({pattern: 0 for pattern in patterns}),
+            "words": Counter(),
+            "tokens": Counter(),
+            "bytes_done": 0,
+            "total_bytes": sum(os.path.getsize(path) for path, _ in sources),
+        }
+        range_sources = [
+            source
+            for source in sources
+            if codecs.lookup(source[1]).name in ASCII_COMPATIBLE_ENCODINGS
+        ]
+        text_sources = [
+            source for source in sources if source not in range_sources
+        ]
+        workers = max(1, (os.cpu_count() or 1) - 1)
+        if workers > 1:
+            pool = multiprocessing.get_context("spawn").Pool(workers)
+            range_results = pool.imap(
+                count_statistics_range,
+                statistics_ranges(range_sources, patterns),
+            )
+        else:
+            range_results = map(
+                count_statistics_range,
+                statistics_ranges(range_sources, patterns),
+            )
+        last_report = time.monotonic()
+        file_lines = {}
+        for results, source_list in (
+            (range_results, range_sources),
+            (statistics_text_chunks(text_sources, patterns), text_sources),
+        ):
+            for source_index, result in results:
+                if cancelled.is_set():
+                    queue.cancel_join_thread()
+                    return
+                path = source_list[source_index][0]
+                first_line = file_lines.get(path, 0)
+                if result["longest_line"] > stats["longest_line"]:
+                    stats["longest_line"] = result["longest_line"]
+                    stats["longest_line_file"] = path
+                    stats["longest_line_number"] = (
+                        first_line + result["longest_index"] + 1
+                    )
+                file_lines[path] = first_line + result["lines"]
+                for key in (
+                    "lines",
+                    "blank_lines",
+                    "chars",
+                    "word_count",
+                ):
+                    stats[key] += result[key]
+                stats["bytes_done"] += result["size"]
+                stats["tokens"].update(result["tokens"])
+                stats["words"].update(result["words"])
+                stats["pattern_hits"].update(result["pattern_hits"])
+                if time.monotonic() - last_report > STATISTICS_REPORT_INTERVAL:
+                    queue.put(("partial", statistics_snapshot(stats, top_n)))
+                    last_report = time.monotonic()
+        queue.put(("done", statistics_snapshot(stats, top_n)))
+    except Exception as e:
+        queue.put(("error", str(e)))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+class LineOperationCancelled(Exception):
+    pass
+
+
+def numeric_sort_key(line: str) -> Tuple[float, str]:
+    """Sort key comparing the leading number of a line, like sort -n."""
+    match = NUMBER_PATTERN.match(line)
+    return (float(match.group(1)) if match else 0.0, line)
+
+
+def iter_text_lines(text: str, segment: int = 1024 * 1024) -> Iterator[str]:
+    """Yield the lines of text without splitting it all at once."""
+    position = 0
+    while position < len(text):
+        cut = text.find("\n", position + segment)
+        cut = len(text) if cut == -1 else cut + 1
+        lines = text[position:cut].split("\n")
+        if cut < len(text) or text.endswith("\n"):
+            lines.pop()
+        yield from lines
+        position = cut
+
+
+def iter_file_lines(path: str, encoding: str) -> Iterator[str]:
+    """Yield the lines of a file, streaming it from disk."""
+    with open(path, "r", encoding=encoding, errors="replace") as file:
+        for line in file:
+            yield line[:-1] if line.endswith("\n") else line
+
+
+def write_run(lines: List[str]):
+    """Write lines to an anonymous temporary file and rewind it."""
+    run = tempfile.TemporaryFile("w+", encoding="utf-8", newline="\n")
+    run.writelines(line + "\n" for line in lines)
+    run.seek(0)
+    return run
+
+
+def read_run(run) -> Iterator[str]:
+    for line in run:
+        yield line[:-1]
+
+
+def external_sort(
+    lines: Iterable[str],
+    key: Optional[Callable] = None,
+    reverse: bool = False,
+    memory_limit: int = LINE_OPERATION_MEMORY,
+    check: Callable = lambda: None,
+) -> Iterator[str]:
+    """Sort lines, spilling sorted runs to disk beyond the memory limit."""
+    runs = []
+    batch: List[str] = []
+    batch_size = 0
+    for line in lines:
+        batch.append(line)
+        batch_size += sys.getsizeof(line) + 8
+        if batch_size > memory_limit:
+            check()
+            batch.sort(key=key, reverse=reverse)
+            runs.append(write_run(batch))
+            batch = []
+            batch_size = 0
+    batch.sort(key=key, reverse=reverse)
+    if not runs:
+        yield from batch
+        return
+    runs.append(write_run(batch))
+    del batch
+    try:
+        yield from heapq.merge(
+            *(read_run(run) for run in runs), key=key, reverse=reverse
+        )
+    finally:
+        for run in runs:
+            run.close()
+
+
+def drop_adjacent_duplicates(lines: Iterable[str]) -> Iterator[str]:
+    previous = None
+    for line in lines:
+        if line != previous:
+            yield line
+        previous = line
+
+
+def unique_lines(
+    lines: Iterable[str],
+    memory_limit: int = LINE_OPERATION_MEMORY,
+    check: Callable = lambda: None,
+) -> Iterator[str]:
+    """Yield the first occurrence of each line, in input order.
+
+    Lines are deduplicated with an in-memory set until it outgrows the
+    memory limit; the rest of the input is then hash-partitioned into
+    bucket files that are deduplicated one at a time and merged back in
+    line order.
+    """
+    seen = set()
+    seen_size = 0
+    lines = iter(lines)
+    line_number = 0
+    for line in lines:
+        if line not in seen:
+            seen.add(line)
+            seen_size += sys.getsizeof(line) + 64
+            yield line
+            if seen_size > memory_limit:
+                break
+        line_number += 1
+    else:
+        return
+
+    buckets = [
+        tempfile.TemporaryFile("w+", encoding="utf-8", newline="\n")
+        for _ in range(LINE_OPERATION_BUCKETS)
+    ]
+    try:
+        for line in lines:
+            line_number += 1
+            if line not in seen:
+                bucket = buckets[hash(line) % LINE_OPERATION_BUCKETS]
+                bucket.write(f"{line_number}\t{line}\n")
+        seen.clear()
+        deduplicated = []
+        for bucket in buckets:
+            check()
+            bucket.seek(0)
+            first_seen = {}
+            for entry in bucket:
+                number, line = entry[:-1].split("\t", 1)
+                first_seen.setdefault(line, int(number))
+            bucket.seek(0)
+            bucket.truncate()
+            bucket.writelines(
+                f"{number}\t{line}\n"
+                for line, number in sorted(
+                    first_seen.items(), key=lambda item: item[1]
+                )
+            )
+            bucket.seek(0)
+            deduplicated.append(bucket)
+        entries = heapq.merge(
+            *(
+                (
+                    (int(number), line)
+                    for number, line in (
+                        entry[:-1].split("\t", 1) for entry in bucket
+                    )
+                )
+                for bucket in deduplicated
+            )
+        )
+        for _, line in entries:
+            yield line
+    finally:
+        for bucket in buckets:
+            bucket.close()
+
+
+def run_line_operation(
+    lines: Iterable[str], options: Dict, output, check: Callable
+) -> int:
+    """Apply a sort, unique or filter operation, writing to output."""
+    operation = options["operation"]
+    if operation == "sort":
+        key = None
+        if options["numeric"]:
+            key = numeric_sort_key
+        elif options["case_insensitive"]:
+            key = str.casefold
+        result = external_sort(lines, key, options["reverse"], check=check)
+        if options["unique"]:
+            result = drop_adjacent_duplicates(result)
+    elif operation == "unique":
+        result = unique_lines(lines, check=check)
+    else:
+        regex = re.compile(options["pattern"])
+        keep = operation == "keep"
+        result = (line for line in lines if bool(regex.search(line)) == keep)
+
+    count = 0
+    for line in result:
+        output.write(line)
+        output.write("\n")
+        count += 1
+        if not count % 100000:
+            check()
+    return count
+
+
+def setup_logging(enable_debug):
+    if enable_debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+        )
+    else:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+        )
+
+
+class FindReplaceDialog(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.find_layout = QHBoxLayout()
+        self.find_input = QLineEdit()
+        self.find_button = QPushButton("Find")
+        self.find_layout.addWidget(QLabel("Find:"))
+        self.find_layout.addWidget(self.find_input)
+        self.find_layout.addWidget(self.find_button)
+
+        self.replace_layout = QHBoxLayout()
+        self.replace_input = QLineEdit()
+        self.replace_button = QPushButton("Replace")
+        self.replace_all_button = QPushButton("Replace All")
+        self.replace_layout.addWidget(QLabel("Replace:"))
+        self.replace_layout.addWidget(self.replace_input)
+        self.replace_layout.addWidget(self.replace_button)
+        self.replace_layout.addWidget(self.replace_all_button)
+
+        self.layout.addLayout(self.find_layout)
+        self.layout.addLayout(self.replace_layout)
+
+        self.replace_input.hide()
+        self.replace_button.hide()
+        self.replace_all_button.hide()
+
+
+def utf16_length(text: str) -> int:
+    """Return the length of text in Qt (UTF-16) positions."""
+    return len(text.encode("utf-16-le", "surrogatepass")) // 2
+
+
+def key_edits_text(event) -> bool:
+    """Return whether a key press may change the text of an editor."""
+    return (
+        bool(event.text())
+        or event.key() in (Qt.Key.Key_Backspace, Qt.Key.Key_Delete)
+        or any(event.matches(key) for key in UNDO_EDIT_KEYS)
+    )
+
+
+def selected_plain_text(cursor: QTextCursor) -> str:
+    """Return a cursor's selection with paragraph separators as newlines."""
+    return cursor.selectedText().replace("\u2029", "\n")
+
+
+class UndoStep:
+    """A group of text changes that is undone and redone as one unit."""
+
+    __slots__ = ("changes", "kind", "size")
+
+    def __init__(self, kind: str = "edit"):
+        self.changes: List[Tuple[int, str, str]] = []
+        self.kind = kind
+        self.size = UNDO_STEP_OVERHEAD
+
+    def add(self, position: int, removed: str, added: str) -> None:
+        self.changes.append((position, removed, added))
+        self.measure()
+
+    def measure(self) -> None:
+        """Recompute the approximate memory held by this step."""
+        self.size = UNDO_STEP_OVERHEAD + sum(
+            sys.getsizeof(removed) + sys.getsizeof(added) + 64
+            for _, removed, added in self.changes
+        )
+
+
+class UndoHistory(QObject):
+    """Bounded, memory-accounted undo history for an editor's document.
+
+    Qt's own undo stack is disabled. Text removed by an edit is read from
+    a small window captured just before each user event, consecutive
+    typing is merged into word-level steps, and the oldest steps are
+    compressed into a temporary spill file or dropped once the memory
+    budget or step limit is exceeded. Split views of the document share
+    the history; the last view used is the one captured and restored.
+
+    Every change it can account for, including undo and redo, is also
+    emitted as ``edited(position, removed_text, added_text)``.
+    """
+
+    edited = pyqtSignal(int, str, str)
+    lost_track = pyqtSignal()
+
+    def __init__(
+        self,
+        editor: QPlainTextEdit,
+        memory_limit: int,
+        max_steps: int,
+        spill_to_disk: bool,
+    ):
+        super().__init__(editor)
+        self.editor = editor
+        self.document = editor.document()
+        self.memory_limit = memory_limit
+        self.max_steps = max_steps
+        self.spill_to_disk = spill_to_disk
+
+        self.undo_steps: List[UndoStep] = []
+        self.redo_steps: List[UndoStep] = []
+        self.spilled: List[Tuple[int, int, int]] = []
+        self.spill_file = None
+        self.dropped = 0
+        self.memory_bytes = 0
+        self.clean_index: Optional[int] = 0
+        self.applying = False
+        self.paused = False
+        self.group: Optional[UndoStep] = None
+        self.group_depth = 0
+
+        self.capture_start = 0
+        self.capture_text = b""
+        self.view = editor
+
+        self.document.setUndoRedoEnabled(False)
+        self.document.contentsChange.connect(self.on_contents_change)
+        self.add_view(editor)
+
+    def add_view(self, view: QPlainTextEdit) -> None:
+        """Track edits made through another view of the document."""
+        view.installEventFilter(self)
+        view.viewport().installEventFilter(self)
+
+    def remove_view(self, view: QPlainTextEdit) -> None:
+        view.removeEventFilter(self)
+        view.viewport().removeEventFilter(self)
+        if self.view is view:
+            self.view = self.editor
+
+    def eventFilter(self, obj, event) -> bool:
+        """Capture the selection before events that may edit the text.
+
+        Other key presses and clicks only move the window to the cursor,
+        since copying a large selection on every cursor key is slow.
+        """
+        event_type = event.type()
+        if event_type in (QEvent.Type.FocusIn, QEvent.Type.KeyPress) or (
+            event_type == QEvent.Type.MouseButtonPress
+        ):
+            self.view = (
+                obj if isinstance(obj, QPlainTextEdit) else obj.parentWidget()
+            )
+        if event_type == QEvent.Type.KeyPress:
+            if event.matches(QKeySequence.StandardKey.Undo):
+                self.undo()
+                return True
+            if event.matches(QKeySequence.StandardKey.Redo):
+                self.redo()
+                return True
+            if key_edits_text(event):
+                self.capture()
+            else:
+                self.capture_cursor()
+        elif event_type in (
+            QEvent.Type.InputMethod,
+            QEvent.Type.Drop,
+            QEvent.Type.ContextMenu,
+        ):
+            self.capture()
+        elif event_type == QEvent.Type.MouseButtonRelease:
+            self.capture_cursor()
+        return False
+
+    def capture(self, start: int = None, end: int = None) -> None:
+        """Remember the text around the cursor before it may be edited."""
+        cursor = self.view.textCursor()
+        if start is None:
+            start = cursor.selectionStart() - UNDO_CAPTURE_WINDOW
+        if end is None:
+            end = cursor.selectionEnd() + UNDO_CAPTURE_WINDOW
+        start = max(0, start)
+        end = min(end, self.document.characterCount() - 1)
+        cursor.setPosition(start)
+        cursor.setPosition(max(start, end), QTextCursor.MoveMode.KeepAnchor)
+        self.capture_start = start
+        self.capture_text = selected_plain_text(cursor).encode(
+            "utf-16-le", "surrogatepass"
+        )
+
+    def capture_cursor(self) -> None:
+        """Remember the text around the cursor, leaving out a selection."""
+        position = self.view.textCursor().position()
+        self.capture(
+            position - UNDO_CAPTURE_WINDOW, position + UNDO_CAPTURE_WINDOW
+        )
+
+    def captured(self, position: int, length: int) -> Optional[str]:
+        """Return captured text at a document range, if it was captured."""
+        offset = (position - self.capture_start) * 2
+        if offset < 0 or offset + length * 2 > len(self.capture_text):
+            return None
+        return self.capture_text[offset : offset + length * 2].decode(
+            "utf-16-le", "surrogatepass"
+        )
+
+    def on_contents_change(self, position: int, removed: int, added: int):
+        if self.applying or self.paused:
+            return
+        overflow = position + added - (self.document.characterCount() - 1)
+        if overflow > 0:
+            added -= overflow
+            removed -= overflow
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(position)
+        cursor.setPosition(position + added, QTextCursor.MoveMode.KeepAnchor)
+        added_text = selected_plain_text(cursor)
+        removed_text = self.captured(position, removed) if removed else ""
+        if removed_text is None:
+            logging.debug("Undo history lost track of an edit, clearing")
+            self.clear()
+            self.follow_edit(position, utf16_length(added_text))
+            self.lost_track.emit()
+            return
+        if removed_text == added_text:
+            return
+        self.shift_capture(position, removed, added_text)
+        self.follow_edit(position, utf16_length(added_text))
+        self.record(position, removed_text, added_text)
+        self.edited.emit(position, removed_text, added_text)
+
+    def shift_capture(self, position: int, removed: int, added_text: str):
+        """Keep the captured window in sync with an edit to the document."""
+        capture_end = self.capture_start + len(self.capture_text) // 2
+        if position + removed <= self.capture_start:
+            self.capture_start += utf16_length(added_text) - removed
+        elif position <= capture_end:
+            offset = (position - self.capture_start) * 2
+            if (
+                offset < 0
+                or position + removed > capture_end
+                or len(added_text) > UNDO_CAPTURE_WINDOW
+            ):
+                self.capture_text = b""
+                return
+            self.capture_text = (
+                self.capture_text[:offset]
+                + added_text.encode("utf-16-le", "surrogatepass")
+                + self.capture_text[offset + removed * 2 :]
+            )
+
+    def follow_edit(self, position: int, length: int) -> None:
+        """Capture the text around an edit the window no longer covers.
+
+        Edits made without a user event, such as chunked inserts or line
+        operations, move on from where the last one ended, so the window
+        follows them instead of staying at the cursor.
+        """
+        end = position + length
+        capture_end = self.capture_start + len(self.capture_text) // 2
+        if (
+            not self.capture_text
+            or position < self.capture_start
+            or end > capture_end
+        ):
+            self.capture(end - UNDO_CAPTURE_WINDOW, end + UNDO_CAPTURE_WINDOW)
+
+    def record(self, position: int, removed: str, added: str) -> None:
+        """Add a change to the history, merging typing into words."""
+        self.discard_redo()
+        if self.group is not None:
+            self.memory_bytes -= self.group.size
+            self.group.add(position, removed, added)
+            self.memory_bytes += self.group.size
+            self.update_modified()
+            return
+
+        kind = "edit"
+        if not removed and len(added) == 1 and added != "\n":
+            kind = "typing"
+        elif not added and len(removed) == 1:
+            kind = "deleting"
+        last = self.undo_steps[-1] if self.undo_steps else None
+        if (
+            last is not None
+            and last.kind == kind
+            and kind != "edit"
+            and self.undo_count() != self.clean_index
+            and self.can_merge(last, position, removed, added)
+        ):
+            self.memory_bytes -= last.size
+            last_position, last_removed, last_added = last.changes[-1]
+            if kind == "typing":
+                last.changes[-1] = (last_position, "", last_added + added)
+            elif position < last_position:
+                last.changes[-1] = (position, removed + last_removed, "")
+            else:
+                last.changes[-1] = (last_position, last_removed + removed, "")
+            last.measure()
+            self.memory_bytes += last.size
+        else:
+            step = UndoStep(kind)
+            step.add(position, removed, added)
+            self.undo_steps.append(step)
+            self.memory_bytes += step.size
+        self.enforce_limits()
+        self.update_modified()
+
+    def can_merge(
+        self, last: UndoStep, position: int, removed: str, added: str
+    ) -> bool:
+        last_position, last_removed, last_added = last.changes[-1]
+        if last.kind == "typing":
+            if position != last_position + utf16_length(last_added):
+                return False
+            return not (last_added[-1].isspace() and not added.isspace())
+        return position in (last_position - 1, last_position)
+
+    def begin_group(self) -> None:
+        """Start collecting changes into a single undo step."""
+        if self.group_depth == 0:
+            self.discard_redo()
+            self.group = UndoStep()
+            self.undo_steps.append(self.group)
+            self.memory_bytes += self.group.size
+        self.group_depth += 1
+
+    def end_group(self, discard: bool = False) -> None:
+        """Finish the current undo step started by begin_group.
+
+        With ``discard`` the step is dropped, for changes that were rolled
+        back before the group ended.
+        """
+        if self.group_depth == 0:
+            return
+        self.group_depth -= 1
+        if self.group_depth == 0:
+            group, self.group = self.group, None
+            if (discard or not group.changes) and group in self.undo_steps:
+                self.undo_steps.remove(group)
+                self.memory_bytes -= group.size
+            self.enforce_limits()
+            self.update_modified()
+
+    def undo_count(self) -> int:
+        return self.dropped + len(self.spilled) + len(self.undo_steps)
+
+    def can_undo(self) -> bool:
+        return bool(self.undo_steps or self.spilled)
+
+    def can_redo(self) -> bool:
+        return bool(self.redo_steps)
+
+    def undo(self) -> None:
+        """Revert the most recent step, reloading spilled steps as needed."""
+        if not self.undo_steps and self.spilled:
+            self.undo_steps.append(self.unspill())
+        if not self.undo_steps:
+            return
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        changes = [
+            (position, added, removed)
+            for position, removed, added in reversed(step.changes)
+        ]
+        self.apply(changes)
+
+    def redo(self) -> None:
+        """Re-apply the most recently undone step."""
+        if not self.redo_steps:
+            return
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        self.apply(step.changes)
+        self.enforce_limits()
+
+    def apply(self, changes: List[Tuple[int, str, str]]) -> None:
+        cursor = QTextCursor(self.document)
+        self.applying = True
+        cursor.beginEditBlock()
+        for position, old_text, new_text in changes:
+            cursor.setPosition(position)
+            cursor.setPosition(
+                position + utf16_length(old_text),
+                QTextCursor.MoveMode.KeepAnchor,
+            )
+            cursor.insertText(new_text)
+            self.edited.emit(position, old_text, new_text)
+        cursor.endEditBlock()
+        self.applying = False
+        self.view.setTextCursor(cursor)
+        self.update_modified()
+
+    def discard_redo(self) -> None:
+        if not self.redo_steps:
+            return
+        if self.clean_index is not None and (
+            self.clean_index > self.undo_count()
+        ):
+            self.clean_index = None
+        self.memory_bytes -= sum(step.size for step in self.redo_steps)
+        self.redo_steps.clear()
+
+    def enforce_limits(self) -> None:
+        """Spill or drop the oldest steps beyond the memory or step limits."""
+        while self.undo_count() - self.dropped > self.max_steps:
+            if self.spilled:
+                self.spilled.pop(0)
+                if not self.spilled:
+                    self.spill_file.truncate(0)
+            else:
+                self.memory_bytes -= self.undo_steps.pop(0).size
+            self.dropped += 1
+        while self.memory_bytes > self.memory_limit and (
+            len(self.undo_steps) > 1
+        ):
+            step = self.undo_steps.pop(0)
+            self.memory_bytes -= step.size
+            if self.spill_to_disk:
+                self.spill(step)
+            else:
+                self.dropped += 1
+
+    def spill(self, step: UndoStep) -> None:
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix="cnb-undo-")
+        data = zlib.compress(pickle.dumps((step.changes, step.kind)))
+        offset = (
+            self.spilled[-1][0] + self.spilled[-1][1] if self.spilled else 0
+        )
+        self.spill_file.seek(offset)
+        self.spill_file.write(data)
+        self.spilled.append((offset, len(data), step.size))
+
+    def unspill(self) -> UndoStep:
+        offset, length, size = self.spilled.pop()
+        self.spill_file.seek(offset)
+        changes, kind = pickle.loads(
+            zlib.decompress(self.spill_file.read(length))
+        )
+        self.spill_file.truncate(offset)
+        step = UndoStep(kind)
+        step.changes = changes
+        step.size = size
+        self.memory_bytes += size
+        return step
+
+    def set_limits(
+        self, memory_limit: int, max_steps: int, spill_to_disk: bool
+    ) -> None:
+        self.memory_limit = memory_limit
+        self.max_steps = max_steps
+        self.spill_to_disk = spill_to_disk
+        if not spill_to_disk and self.spilled:
+            self.dropped += len(self.spilled)
+            self.spilled.clear()
+            self.spill_file.truncate(0)
+        self.enforce_limits()
+
+    def set_clean(self) -> None:
+        """Mark the current state as matching the file on disk."""
+        self.clean_index = self.undo_count()
+
+    def update_modified(self) -> None:
+        modified = self.undo_count() != self.clean_index
+        if self.document.isModified() != modified:
+            self.document.setModified(modified)
+
+    def clear(self) -> None:
+        """Forget all history, keeping the current modified state."""
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.spilled.clear()
+        self.memory_bytes = 0
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+        self.clean_index = None if self.document.isModified() else 0
+        self.dropped = 0
+        self.group = None
+        self.group_depth = 0
+
+    def close(self) -> None:
+        """Release the spill file."""
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def usage(self) -> Dict[str, int]:
+        """Return memory accounting for the debug view."""
+        return {
+            "steps": len(self.undo_steps) + len(self.redo_steps),
+            "memory": self.memory_bytes,
+            "spilled_steps": len(self.spilled),
+            "spilled_bytes": sum(entry[1] for entry in self.spilled),
+        }
+
+
+class ChunkedInsert(QObject):
+    """Insert a large block of text in time-sliced chunks.
+
+    Each slice is its own edit block, so the editor lays out and repaints
+    the text as it arrives, while the undo history groups the slices into
+    a single step. The editor and its split views stay read-only, with
+    the editor's signals blocked, until the insert finishes, and cancelling from the progress dialog
+    removes the text inserted so far and restores the replaced selection.
+    """
+
+    finished = pyqtSignal(bool)
+
+    def __init__(self, editor: QPlainTextEdit, text: str, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.text = text.replace("\r\n", "\n").replace("\r", "\n")
+        self.offset = 0
+        self.cursor = QTextCursor(editor.undo_history.view.textCursor())
+        self.start_position = self.cursor.selectionStart()
+        self.replaced_text = selected_plain_text(self.cursor)
+        self.was_read_only = editor.isReadOnly()
+        self.view_read_only = {
+            view: view.isReadOnly() for view in editor.split_views
+        }
+
+        self.progress = QProgressDialog(
+            "Inserting text...", "Cancel", 0, len(self.text), parent
+        )
+        self.progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progress.setMinimumDuration(300)
+        self.progress.setAutoReset(False)
+        self.progress.setAutoClose(False)
+        self.progress.canceled.connect(self.cancel)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.insert_next)
+
+    def start(self) -> None:
+        self.editor.undo_history.capture()
+        self.editor.undo_history.begin_group()
+        self.editor.setReadOnly(True)
+        for view in self.editor.split_views:
+            view.setReadOnly(True)
+        self.editor.blockSignals(True)
+        self.timer.start(0)
+
+    def insert_next(self) -> None:
+        deadline = time.perf_counter() + LARGE_INSERT_SLICE
+        self.cursor.beginEditBlock()
+        while self.offset < len(self.text) and time.perf_counter() < deadline:
+            chunk = self.text[self.offset : self.offset + LARGE_INSERT_CHUNK]
+            self.cursor.insertText(chunk)
+            self.offset += len(chunk)
+        self.cursor.endEditBlock()
+        if self.offset >= len(self.text):
+            self.finish(True)
+        else:
+            self.progress.setValue(self.offset)
+
+    def cancel(self) -> None:
+        if self.timer.isActive():
+            self.finish(False)
+
+    def finish(self, completed: bool) -> None:
+        self.timer.stop()
+        if not completed and self.offset:
+            end = self.cursor.position()
+            self.editor.undo_history.capture(self.start_position, end)
+            self.cursor.setPosition(
+                self.start_position, QTextCursor.MoveMode.KeepAnchor
+            )
+            self.cursor.insertText(self.replaced_text)
+            self.cursor.setPosition(
+                self.start_position, QTextCursor.MoveMode.KeepAnchor
+            )
+        self.editor.undo_history.end_group(discard=not completed)
+        self.editor.blockSignals(False)
+        self.editor.setReadOnly(self.was_read_only)
+        for view in self.editor.split_views:
+            view.setReadOnly(self.view_read_only.get(view, self.was_read_only))
+        self.editor.undo_history.view.setTextCursor(self.cursor)
+        self.progress.close()
+        self.text = ""
+        self.finished.emit(completed)
+
+
+class CompressedFileLoaderSignals(QObject):
+    chunk = pyqtSignal(str)
+    finished = pyqtSignal(str, str)
+    failed = pyqtSignal(str)
+
+
+class CompressedFileLoader(QRunnable):
+    """Decompress and decode a file off the GUI thread, chunk by chunk.
+
+    At most ``COMPRESSED_PENDING_CHUNKS`` decoded chunks wait for the GUI
+    at a time; the receiver calls ``consumed`` after inserting each one.
+    """
+
+    def __init__(self, file_path: str, compression: str):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.file_path = file_path
+        self.compression = compression
+        self.cancelled = False
+        self.pending = threading.Semaphore(COMPRESSED_PENDING_CHUNKS)
+        self.signals = CompressedFileLoaderSignals()
+
+    def consumed(self) -> None:
+        self.pending.release()
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self.pending.release()
+
+    def emit_chunk(self, text: str) -> bool:
+        self.pending.acquire()
+        if self.cancelled:
+            return False
+        self.signals.chunk.emit(text.replace("\r\n", "\n").replace("\r", "\n"))
+        return True
+
+    def run(self) -> None:
+        try:
+            with open_compressed(self.file_path, self.compression) as file:
+                raw = file.read(COMPRESSED_READ_CHUNK)
+                encoding = detect_encoding(raw, final=False)
+                decoder = codecs.getincrementaldecoder(encoding)()
+                newline = None
+                carry = ""
+                while raw and not self.cancelled:
+                    text = carry + decoder.decode(raw)
+                    raw = file.read(COMPRESSED_READ_CHUNK)
+                    if not raw:
+                        text += decoder.decode(b"", True)
+                    # Hold back a trailing CR in case its LF is in the
+                    # next chunk.
+                    carry = "\r" if raw and text.endswith("\r") else ""
+                    if carry:
+                        text = text[:-1]
+                    if newline is None and ("\n" in text or "\r" in text):
+                        newline = detect_newline(text)
+                    if text and not self.emit_chunk(text):
+                        return
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(str(e))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(encoding, newline or "\n")
+
+
+class HexView(QAbstractScrollArea):
+    """Hex and ASCII view of a memory-mapped file.
+
+    Only the rows in the viewport are read and painted, so the file size
+    does not affect memory use or drawing time.
+    """
+
+    def __init__(self, file_path: str, parent=None):
+        super().__init__(parent)
+        self.file = open(file_path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mapping = (
+            mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.size
+            else b""
+        )
+        self.selection_start = 0
+        self.selection_length = 0
+        self.offset_digits = max(8, len(f"{self.size:X}"))
+
+        self.setFont(
+            QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+        )
+        self.char_width = self.fontMetrics().horizontalAdvance("0")
+        self.row_height = self.fontMetrics().height()
+        self.hex_column = self.offset_digits + 2
+        self.ascii_column = self.hex_column + HEX_VIEW_ROW_BYTES * 3 + 1
+        self.update_scroll_bars()
+
+    def row_count(self) -> int:
+        return (self.size + HEX_VIEW_ROW_BYTES - 1) // HEX_VIEW_ROW_BYTES
+
+    def visible_rows(self) -> int:
+        return max(1, self.viewport().height() // self.row_height)
+
+    def update_scroll_bars(self) -> None:
+        visible = self.visible_rows()
+        self.verticalScrollBar().setRange(
+            0, max(0, self.row_count() - visible)
+        )
+        self.verticalScrollBar().setPageStep(visible)
+        width = (self.ascii_column + HEX_VIEW_ROW_BYTES) * self.char_width
+        self.horizontalScrollBar().setRange(
+            0, max(0, width - self.viewport().width())
+        )
+        self.horizontalScrollBar().setPageStep(self.viewport().width())
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self.update_scroll_bars()
+
+    def paintEvent(self, event) -> None:
+        painter = QPainter(self.viewport())
+        palette = self.palette()
+        painter.fillRect(event.rect(), palette.base())
+        painter.translate(-self.horizontalScrollBar().value(), 0)
+        first_row = self.verticalScrollBar().value()
+        ascent = self.fontMetrics().ascent()
+        selection_end = self.selection_start + self.selection_length
+        for index in range(self.visible_rows() + 1):
+            offset = (first_row + index) * HEX_VIEW_ROW_BYTES
+            if offset >= self.size:
+                break
+            row = self.mapping[offset : offset + HEX_VIEW_ROW_BYTES]
+            y = index * self.row_height
+            start = max(self.selection_start, offset) - offset
+            end = min(selection_end, offset + len(row)) - offset
+            if start < end:
+                for column, count in (
+                    (self.hex_column + start * 3, (end - start) * 3 - 1),
+                    (self.ascii_column + start, end - start),
+                ):
+                    painter.fillRect(
+                        column * self.char_width,
+                        y,
+                        count * self.char_width,
+                        self.row_height,
+                        palette.highlight(),
+                    )
+            painter.setPen(palette.text().color())
+            painter.drawText(0, y + ascent, f"{offset:0{self.offset_digits}X}")
+            painter.drawText(
+                self.hex_column * self.char_width,
+                y + ascent,
+                row.hex(" ").upper(),
+            )
+            painter.drawText(
+                self.ascii_column * self.char_width,
+                y + ascent,
+                row.translate(HEX_VIEW_PRINTABLE).decode("ascii"),
+            )
+
+    def mousePressEvent(self, event) -> None:
+        position = event.position()
+        column = int(
+            (position.x() + self.horizontalScrollBar().value())
+            // self.char_width
+        )
+        row = self.verticalScrollBar().value() + int(
+            position.y() // self.row_height
+        )
+        if self.hex_column <= column < self.ascii_column - 1:
+            byte = (column - self.hex_column) // 3
+        elif column >= self.ascii_column:
+            byte = column - self.ascii_column
+        else:
+            return
+        offset = row * HEX_VIEW_ROW_BYTES + min(byte, HEX_VIEW_ROW_BYTES - 1)
+        if offset < self.size:
+            self.select(offset, 1)
+
+    def select(self, offset: int, length: int) -> None:
+        """Highlight a byte range and scroll it into view."""
+        self.selection_start = offset
+        self.selection_length = length
+        row = offset // HEX_VIEW_ROW_BYTES
+        scroll_bar = self.verticalScrollBar()
+        if (
+            not scroll_bar.value()
+            <= row
+            < scroll_bar.value() + (self.visible_rows())
+        ):
+            scroll_bar.setValue(row - self.visible_rows() // 2)
+        self.viewport().update()
+
+    def find(
+        self, pattern: bytes, start: int, progress: QProgressDialog
+    ) -> int:
+        """Find the next occurrence of a byte pattern, wrapping around.
+
+        The search runs over the mapping in chunks so the progress dialog
+        stays responsive and can cancel it.
+        """
+        if not pattern or not self.size:
+            return -1
+        progress.setRange(0, self.size)
+        searched = 0
+        position = start
+        while searched < self.size and not progress.wasCanceled():
+            if position >= self.size:
+                position = 0
+            end = min(self.size, position + HEX_VIEW_SEARCH_CHUNK)
+            found = self.mapping.find(
+                pattern, position, min(self.size, end + len(pattern) - 1)
+            )
+            if found != -1:
+                return found
+            searched += end - position
+            position = end
+            progress.setValue(searched)
+        return -1
+
+    def close_file(self) -> None:
+        """Unmap and close the file."""
+        if self.size:
+            self.mapping.close()
+        self.file.close()
+
+
+class HexViewer(QWidget):
+    """Tab that shows a binary file with offset jump and byte search."""
+
+    def __init__(self, file_path: str, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.view = HexView(file_path)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        toolbar = QHBoxLayout()
+        self.offset_input = QLineEdit()
+        self.offset_input.setPlaceholderText("Offset, e.g. 4096 or 0x1000")
+        self.offset_input.returnPressed.connect(self.go_to_offset)
+        self.go_button = QPushButton("Go")
+        self.go_button.clicked.connect(self.go_to_offset)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Find bytes")
+        self.search_input.returnPressed.connect(self.find_next)
+        self.search_mode = QComboBox()
+        self.search_mode.addItems(["Hex", "Text"])
+        self.find_button = QPushButton("Find Next")
+        self.find_button.clicked.connect(self.find_next)
+        self.position_label = QLabel()
+        toolbar.addWidget(QLabel("Offset:"))
+        toolbar.addWidget(self.offset_input)
+        toolbar.addWidget(self.go_button)
+        toolbar.addWidget(QLabel("Find:"))
+        toolbar.addWidget(self.search_input)
+        toolbar.addWidget(self.search_mode)
+        toolbar.addWidget(self.find_button)
+        toolbar.addWidget(self.position_label)
+        layout.addLayout(toolbar)
+        layout.addWidget(self.view)
+        self.update_position_label()
+
+    def update_position_label(self) -> None:
+        self.position_label.setText(
+            f"0x{self.view.selection_start:X} of {self.view.size} bytes"
+        )
+
+    def go_to_offset(self) -> None:
+        """Jump to the offset typed in the offset box."""
+        try:
+            offset = int(self.offset_input.text().strip(), 0)
+        except ValueError:
+            QMessageBox.warning(self, "Hex View", "Invalid offset.")
+            return
+        if not 0 <= offset < max(1, self.view.size):
+            QMessageBox.warning(self, "Hex View", "Offset is out of range.")
+            return
+        self.view.select(offset, 1)
+        self.update_position_label()
+
+    def search_pattern(self) -> Optional[bytes]:
+        text = self.search_input.text()
+        if self.search_mode.currentText() == "Text":
+            return text.encode("utf-8")
+        try:
+            return bytes.fromhex(text)
+        except ValueError:
+            QMessageBox.warning(self, "Hex View", "Invalid hex bytes.")
+            return None
+
+    def close_file(self) -> None:
+        self.view.close_file()
+
+    def find_next(self) -> None:
+        """Find the next occurrence of the search bytes."""
+        pattern = self.search_pattern()
+        if not pattern:
+            return
+        progress = QProgressDialog("Searching...", "Cancel", 0, 0, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(300)
+        start = self.view.selection_start + (
+            1 if self.view.selection_length else 0
+        )
+        found = self.view.find(pattern, start, progress)
+        cancelled = progress.wasCanceled()
+        progress.close()
+        if found == -1:
+            if not cancelled:
+                QMessageBox.information(self, "Hex View", "No match found.")
+            return
+        self.view.select(found, len(pattern))
+        self.update_position_label()
+
+
+def newline_offsets(data: bytes, base: int = 0) -> array:
+    """Return the offsets of the newlines in data, shifted by base."""
+    offsets = array(
+        "q",
+        accumulate(
+            map((1).__add__, map(len, data.split(b"\n"))), initial=base - 1
+        ),
+    )
+    del offsets[0]
+    offsets.pop()
+    return offsets
+
+
+def newline_blocks(data, cancelled: Callable = None) -> Optional[array]:
+    """Count newlines per PIECE_LINE_BLOCK bytes of data.
+
+    Entry ``i`` of the result is the number of newlines before offset
+    ``i * PIECE_LINE_BLOCK``. Returns None if ``cancelled()`` turns true.
+    """
+    blocks = array("q", [0])
+    total = 0
+    for slab_start in range(0, len(data), PIECE_INDEX_SLAB):
+        if cancelled is not None and cancelled():
+            return None
+        slab = data[slab_start : slab_start + PIECE_INDEX_SLAB]
+        for start in range(0, len(slab), PIECE_LINE_BLOCK):
+            total += slab.count(b"\n", start, start + PIECE_LINE_BLOCK)
+            blocks.append(total)
+    return blocks
+
+
+class PieceNode:
+    """Treap node: one piece plus totals for its subtree.
+
+    Nodes never change once built, except that set_line_index fills in
+    line counts that were still unknown.
+    """
+
+    __slots__ = (
+        "left",
+        "right",
+        "priority",
+        "source",
+        "start",
+        "length",
+        "newlines",
+        "size",
+        "lines",
+    )
+
+    def __init__(
+        self,
+        left: Optional["PieceNode"],
+        right: Optional["PieceNode"],
+        priority: float,
+        source: int,
+        start: int,
+        length: int,
+        newlines: Optional[int],
+    ):
+        self.left = left
+        self.right = right
+        self.priority = priority
+        self.source = source
+        self.start = start
+        self.length = length
+        self.newlines = newlines
+        self.size = length
+        self.lines = newlines
+        for child in (left, right):
+            if child is not None:
+                self.size += child.size
+                if self.lines is not None:
+                    self.lines = (
+                        None
+                        if child.lines is None
+                        else self.lines + child.lines
+                    )
+
+
+class PieceSnapshot:
+    """A frozen version of a piece table that any thread may read."""
+
+    def __init__(self, buffers: Tuple, root: Optional[PieceNode]):
+        self.buffers = buffers
+        self.root = root
+
+    def __len__(self) -> int:
+        return self.root.size if self.root is not None else 0
+
+    def chunks(self, start: int = 0, end: Optional[int] = None) -> Iterator:
+        """Yield the bytes between two offsets in pieces of bounded size."""
+        end = len(self) if end is None else min(end, len(self))
+        stack = []
+        node = self.root
+        offset = 0
+        while stack or node is not None:
+            if node is not None:
+                if offset >= end or offset + node.size <= start:
+                    node = None
+                    continue
+                stack.append((node, offset))
+                node = node.left
+                continue
+            node, offset = stack.pop()
+            piece_start = offset + (node.left.size if node.left else 0)
+            low = max(start, piece_start)
+            high = min(end, piece_start + node.length)
+            buffer = self.buffers[node.source]
+            shift = node.start - piece_start
+            for position in range(low, high, PIECE_READ_CHUNK):
+                stop = min(high, position + PIECE_READ_CHUNK)
+                yield bytes(buffer[position + shift : stop + shift])
+            offset = piece_start + node.length
+            node = node.right
+
+    def read(self, start: int, end: int) -> bytes:
+        return b"".join(self.chunks(max(0, start), end))
+
+    def find(
+        self, pattern: bytes, start: int = 0, cancelled: Callable = None
+    ) -> int:
+        """Return the offset of the first match at or after start, or -1."""
+        position = start
+        tail = b""
+        for chunk in self.chunks(start):
+            if cancelled is not None and cancelled():
+                return -1
+            data = tail + chunk
+            found = data.find(pattern)
+            if found != -1:
+                return position - len(tail) + found
+            tail = data[max(0, len(data) - len(pattern) + 1) :]
+            position += len(chunk)
+        return -1
+
+    def write_to(self, file) -> None:
+        for chunk in self.chunks():
+            file.write(chunk)
+
+
+class PieceTable:
+    """Text buffer over a read-only original and an append-only buffer.
+
+    The text is a sequence of pieces, each a range of one of the two
+    buffers, kept in an immutable treap ordered by position with byte and
+    newline totals per subtree. Inserts, deletes and line lookups take
+    O(log n) in the number of pieces, and an edit never changes an
+    existing tree, so any tree is a snapshot: background saves and
+    searches read one while editing goes on, and undo and redo swap
+    trees. Offsets are in bytes. Newlines of the original are counted
+    once set_line_index receives its newline_blocks; until then line
+    lookups return None. Nothing here depends on Qt.
+    """
+
+    def __init__(self, original=b""):
+        self.original = original
+        self.added = bytearray()
+        self.original_blocks: Optional[array] = None
+        self.added_newlines = array("q")
+        self.root = (
+            self.leaf(PIECE_ORIGINAL, 0, len(original)) if original else None
+        )
+        self.saved = self.root
+        self.undo_stack: List[Optional[PieceNode]] = []
+        self.redo_stack: List[Optional[PieceNode]] = []
+
+    def __len__(self) -> int:
+        return self.root.size if self.root is not None else 0
+
+    def snapshot(self) -> PieceSnapshot:
+        return PieceSnapshot((self.original, self.added), self.root)
+
+    def read(self, start: int, end: int) -> bytes:
+        return self.snapshot().read(start, end)
+
+    def is_modified(self) -> bool:
+        return self.root is not self.saved
+
+    def newlines_before(self, source: int, offset: int) -> Optional[int]:
+        if source == PIECE_ADDED:
+            return bisect_left(self.added_newlines, offset)
+        if self.original_blocks is None:
+            return None
+        block = offset // PIECE_LINE_BLOCK
+        return self.original_blocks[block] + self.original[
+            block * PIECE_LINE_BLOCK : offset
+        ].count(b"\n")
+
+    def count_newlines(
+        self, source: int, start: int, length: int
+    ) -> Optional[int]:
+        before = self.newlines_before(source, start)
+        if before is None:
+            return None
+        return self.newlines_before(source, start + length) - before
+
+    def nth_newline(self, source: int, start: int, n: int) -> int:
+        """Return the buffer offset of the n-th newline from start."""
+        if source == PIECE_ADDED:
+            return self.added_newlines[
+                bisect_left(self.added_newlines, start) + n - 1
+            ]
+        target = self.newlines_before(source, start) + n
+        block = bisect_left(self.original_blocks, target) - 1
+        base = block * PIECE_LINE_BLOCK
+        offsets = newline_offsets(
+            self.original[base : base + PIECE_LINE_BLOCK], base
+        )
+        return offsets[target - self.original_blocks[block] - 1]
+
+    def leaf(self, source: int, start: int, length: int) -> PieceNode:
+        return PieceNode(
+            None,
+            None,
+            random.random(),
+            source,
+            start,
+            length,
+            self.count_newlines(source, start, length),
+        )
+
+    def piece(
+        self, node: PieceNode, left, right, start: int, length: int
+    ) -> PieceNode:
+        newlines = (
+            node.newlines
+            if length == node.length
+            else self.count_newlines(node.source, start, length)
+        )
+        return PieceNode(
+            left, right, node.priority, node.source, start, length, newlines
+        )
+
+    def with_children(self, node: PieceNode, left, right) -> PieceNode:
+        return PieceNode(
+            left,
+            right,
+            node.priority,
+            node.source,
+            node.start,
+            node.length,
+            node.newlines,
+        )
+
+    def split(self, node: Optional[PieceNode], offset: int) -> Tuple:
+        """Split a tree into the text before and after an offset."""
+        if node is None or offset <= 0:
+            return None, node
+        if offset >= node.size:
+            return node, None
+        left_size = node.left.size if node.left else 0
+        if offset <= left_size:
+            left, right = self.split(node.left, offset)
+            return left, self.with_children(node, right, node.right)
+        offset -= left_size
+        if offset >= node.length:
+            left, right = self.split(node.right, offset - node.length)
+            return self.with_children(node, node.left, left), right
+        return (
+            self.piece(node, node.left, None, node.start, offset),
+            self.piece(
+                node,
+                None,
+                node.right,
+                node.start + offset,
+                node.length - offset,
+            ),
+        )
+
+    def merge(self, left: Optional[PieceNode], right: Optional[PieceNode]):
+        """Join two trees, all of left's text coming first."""
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            return self.with_children(
+                left, left.left, self.merge(left.right, right)
+            )
+        return self.with_children(
+            right, self.merge(left, right.left), right.right
+        )
+
+    def extend_last(self, node: PieceNode, length: int) -> PieceNode:
+        if node.right is not None:
+            return self.with_children(
+                node, node.left, self.extend_last(node.right, length)
+            )
+        return self.piece(
+            node, node.left, None, node.start, node.length + length
+        )
+
+    def checkpoint(self) -> None:
+        """Start a new undo step with the current text."""
+        self.undo_stack.append(self.root)
+        if len(self.undo_stack) > PIECE_UNDO_LIMIT:
+            del self.undo_stack[0]
+        self.redo_stack.clear()
+
+    def insert(self, offset: int, data: bytes) -> None:
+        """Insert bytes at an offset.
+
+        Text typed right after the previous insert extends its piece
+        instead of adding a new one.
+        """
+        if not data:
+            return
+        start = len(self.added)
+        self.added += data
+        self.added_newlines.extend(newline_offsets(data, start))
+        left, right = self.split(self.root, offset)
+        last = left
+        while last is not None and last.right is not None:
+            last = last.right
+        if (
+            last is not None
+            and last.source == PIECE_ADDED
+            and last.start + last.length == start
+        ):
+            left = self.extend_last(left, len(data))
+        else:
+            left = self.merge(left, self.leaf(PIECE_ADDED, start, len(data)))
+        self.root = self.merge(left, right)
+
+    def delete(self, start: int, end: int) -> None:
+        """Delete the bytes between two offsets."""
+        if end <= start:
+            return
+        left, rest = self.split(self.root, start)
+        _, right = self.split(rest, end - start)
+        self.root = self.merge(left, right)
+
+    def undo(self) -> bool:
+        if not self.undo_stack:
+            return False
+        self.redo_stack.append(self.root)
+        self.root = self.undo_stack.pop()
+        return True
+
+    def redo(self) -> bool:
+        if not self.redo_stack:
+            return False
+        self.undo_stack.append(self.root)
+        self.root = self.redo_stack.pop()
+        return True
+
+    def set_line_index(self, blocks: array) -> None:
+        """Take the original's newline_blocks and count lines everywhere.
+
+        The counts are filled into the nodes of every kept tree in place,
+        so trees that snapshots hold stay the same objects as the
+        table's own versions.
+        """
+        self.original_blocks = blocks
+
+        def recount(node: Optional[PieceNode]) -> None:
+            if node is None or node.lines is not None:
+                return
+            recount(node.left)
+            recount(node.right)
+            node.newlines = self.count_newlines(
+                node.source, node.start, node.length
+            )
+            node.lines = node.newlines
+            for child in (node.left, node.right):
+                if child is not None:
+                    node.lines += child.lines
+
+        recount(self.root)
+        recount(self.saved)
+        for root in self.undo_stack + self.redo_stack:
+            recount(root)
+
+    def rebase(self, snapshot: PieceSnapshot) -> Optional[PieceNode]:
+        """Move every kept version onto a saved copy of a snapshot.
+
+        The old original is rebuilt as a tree of pieces: the ranges the
+        snapshot kept point at their offsets in the saved file, and the
+        ranges it dropped are copied to the added buffer, since undo may
+        still bring them back. Each original piece of a version becomes
+        a slice of that tree. Returns the snapshot's tree in the new
+        terms. The caller then sets original to the saved file; its lines
+        are counted again once set_line_index receives its newline_blocks.
+        """
+        self.original_blocks = None
+        whole = None
+        stack = []
+        node = snapshot.root
+        position = 0
+        copied = 0
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+                continue
+            node = stack.pop()
+            if node.source == PIECE_ORIGINAL:
+                if copied < node.start:
+                    whole = self.merge(
+                        whole, self.copy_original(copied, node.start)
+                    )
+                whole = self.merge(
+                    whole,
+                    self.leaf(PIECE_ORIGINAL, position, node.length),
+                )
+                copied = node.start + node.length
+            position += node.length
+            node = node.right
+        if copied < len(self.original):
+            whole = self.merge(
+                whole, self.copy_original(copied, len(self.original))
+            )
+        moved = {}
+
+        def move(node: Optional[PieceNode]) -> Optional[PieceNode]:
+            if node is None:
+                return None
+            if id(node) not in moved:
+                left = move(node.left)
+                right = move(node.right)
+                if node.source == PIECE_ADDED:
+                    moved[id(node)] = self.with_children(node, left, right)
+                else:
+                    _, rest = self.split(whole, node.start)
+                    middle, _ = self.split(rest, node.length)
+                    moved[id(node)] = self.merge(
+                        self.merge(left, middle), right
+                    )
+            return moved[id(node)]
+
+        saved = move(snapshot.root)
+        self.root = move(self.root)
+        self.saved = move(self.saved)
+        self.undo_stack = [move(root) for root in self.undo_stack]
+        self.redo_stack = [move(root) for root in self.redo_stack]
+        return saved
+
+    def copy_original(self, start: int, end: int) -> PieceNode:
+        """Copy a range of the original to the added buffer as a piece."""
+        data = self.original[start:end]
+        added_start = len(self.added)
+        self.added += data
+        self.added_newlines.extend(newline_offsets(data, added_start))
+        return self.leaf(PIECE_ADDED, added_start, len(data))
+
+    def line_count(self) -> Optional[int]:
+        if self.root is None:
+            return 1
+        return None if self.root.lines is None else self.root.lines + 1
+
+    def line_start(self, line: int) -> Optional[int]:
+        """Return the offset where a zero-based line starts."""
+        if line <= 0:
+            return 0
+        node = self.root
+        if node is None or node.lines is None or line > node.lines:
+            return None
+        offset = 0
+        while node is not None:
+            left_lines = node.left.lines if node.left else 0
+            if line <= left_lines:
+                node = node.left
+                continue
+            line -= left_lines
+            offset += node.left.size if node.left else 0
+            if line <= node.newlines:
+                newline = self.nth_newline(node.source, node.start, line)
+                return offset + newline - node.start + 1
+            line -= node.newlines
+            offset += node.length
+            node = node.right
+        return None
+
+    def line_at(self, offset: int) -> Optional[int]:
+        """Return the zero-based line that contains an offset."""
+        node = self.root
+        if node is None:
+            return 0
+        if node.lines is None:
+            return None
+        line = 0
+        while node is not None:
+            left_size = node.left.size if node.left else 0
+            if offset < left_size:
+                node = node.left
+                continue
+            line += node.left.lines if node.left else 0
+            offset -= left_size
+            if offset < node.length:
+                return line + self.count_newlines(
+                    node.source, node.start, offset
+                )
+            line += node.newlines
+            offset -= node.length
+            node = node.right
+        return line
+
+
+def large_text_format(file_path: str) -> Optional[Tuple[str, str]]:
+    """Return the encoding and newline of a file to edit as a large file.
+
+    Returns None for files under LARGE_FILE_THRESHOLD, and for files whose
+    encoding or newline style the byte-level large file editor cannot
+    handle.
+    """
+    if os.path.getsize(file_path) < LARGE_FILE_THRESHOLD:
+        return None
+    with open(file_path, "rb") as file:
+        sample = file.read(LARGE_FILE_SCAN)
+    encoding = detect_encoding(sample, final=False)
+    newline = detect_newline(sample.decode("latin-1"))
+    if (
+        codecs.lookup(encoding).name not in ASCII_COMPATIBLE_ENCODINGS
+        or newline == "\r"
+    ):
+        return None
+    return encoding, newline
+
+
+def write_snapshot(snapshot: PieceSnapshot, file_path: str) -> str:
+    """Stream a piece table snapshot to a temporary file beside a file.
+
+    Returns the temporary file's path. The caller renames it over the
+    file once it has unmapped the file.
+    """
+    target = os.path.realpath(file_path)
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(target)}.",
+        suffix=".tmp",
+        dir=os.path.dirname(target),
+    )
+    try:
+        with os.fdopen(fd, "wb") as file:
+            snapshot.write_to(file)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(target):
+            os.chmod(temp_path, os.stat(target).st_mode & 0o7777)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+class LargeFileSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class LineIndexer(QRunnable):
+    """Count the newlines of a large file's original text."""
+
+    def __init__(self, data):
+        super().__init__()
+        self.data = data
+        self.cancelled = False
+        self.signals = LargeFileSignals()
+
+    def run(self) -> None:
+        blocks = newline_blocks(self.data, lambda: self.cancelled)
+        if blocks is not None:
+            self.signals.finished.emit(blocks)
+
+
+class PieceSearchWorker(QRunnable):
+    """Search a piece table snapshot, wrapping around at the end."""
+
+    def __init__(self, snapshot: PieceSnapshot, pattern: bytes, start: int):
+        super().__init__()
+        self.snapshot = snapshot
+        self.pattern = pattern
+        self.start = start
+        self.cancelled = False
+        self.signals = LargeFileSignals()
+
+    def run(self) -> None:
+        found = self.snapshot.find(
+            self.pattern, self.start, lambda: self.cancelled
+        )
+        if found == -1 and self.start and not self.cancelled:
+            found = self.snapshot.find(self.pattern, 0, lambda: self.cancelled)
+        if not self.cancelled:
+            self.signals.finished.emit(found)
+
+
+class PieceTableSaver(QRunnable):
+    """Write a piece table snapshot to disk off the GUI thread."""
+
+    def __init__(self, snapshot: PieceSnapshot, file_path: str):
+        super().__init__()
+        self.snapshot = snapshot
+        self.file_path = file_path
+        self.temp_path: Optional[str] = None
+        self.signals = LargeFileSignals()
+
+    def run(self) -> None:
+        try:
+            self.temp_path = write_snapshot(self.snapshot, self.file_path)
+        except OSError as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(self.temp_path)
+
+
+class LargeFileView(QAbstractScrollArea):
+    """Editor for very large files, drawing only the visible lines.
+
+    The text lives in a PieceTable over a memory map of the file, so
+    opening takes the same time whatever the size and an edit costs
+    O(log n). Lines longer than LARGE_FILE_LINE_LIMIT bytes are shown
+    cut into rows counted from the start of the line, so a row starts at
+    the same offset however it is reached. Until the background line count finishes,
+    the scroll bar moves by bytes rather than lines.
+    """
+
+    changed = pyqtSignal()
+    cursor_moved = pyqtSignal()
+
+    def __init__(
+        self,
+        file_path: str,
+        encoding: str,
+        newline: str,
+        read_only: bool = False,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.temp_path: Optional[str] = None
+        self.map_file(file_path)
+        self.table = PieceTable(self.mapping)
+        self.encoding = encoding
+        self.utf8 = codecs.lookup(encoding).name in ("utf-8", "utf-8-sig")
+        self.newline = newline.encode("ascii")
+        self.read_only = read_only
+        self.top = 0
+        self.cursor = 0
+        self.anchor = 0
+        self.preferred_column: Optional[int] = None
+        self.typing_at: Optional[int] = None
+        self.scroll_shift = 0
+        self.line_scan: Tuple = (None, 0, 0)
+
+        self.setFont(
+            QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+        )
+        self.char_width = self.fontMetrics().horizontalAdvance("0")
+        self.row_height = self.fontMetrics().height()
+        self.viewport().setCursor(Qt.CursorShape.IBeamCursor)
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.verticalScrollBar().valueChanged.connect(self.on_scrolled)
+        self.update_scroll_bars()
+
+    def map_file(self, file_path: str) -> None:
+        self.file = open(file_path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.mapping = (
+            mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if size
+            else b""
+        )
+
+    def visible_rows(self) -> int:
+        return max(1, self.viewport().height() // self.row_height)
+
+    def read(self, start: int, end: int) -> bytes:
+        return self.table.read(max(0, start), end)
+
+    def decode(self, data: bytes) -> str:
+        return data.decode(self.encoding, errors="surrogateescape")
+
+    def line_start_of(self, offset: int) -> int:
+        """Return where the line that holds an offset starts.
+
+        Uses the line index once it is ready. Until then it scans back
+        for a newline, resuming from the previous scan of the same line.
+        """
+        line = self.table.line_at(offset)
+        if line is not None:
+            return self.table.line_start(line)
+        root, start, scanned = self.line_scan
+        known = root is self.table.root and start <= offset
+        floor = scanned if known else 0
+        position = offset
+        while position > floor:
+            chunk_start = max(floor, position - LARGE_FILE_SCAN)
+            newline = self.read(chunk_start, position).rfind(b"\n")
+            if newline != -1:
+                start = chunk_start + newline + 1
+                break
+            position = chunk_start
+        else:
+            if not known:
+                start = 0
+        self.line_scan = (self.table.root, start, max(offset, floor))
+        return start
+
+    def row_boundary(self, line_start: int, row: int) -> int:
+        """Return where a row of a long line starts.
+
+        Rows start every LARGE_FILE_LINE_LIMIT bytes from the line start,
+        moved forward past UTF-8 continuation bytes.
+        """
+        position = line_start + row * LARGE_FILE_LINE_LIMIT
+        if row and self.utf8:
+            data = self.read(position, position + 3)
+            skip = 0
+            while skip < len(data) and 0x80 <= data[skip] < 0xC0:
+                skip += 1
+            position += skip
+        return position
+
+    def line_bounds(self, start: int) -> Tuple[int, Optional[int]]:
+        """Return where the text of a row ends and where the next begins.
+
+        The next start is None for the last row.
+        """
+        data = self.read(start, start + LARGE_FILE_LINE_LIMIT + 4)
+        newline = data.find(b"\n")
+        if newline == -1:
+            end, next_start = len(data), None
+        else:
+            end = (
+                newline - 1
+                if data[newline - 1 : newline] == b"\r"
+                else newline
+            )
+            next_start = start + newline + 1
+        if end > LARGE_FILE_LINE_LIMIT - 4:
+            line_start = self.line_start_of(start)
+            cut = self.row_boundary(
+                line_start, (start - line_start) // LARGE_FILE_LINE_LIMIT + 1
+            )
+            if cut < start + end:
+                return cut, cut
+        return start + end, next_start
+
+    def row_start(self, offset: int) -> int:
+        """Return the start of the row that shows an offset."""
+        line_start = self.line_start_of(offset)
+        row = (offset - line_start) // LARGE_FILE_LINE_LIMIT
+        while row > 0:
+            start = self.row_boundary(line_start, row)
+            if (
+                start <= offset
+                and start < len(self.table)
+                and not self.read(start, start + 2).startswith(
+                    (b"\n", b"\r\n")
+                )
+            ):
+                return start
+            row -= 1
+        return line_start
+
+    def next_row(self, start: int) -> Optional[int]:
+        return self.line_bounds(start)[1]
+
+    def previous_row(self, start: int) -> Optional[int]:
+        return self.row_start(start - 1) if start > 0 else None
+
+    def column(self, start: int, offset: int) -> int:
+        """Return the display column of an offset within a row."""
+        text = self.decode(self.read(start, offset))
+        return len(text.expandtabs(LARGE_FILE_TAB_WIDTH))
+
+    def offset_at_column(self, start: int, column: int) -> int:
+        """Return the offset in a row closest to a display column."""
+        end, _ = self.line_bounds(start)
+        text = self.decode(self.read(start, end))
+        position = 0
+        for index, char in enumerate(text):
+            width = (
+                LARGE_FILE_TAB_WIDTH - position % LARGE_FILE_TAB_WIDTH
+                if char == "\t"
+                else 1
+            )
+            if position + width / 2 > column:
+                text = text[:index]
+                break
+            position += width
+        return start + len(
+            text.encode(self.encoding, errors="surrogateescape")
+        )
+
+    def next_char(self, offset: int) -> int:
+        data = self.read(offset, offset + 4)
+        step = 1
+        while self.utf8 and step < len(data) and 0x80 <= data[step] < 0xC0:
+            step += 1
+        return min(len(self.table), offset + step)
+
+    def previous_char(self, offset: int) -> int:
+        data = self.read(offset - 4, offset)
+        index = len(data) - 1
+        while self.utf8 and index > 0 and 0x80 <= data[index] < 0xC0:
+            index -= 1
+        return max(0, offset - len(data) + index)
+
+    def move_left(self, offset: int) -> int:
+        start = self.row_start(offset)
+        if offset == start and start > 0:
+            end, _ = self.line_bounds(self.previous_row(start))
+            if end < start:
+                return end
+        return self.previous_char(offset)
+
+    def move_right(self, offset: int) -> int:
+        start = self.row_start(offset)
+        end, next_start = self.line_bounds(start)
+        if offset >= end:
+            if next_start is None:
+                return offset
+            if next_start > offset:
+                return next_start
+        return self.next_char(offset)
+
+    def move_vertically(self, offset: int, rows: int) -> int:
+        start = self.row_start(offset)
+        if self.preferred_column is None:
+            self.preferred_column = self.column(start, offset)
+        for _ in range(abs(rows)):
+            row = (
+                self.next_row(start) if rows > 0 else self.previous_row(start)
+            )
+            if row is None:
+                return len(self.table) if rows > 0 else 0
+            start = row
+        return self.offset_at_column(start, self.preferred_column)
+
+    def update_scroll_bars(self) -> None:
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.blockSignals(True)
+        line_count = self.table.line_count()
+        if line_count is not None and line_count < 2**31:
+            self.scroll_shift = -1
+            scroll_bar.setRange(0, line_count - 1)
+            scroll_bar.setValue(self.table.line_at(self.top))
+        else:
+            size = len(self.table)
+            self.scroll_shift = max(0, size.bit_length() - 30)
+            scroll_bar.setRange(0, size >> self.scroll_shift)
+            scroll_bar.setValue(self.top >> self.scroll_shift)
+        scroll_bar.setPageStep(self.visible_rows())
+        scroll_bar.blockSignals(False)
+        self.horizontalScrollBar().setRange(
+            0, LARGE_FILE_LINE_LIMIT * self.char_width
+        )
+        self.horizontalScrollBar().setPageStep(self.viewport().width())
+
+    def on_scrolled(self, value: int) -> None:
+        if self.scroll_shift < 0:
+            self.top = self.table.line_start(value) or 0
+        else:
+            self.top = self.row_start(value << self.scroll_shift)
+        self.viewport().update()
+
+    def scroll_rows(self, rows: int) -> None:
+        for _ in range(abs(rows)):
+            row = (
+                self.next_row(self.top)
+                if rows > 0
+                else self.previous_row(self.top)
+            )
+            if row is None:
+                break
+            self.top = row
+        self.update_scroll_bars()
+        self.viewport().update()
+
+    def set_line_index(self, blocks: array) -> None:
+        self.table.set_line_index(blocks)
+        self.update_scroll_bars()
+        self.cursor_moved.emit()
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self.update_scroll_bars()
+
+    def wheelEvent(self, event) -> None:
+        steps = event.angleDelta().y() // 120
+        if steps:
+            self.scroll_rows(-steps * LARGE_FILE_WHEEL_LINES)
+        else:
+            super().wheelEvent(event)
+
+    def paintEvent(self, event) -> None:
+        painter = QPainter(self.viewport())
+        palette = self.palette()
+        painter.fillRect(event.rect(), palette.base())
+        painter.translate(-self.horizontalScrollBar().value(), 0)
+        ascent = self.fontMetrics().ascent()
+        selection_start = min(self.cursor, self.anchor)
+        selection_end = max(self.cursor, self.anchor)
+        start = self.top
+        for index in range(self.visible_rows() + 1):
+            end, next_start = self.line_bounds(start)
+            y = index * self.row_height
+            if selection_start <= end and selection_end > start:
+                left = self.column(start, max(start, selection_start))
+                right = self.column(start, min(end, selection_end))
+                if selection_end > end and next_start is not None:
+                    right += 1
+                painter.fillRect(
+                    left * self.char_width,
+                    y,
+                    (right - left) * self.char_width,
+                    self.row_height,
+                    palette.highlight(),
+                )
+            painter.setPen(palette.text().color())
+            text = self.decode(self.read(start, end))
+            painter.drawText(
+                0, y + ascent, text.expandtabs(LARGE_FILE_TAB_WIDTH)
+            )
+            if start <= self.cursor <= end and (
+                next_start is None or self.cursor < next_start
+            ):
+                x = self.column(start, self.cursor) * self.char_width
+                painter.fillRect(x, y, 1, self.row_height, palette.text())
+            if next_start is None:
+                break
+            start = next_start
+
+    def ensure_cursor_visible(self) -> None:
+        """Scroll so that the row with the cursor is on screen."""
+        row = self.row_start(self.cursor)
+        if row < self.top:
+            self.top = row
+        else:
+            start = self.top
+            for _ in range(self.visible_rows() - 1):
+                if start == row:
+                    break
+                start = self.next_row(start)
+                if start is None:
+                    break
+            if start != row:
+                self.top = row
+                for _ in range(self.visible_rows() - 1):
+                    if self.top == 0:
+                        break
+                    self.top = self.previous_row(self.top)
+        x = self.column(row, self.cursor) * self.char_width
+        scroll_bar = self.horizontalScrollBar()
+        if x < scroll_bar.value():
+            scroll_bar.setValue(x)
+        elif x >= scroll_bar.value() + self.viewport().width():
+            scroll_bar.setValue(x - self.viewport().width() + self.char_width)
+        self.update_scroll_bars()
+        self.viewport().update()
+        self.cursor_moved.emit()
+
+    def set_cursor(self, offset: int, keep_anchor: bool = False) -> None:
+        self.cursor = max(0, min(offset, len(self.table)))
+        if not keep_anchor:
+            self.anchor = self.cursor
+        self.typing_at = None
+        self.ensure_cursor_visible()
+
+    def select(self, start: int, end: int) -> None:
+        """Select a byte range and scroll it into view."""
+        self.set_cursor(start)
+        self.set_cursor(end, keep_anchor=True)
+
+    def selected_range(self) -> Tuple[int, int]:
+        return min(self.cursor, self.anchor), max(self.cursor, self.anchor)
+
+    def offset_at(self, position) -> int:
+        start = self.top
+        for _ in range(int(position.y() // self.row_height)):
+            next_start = self.next_row(start)
+            if next_start is None:
+                break
+            start = next_start
+        column = (
+            position.x() + self.horizontalScrollBar().value()
+        ) / self.char_width
+        return self.offset_at_column(start, column)
+
+    def mousePressEvent(self, event) -> None:
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.preferred_column = None
+            self.set_cursor(
+                self.offset_at(event.position()),
+                keep_anchor=bool(
+                    event.modifiers() & Qt.KeyboardModifier.ShiftModifier
+                ),
+            )
+
+    def mouseMoveEvent(self, event) -> None:
+        if event.buttons() & Qt.MouseButton.LeftButton:
+            self.preferred_column = None
+            self.set_cursor(self.offset_at(event.position()), True)
+
+    def replace(self, start: int, end: int, data: bytes) -> None:
+        """Replace a byte range, starting an undo step unless typing."""
+        if self.read_only:
+            return
+        if not (self.typing_at == start == end and data.isalnum()):
+            self.table.checkpoint()
+        self.table.delete(start, end)
+        self.table.insert(start, data)
+        self.cursor = self.anchor = start + len(data)
+        self.preferred_column = None
+        self.ensure_cursor_visible()
+        self.typing_at = self.cursor
+        self.changed.emit()
+
+    def undo(self) -> None:
+        if not self.read_only and self.table.undo():
+            self.after_undo()
+
+    def redo(self) -> None:
+        if not self.read_only and self.table.redo():
+            self.after_undo()
+
+    def after_undo(self) -> None:
+        self.set_cursor(self.cursor)
+        self.changed.emit()
+
+    def selected_bytes(self) -> bytes:
+        return self.read(*self.selected_range())
+
+    def keyPressEvent(self, event) -> None:
+        key = event.key()
+        shift = bool(event.modifiers() & Qt.KeyboardModifier.ShiftModifier)
+        control = bool(event.modifiers() & Qt.KeyboardModifier.ControlModifier)
+        start, end = self.selected_range()
+        clipboard = QApplication.clipboard()
+        if event.matches(QKeySequence.StandardKey.Undo):
+            self.undo()
+        elif event.matches(QKeySequence.StandardKey.Redo):
+            self.redo()
+        elif event.matches(QKeySequence.StandardKey.Copy):
+            if start < end:
+                clipboard.setText(self.decode(self.selected_bytes()))
+        elif event.matches(QKeySequence.StandardKey.Cut):
+            if start < end and not self.read_only:
+                clipboard.setText(self.decode(self.selected_bytes()))
+                self.replace(start, end, b"")
+        elif event.matches(QKeySequence.StandardKey.Paste):
+            text = clipboard.text().replace("\r\n", "\n")
+            text = text.replace("\n", self.newline.decode("ascii"))
+            self.replace(
+                start,
+                end,
+                text.encode(self.encoding, errors="replace"),
+            )
+        elif event.matches(QKeySequence.StandardKey.SelectAll):
+            self.select(0, len(self.table))
+        elif key in (Qt.Key.Key_Left, Qt.Key.Key_Right):
+            self.preferred_column = None
+            if start < end and not shift:
+                self.set_cursor(start if key == Qt.Key.Key_Left else end)
+            elif key == Qt.Key.Key_Left:
+                self.set_cursor(self.move_left(self.cursor), shift)
+            else:
+                self.set_cursor(self.move_right(self.cursor), shift)
+        elif key in (
+            Qt.Key.Key_Up,
+            Qt.Key.Key_Down,
+            Qt.Key.Key_PageUp,
+            Qt.Key.Key_PageDown,
+        ):
+            rows = 1
+            if key in (Qt.Key.Key_PageUp, Qt.Key.Key_PageDown):
+                rows = max(1, self.visible_rows() - 1)
+            if key in (Qt.Key.Key_Up, Qt.Key.Key_PageUp):
+                rows = -rows
+            self.set_cursor(self.move_vertically(self.cursor, rows), shift)
+        elif key == Qt.Key.Key_Home:
+            self.preferred_column = None
+            self.set_cursor(
+                0 if control else self.row_start(self.cursor), shift
+            )
+        elif key == Qt.Key.Key_End:
+            self.preferred_column = None
+            self.set_cursor(
+                (
+                    len(self.table)
+                    if control
+                    else self.line_bounds(self.row_start(self.cursor))[0]
+                ),
+                shift,
+            )
+        elif key == Qt.Key.Key_Backspace:
+            if start == end:
+                start = self.move_left(self.cursor)
+            self.replace(start, end, b"")
+        elif key == Qt.Key.Key_Delete:
+            if start == end:
+                end = self.move_right(self.cursor)
+            self.replace(start, end, b"")
+        elif key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+            self.replace(start, end, self.newline)
+        elif key == Qt.Key.Key_Tab:
+            self.replace(start, end, b"\t")
+        elif event.text().isprintable() and event.text():
+            data = event.text().encode(self.encoding, errors="replace")
+            self.replace(start, end, data)
+        else:
+            super().keyPressEvent(event)
+
+    def focusNextPrevChild(self, next: bool) -> bool:
+        return False
+
+    def replace_file(
+        self, snapshot: PieceSnapshot, temp_path: str, file_path: str
+    ) -> None:
+        """Rename a saved snapshot over the file and map the result.
+
+        The file is unmapped first: Windows cannot replace a mapped file,
+        and on POSIX the map would keep reading the old, unlinked copy.
+        If the rename fails, the temporary file is mapped instead so the
+        text and undo history stay intact, and OSError is raised.
+        """
+        saved = self.table.rebase(snapshot)
+        self.close_file()
+        try:
+            os.replace(temp_path, os.path.realpath(file_path))
+        except OSError:
+            self.map_file(temp_path)
+            self.temp_path = temp_path
+            raise
+        else:
+            self.map_file(file_path)
+            self.table.saved = saved
+        finally:
+            self.table.original = self.mapping
+            self.line_scan = (None, 0, 0)
+
+    def close_file(self) -> None:
+        """Unmap and close the file."""
+        if len(self.mapping):
+            self.mapping.close()
+        self.file.close()
+        if self.temp_path is not None:
+            try:
+                os.remove(self.temp_path)
+            except OSError:
+                pass
+            self.temp_path = None
+
+
+class LargeFileEditor(QWidget):
+    """Tab that edits a very large file through a LargeFileView.
+
+    Line counting, searches and saves run in the background on snapshots
+    of the piece table, so the view stays editable meanwhile. Once a
+    save is written the file is remapped and its lines counted again.
+    """
+
+    saved = pyqtSignal()
+    save_failed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        file_path: str,
+        encoding: str,
+        newline: str,
+        read_only: bool = False,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.view = LargeFileView(file_path, encoding, newline, read_only)
+        self.pool = QThreadPool(self)
+        self.indexer: Optional[LineIndexer] = None
+        self.search_worker: Optional[PieceSearchWorker] = None
+        self.saver: Optional[PieceTableSaver] = None
+        self.save_pending = False
+        self.report_failures = True
+        self.closed = False
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        toolbar = QHBoxLayout()
+        self.line_input = QLineEdit()
+        self.line_input.setPlaceholderText("Line number")
+        self.line_input.returnPressed.connect(self.go_to_line)
+        self.go_button = QPushButton("Go")
+        self.go_button.clicked.connect(self.go_to_line)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Find text")
+        self.search_input.returnPressed.connect(self.find_next)
+        self.find_button = QPushButton("Find Next")
+        self.find_button.clicked.connect(self.find_next)
+        self.position_label = QLabel()
+        toolbar.addWidget(QLabel("Line:"))
+        toolbar.addWidget(self.line_input)
+        toolbar.addWidget(self.go_button)
+        toolbar.addWidget(QLabel("Find:"))
+        toolbar.addWidget(self.search_input)
+        toolbar.addWidget(self.find_button)
+        toolbar.addWidget(self.position_label)
+        layout.addLayout(toolbar)
+        layout.addWidget(self.view)
+        self.view.cursor_moved.connect(self.update_position_label)
+        self.start_indexer()
+        self.update_position_label()
+
+    def start_indexer(self) -> None:
+        """Count the lines of the mapped file in the background."""
+        if not len(self.view.mapping):
+            self.view.set_line_index(array("q", [0]))
+            return
+        indexer = LineIndexer(self.view.mapping)
+        indexer.setAutoDelete(False)
+        indexer.signals.finished.connect(partial(self.on_indexed, indexer))
+        self.indexer = indexer
+        self.pool.start(indexer)
+
+    def is_modified(self) -> bool:
+        return self.view.table.is_modified()
+
+    def is_read_only(self) -> bool:
+        return self.view.read_only
+
+    def on_indexed(self, indexer: LineIndexer, blocks: array) -> None:
+        if self.closed or indexer is not self.indexer:
+            return
+        self.indexer = None
+        self.view.set_line_index(blocks)
+
+    def update_position_label(self) -> None:
+        table = self.view.table
+        line = table.line_at(self.view.cursor)
+        if line is None:
+            self.position_label.setText(
+                f"Byte {self.view.cursor:,} of {len(table):,}"
+                " (counting lines...)"
+            )
+        else:
+            self.position_label.setText(
+                f"Line {line + 1:,} of {table.line_count():,}"
+            )
+
+    def go_to_line(self) -> None:
+        """Jump to the line number typed in the line box."""
+        table = self.view.table
+        if table.line_count() is None:
+            QMessageBox.information(
+                self, "Large File", "Lines are still being counted."
+            )
+            return
+        try:
+            line = int(self.line_input.text().strip())
+        except ValueError:
+            QMessageBox.warning(self, "Large File", "Invalid line number.")
+            return
+        if not 1 <= line <= table.line_count():
+            QMessageBox.warning(
+                self, "Large File", "Line number is out of range."
+            )
+            return
+        self.view.set_cursor(table.line_start(line - 1))
+        self.view.setFocus()
+
+    def find_next(self) -> None:
+        """Search for the text in the find box after the cursor."""
+        pattern = self.search_input.text().encode(
+            self.view.encoding, errors="replace"
+        )
+        if not pattern:
+            return
+        if self.search_worker is not None:
+            self.search_worker.cancelled = True
+        start, end = self.view.selected_range()
+        worker = PieceSearchWorker(
+            self.view.table.snapshot(), pattern, end if end > start else start
+        )
+        worker.setAutoDelete(False)
+        worker.signals.finished.connect(
+            partial(self.on_found, worker, len(pattern))
+        )
+        self.search_worker = worker
+        self.find_button.setEnabled(False)
+        self.position_label.setText("Searching...")
+        self.pool.start(worker)
+
+    def on_found(
+        self, worker: PieceSearchWorker, length: int, found: int
+    ) -> None:
+        if self.closed or worker is not self.search_worker:
+            return
+        self.search_worker = None
+        self.find_button.setEnabled(True)
+        if found == -1:
+            self.update_position_label()
+            QMessageBox.information(self, "Large File", "No match found.")
+            return
+        self.view.select(found, found + length)
+        self.view.setFocus()
+
+    def stop_indexer(self) -> None:
+        if self.indexer is not None:
+            self.indexer.cancelled = True
+            self.indexer = None
+
+    def save(self, report: bool = True) -> None:
+        """Stream a snapshot of the text to the file in the background.
+
+        A save asked for while another is running starts when it ends;
+        saved is emitted once the last one is done. The line count is
+        stopped, since the saved file is counted again. Failures emit
+        save_failed and, if report is set, are shown in a message box.
+        """
+        self.report_failures = report
+        if self.saver is not None:
+            self.save_pending = True
+            return
+        self.stop_indexer()
+        saver = PieceTableSaver(self.view.table.snapshot(), self.file_path)
+        saver.setAutoDelete(False)
+        saver.signals.finished.connect(partial(self.on_saved, saver))
+        saver.signals.failed.connect(partial(self.on_save_failed, saver))
+        self.saver = saver
+        self.pool.start(saver)
+
+    def save_and_wait(self) -> None:
+        """Write the text to the file now, raising OSError on failure.
+
+        A background save still running is waited for and dropped.
+        """
+        self.stop_indexer()
+        self.pool.waitForDone()
+        if self.saver is not None:
+            if self.saver.temp_path is not None:
+                os.remove(self.saver.temp_path)
+            self.saver = None
+        self.save_pending = False
+        snapshot = self.view.table.snapshot()
+        self.replace_file(snapshot, write_snapshot(snapshot, self.file_path))
+        self.saved.emit()
+
+    def replace_file(self, snapshot: PieceSnapshot, temp_path: str) -> None:
+        """Move a written snapshot over the file and remap it.
+
+        Background work that reads the old map is stopped first. Raises
+        OSError if the file could not be replaced.
+        """
+        self.stop_indexer()
+        if self.search_worker is not None:
+            self.search_worker.cancelled = True
+            self.search_worker = None
+            self.find_button.setEnabled(True)
+        self.pool.waitForDone()
+        try:
+            self.view.replace_file(snapshot, temp_path, self.file_path)
+        finally:
+            self.start_indexer()
+            self.view.update_scroll_bars()
+            self.update_position_label()
+            self.view.changed.emit()
+
+    def on_saved(self, saver: PieceTableSaver, temp_path: str) -> None:
+        if self.closed or saver is not self.saver:
+            return
+        try:
+            self.replace_file(saver.snapshot, temp_path)
+        except OSError as e:
+            self.on_save_failed(saver, str(e))
+            return
+        self.saver = None
+        if self.save_pending:
+            self.start_pending_save()
+        else:
+            self.saved.emit()
+
+    def on_save_failed(self, saver: PieceTableSaver, message: str) -> None:
+        if self.closed or saver is not self.saver:
+            return
+        self.saver = None
+        if self.indexer is None and self.view.table.original_blocks is None:
+            self.start_indexer()
+        self.save_failed.emit(message)
+        if self.report_failures:
+            QMessageBox.critical(
+                self, "Error", f"Could not save {self.file_path}:\n{message}"
+            )
+        self.start_pending_save()
+
+    def start_pending_save(self) -> None:
+        if self.save_pending:
+            self.save_pending = False
+            self.save(self.report_failures)
+
+    def close_file(self) -> None:
+        """Stop background work, then unmap and close the file.
+
+        Results the workers already sent are dropped, and the temporary
+        file of a save that had not been moved over the file is removed.
+        """
+        self.closed = True
+        if self.indexer is not None:
+            self.indexer.cancelled = True
+        if self.search_worker is not None:
+            self.search_worker.cancelled = True
+        self.pool.waitForDone()
+        for worker in (self.indexer, self.search_worker, self.saver):
+            if worker is not None:
+                try:
+                    worker.signals.disconnect()
+                except TypeError:
+                    pass
+        if self.saver is not None and self.saver.temp_path is not None:
+            os.remove(self.saver.temp_path)
+        self.indexer = self.search_worker = self.saver = None
+        self.save_pending = False
+        self.view.close_file()
+
+
+class TableSource:
+    """Memory-mapped records of a JSON-lines or CSV file."""
+
+    def __init__(
+        self,
+        file_path: str,
+        table_format: str,
+        delimiter: str,
+        encoding: str,
+    ):
+        self.file_path = file_path
+        self.table_format = table_format
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.file = open(file_path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mapping = (
+            mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.size
+            else b""
+        )
+
+    def record(self, offsets: array, row: int, end: int):
+        """Parse the record starting at ``offsets[row]``."""
+        stop = offsets[row + 1] if row + 1 < len(offsets) else end
+        return parse_table_record(
+            self.mapping[offsets[row] : stop],
+            self.table_format,
+            self.delimiter,
+            self.encoding,
+        )
+
+    def records(self, offsets: array, end: int) -> Iterator:
+        """Parse every record in order, decoding the file in large blocks."""
+        row = 0
+        while row < len(offsets):
+            stop_row = max(
+                row + 1,
+                bisect_left(offsets, offsets[row] + TABLE_INDEX_CHUNK),
+            )
+            stop = offsets[stop_row] if stop_row < len(offsets) else end
+            text = self.mapping[offsets[row] : stop].decode(
+                self.encoding, "replace"
+            )
+            if self.table_format == "jsonl":
+                for line in text.split("\n"):
+                    line = line.rstrip("\r")
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield line
+            else:
+                reader = csv.reader(
+                    io.StringIO(text, newline=""), delimiter=self.delimiter
+                )
+                for record in reader:
+                    if record:
+                        yield record
+            row = stop_row
+
+    def close(self) -> None:
+        if self.size:
+            self.mapping.close()
+        self.file.close()
+
+
+class TableIndexerSignals(QObject):
+    rows = pyqtSignal(object, int)
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+
+class TableIndexer(QRunnable):
+    """Find the start offset of every record off the GUI thread.
+
+    Offsets are sent in batches as each chunk of the file is scanned, so
+    the table fills in while indexing continues. Newlines inside quoted
+    CSV fields do not start a new record.
+    """
+
+    def __init__(self, file_path: str, table_format: str):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.file_path = file_path
+        self.table_format = table_format
+        self.cancelled = False
+        self.signals = TableIndexerSignals()
+
+    def run(self) -> None:
+        try:
+            source = TableSource(self.file_path, self.table_format, "", "")
+        except OSError as e:
+            self.signals.failed.emit(str(e))
+            return
+        try:
+            self.scan(source.mapping, source.size)
+        finally:
+            source.close()
+        if not self.cancelled:
+            self.signals.finished.emit()
+
+    def scan(self, mapping, size: int) -> None:
+        position = 0
+        in_quotes = False
+        while position < size and not self.cancelled:
+            end = min(size, position + TABLE_INDEX_CHUNK)
+            if end < size:
+                end = mapping.rfind(b"\n", position, end) + 1 or size
+            lines = mapping[position:end].split(b"\n")
+            starts = accumulate(
+                [position] + [len(line) + 1 for line in lines[:-1]]
+            )
+            if self.table_format == "csv" and (
+                in_quotes or mapping.find(b'"', position, end) != -1
+            ):
+                offsets = array("q")
+                for line, start in zip(lines, starts):
+                    if not in_quotes and line.rstrip(b"\r"):
+                        offsets.append(start)
+                    if line.count(b'"') % 2:
+                        in_quotes = not in_quotes
+            else:
+                offsets = array(
+                    "q",
+                    compress(starts, map(bytes.rstrip, lines, repeat(b"\r"))),
+                )
+            self.signals.rows.emit(offsets, end)
+            position = end
+
+
+class TableColumnSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class TableColumnWorker(QRunnable):
+    """Build a sort order or filter mask for one column off the GUI thread.
+
+    The worker maps the file itself, so the tab can close while it runs.
+    A sort produces the record numbers in ascending column order, numbers
+    before text. A filter produces a bytearray with a 1 for each record
+    whose column (or any column, for column -1) contains the text.
+    """
+
+    def __init__(
+        self,
+        source: TableSource,
+        offsets: array,
+        end: int,
+        columns: List[str],
+        column: int,
+        filter_text: Optional[str] = None,
+    ):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.source_args = (
+            source.file_path,
+            source.table_format,
+            source.delimiter,
+            source.encoding,
+        )
+        self.source: Optional[TableSource] = None
+        self.offsets = offsets
+        self.end = end
+        self.columns = columns
+        self.column = column
+        self.filter_text = filter_text
+        self.cancelled = False
+        self.signals = TableColumnSignals()
+
+    def records(self) -> Iterator:
+        records = self.source.records(self.offsets, self.end)
+        for row, record in enumerate(records):
+            if self.cancelled:
+                return
+            if row % TABLE_PROGRESS_ROWS == 0:
+                self.signals.progress.emit(row)
+            yield record
+
+    def cells(self) -> Iterator[str]:
+        columns = (
+            range(len(self.columns)) if self.column == -1 else [self.column]
+        )
+        for record in self.records():
+            yield "\t".join(
+                table_cell(record, self.columns, column) for column in columns
+            )
+
+    def run(self) -> None:
+        try:
+            self.source = TableSource(*self.source_args)
+            if self.filter_text is None:
+                result = self.sort_order()
+            else:
+                needle = self.filter_text.lower()
+                result = bytearray(
+                    needle in cell.lower() for cell in self.cells()
+                )
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        finally:
+            if self.source is not None:
+                self.source.close()
+        if not self.cancelled:
+            self.signals.finished.emit(result)
+
+    def sort_order(self) -> array:
+        number_rows = array("q")
+        number_keys = []
+        text_rows = array("q")
+        text_keys = []
+        for row, record in enumerate(self.records()):
+            value = table_value(record, self.columns, self.column)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                number_keys.append(value)
+                number_rows.append(row)
+                continue
+            cell = table_cell(record, self.columns, self.column)
+            try:
+                number_keys.append(float(cell))
+                number_rows.append(row)
+            except ValueError:
+                text_keys.append(cell)
+                text_rows.append(row)
+        order = array(
+            "q",
+            map(
+                number_rows.__getitem__,
+                sorted(range(len(number_keys)), key=number_keys.__getitem__),
+            ),
+        )
+        order.extend(
+            map(
+                text_rows.__getitem__,
+                sorted(range(len(text_keys)), key=text_keys.__getitem__),
+            )
+        )
+        return order
+
+
+class TableModel(QAbstractTableModel):
+    """Table model that parses records only when they are displayed."""
+
+    def __init__(self, source: TableSource, columns: List[str], parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.columns = columns
+        self.offsets = array("q")
+        self.end = 0
+        self.visible: Optional[array] = None
+        self.cache: Dict[int, object] = {}
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        if self.visible is not None:
+            return len(self.visible)
+        return len(self.offsets)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns)
+
+    def record_row(self, row: int) -> int:
+        return self.visible[row] if self.visible is not None else row
+
+    def record(self, row: int):
+        record = self.cache.get(row)
+        if record is None:
+            if len(self.cache) >= TABLE_ROW_CACHE:
+                del self.cache[next(iter(self.cache))]
+            record = self.source.record(self.offsets, row, self.end)
+            self.cache[row] = record
+        return record
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if role not in (
+            Qt.ItemDataRole.DisplayRole,
+            Qt.ItemDataRole.ToolTipRole,
+        ):
+            return None
+        record = self.record(self.record_row(index.row()))
+        return table_cell(record, self.columns, index.column())
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role=Qt.ItemDataRole.DisplayRole,
+    ):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columns[section]
+        return str(self.record_row(section) + 1)
+
+    def add_rows(self, offsets: array, end: int) -> None:
+        """Append newly indexed records."""
+        if not offsets:
+            self.end = end
+            return
+        if self.visible is not None:
+            self.offsets.extend(offsets)
+            self.end = end
+            return
+        first = len(self.offsets)
+        self.beginInsertRows(QModelIndex(), first, first + len(offsets) - 1)
+        self.offsets.extend(offsets)
+        self.end = end
+        self.endInsertRows()
+
+    def set_visible(self, visible: Optional[array]) -> None:
+        """Show only the given records, in the given order."""
+        self.beginResetModel()
+        self.visible = visible
+        self.endResetModel()
+
+
+class TableViewer(QWidget):
+    """Tab that shows a JSON-lines or CSV file as a table."""
+
+    def __init__(
+        self,
+        file_path: str,
+        encoding: str = "utf-8",
+        source_editor: Optional[QPlainTextEdit] = None,
+        temp_path: Optional[str] = None,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.source_editor = source_editor
+        self.temp_path = temp_path
+        path = temp_path or file_path
+        with open(path, "rb") as file:
+            sample = file.read(TABLE_SAMPLE_SIZE).decode(encoding, "replace")
+        table_format, delimiter = detect_table_format(file_path, sample)
+        columns, self.skip_header = infer_table_columns(
+            sample, table_format, delimiter
+        )
+        self.source = TableSource(path, table_format, delimiter, encoding)
+        self.model = TableModel(self.source, columns)
+        self.indexing = True
+        self.column_worker: Optional[TableColumnWorker] = None
+        self.sort_orders: Dict[int, array] = {}
+        self.sort_column = -1
+        self.sort_descending = False
+        self.filter_mask: Optional[bytearray] = None
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        toolbar = QHBoxLayout()
+        self.filter_column = QComboBox()
+        self.filter_column.addItem("All Columns")
+        self.filter_column.addItems(columns)
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter")
+        self.filter_input.returnPressed.connect(self.apply_filter)
+        self.filter_button = QPushButton("Filter")
+        self.filter_button.clicked.connect(self.apply_filter)
+        self.clear_button = QPushButton("Clear")
+        self.clear_button.clicked.connect(self.clear_filter)
+        self.status_label = QLabel()
+        toolbar.addWidget(self.filter_column)
+        toolbar.addWidget(self.filter_input)
+        toolbar.addWidget(self.filter_button)
+        toolbar.addWidget(self.clear_button)
+        toolbar.addWidget(self.status_label)
+        layout.addLayout(toolbar)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setWordWrap(False)
+        vertical_header = self.table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(
+            self.table.fontMetrics().height() + 6
+        )
+        header = self.table.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(False)
+        header.sectionClicked.connect(self.sort_by)
+        layout.addWidget(self.table)
+
+        self.indexer = TableIndexer(path, table_format)
+        self.indexer.signals.rows.connect(self.on_rows_indexed)
+        self.indexer.signals.finished.connect(self.on_indexing_finished)
+        self.indexer.signals.failed.connect(self.on_worker_failed)
+        self.set_busy(True)
+        QThreadPool.globalInstance().start(self.indexer)
+
+    def set_busy(self, busy: bool) -> None:
+        for widget in (
+            self.filter_column,
+            self.filter_input,
+            self.filter_button,
+            self.clear_button,
+        ):
+            widget.setEnabled(not busy)
+        self.table.horizontalHeader().setSectionsClickable(not busy)
+        self.update_status()
+
+    def update_status(self, progress: Optional[int] = None) -> None:
+        total = len(self.model.offsets)
+        if self.indexing:
+            text = f"Indexing... {total:,} rows"
+        elif progress is not None:
+            text = (
+                f"Building column index... "
+                f"{progress * 100 // max(1, total)}%"
+            )
+        elif self.model.visible is not None:
+            text = f"{len(self.model.visible):,} of {total:,} rows"
+        else:
+            text = f"{total:,} rows"
+        self.status_label.setText(text)
+
+    def on_rows_indexed(self, offsets: array, end: int) -> None:
+        if self.skip_header and offsets:
+            offsets = offsets[1:]
+            self.skip_header = False
+        self.model.add_rows(offsets, end)
+        self.update_status()
+
+    def on_indexing_finished(self) -> None:
+        self.indexing = False
+        self.set_busy(False)
+
+    def on_worker_failed(self, error: str) -> None:
+        self.indexing = False
+        self.column_worker = None
+        self.set_busy(False)
+        QMessageBox.warning(self, "Table View", error)
+
+    def start_column_worker(
+        self, column: int, filter_text: Optional[str], on_finished
+    ) -> None:
+        self.column_worker = TableColumnWorker(
+            self.source,
+            self.model.offsets,
+            self.model.end,
+            self.model.columns,
+            column,
+            filter_text,
+        )
+        self.column_worker.signals.progress.connect(self.update_status)
+        self.column_worker.signals.finished.connect(on_finished)
+        self.column_worker.signals.failed.connect(self.on_worker_failed)
+        self.set_busy(True)
+        self.update_status(0)
+        QThreadPool.globalInstance().start(self.column_worker)
+
+    def sort_by(self, column: int) -> None:
+        """Sort by a column, reversing the order on a repeated click."""
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_descending = False
+        self.sort_column = column
+        if column in self.sort_orders:
+            self.update_view()
+        else:
+            self.start_column_worker(
+                column, None, partial(self.on_sort_order_built, column)
+            )
+
+    def on_sort_order_built(self, column: int, order: array) -> None:
+        self.sort_orders[column] = order
+        self.column_worker = None
+        self.set_busy(False)
+        self.update_view()
+
+    def apply_filter(self) -> None:
+        """Show only rows whose selected column contains the filter text."""
+        text = self.filter_input.text()
+        if not text:
+            self.clear_filter()
+            return
+        self.start_column_worker(
+            self.filter_column.currentIndex() - 1,
+            text,
+            self.on_filter_built,
+        )
+
+    def on_filter_built(self, mask: bytearray) -> None:
+        self.filter_mask = mask
+        self.column_worker = None
+        self.set_busy(False)
+        self.update_view()
+
+    def clear_filter(self) -> None:
+        self.filter_input.clear()
+        self.filter_mask = None
+        self.update_view()
+
+    def update_view(self) -> None:
+        """Combine the current sort order and filter into visible rows."""
+        order = self.sort_orders.get(self.sort_column)
+        if order is not None and self.sort_descending:
+            order = order[::-1]
+        if order is None and self.filter_mask is None:
+            visible = None
+        elif self.filter_mask is None:
+            visible = order
+        elif order is None:
+            visible = array(
+                "q", compress(range(len(self.filter_mask)), self.filter_mask)
+            )
+        else:
+            visible = array(
+                "q", compress(order, map(self.filter_mask.__getitem__, order))
+            )
+        self.model.set_visible(visible)
+        header = self.table.horizontalHeader()
+        header.setSortIndicatorShown(order is not None)
+        if order is not None:
+            header.setSortIndicator(
+                self.sort_column,
+                Qt.SortOrder.DescendingOrder
+                if self.sort_descending
+                else Qt.SortOrder.AscendingOrder,
+            )
+        self.update_status()
+
+    def close_file(self) -> None:
+        """Stop background work, unmap the file and remove any temp copy."""
+        self.indexer.cancelled = True
+        if self.column_worker is not None:
+            self.column_worker.cancelled = True
+        self.source.close()
+        if self.temp_path:
+            try:
+                os.remove(self.temp_path)
+            except OSError:
+                pass
+
+
+class SpellDictionary:
+    """Word list compiled to a sorted file and searched through mmap.
+
+    The list comes from the ``spell_dictionary`` resource, or else from a
+    system word list, and is compiled on first use. Lookups binary-search
+    the mapped file, so only the pages they touch are read into memory.
+    """
+
+    def __init__(self, cache_path: str, settings_file: str, get_resource):
+        self.cache_path = cache_path
+        self.settings_file = settings_file
+        self.get_resource = get_resource
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.available = False
+        self.file = None
+        self.mapping = None
+        self.start = 0
+        self.memo: Dict[str, bool] = {}
+        self.user_words = set()
+
+    def source(self) -> Tuple[str, Optional[str]]:
+        """Return a signature of the word list and, if needed, its text."""
+        text = self.get_resource("spell_dictionary")
+        if text:
+            return hashlib.blake2b(text.encode("utf-8")).hexdigest(), text
+        for path in SPELL_SYSTEM_DICTIONARIES:
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                return f"{path}:{stat.st_mtime_ns}:{stat.st_size}", None
+        return "", None
+
+    def exists(self) -> bool:
+        """Check whether a word list can be found, without compiling it."""
+        try:
+            return bool(self.source()[0])
+        except (OSError, sqlite3.Error):
+            return False
+
+    def compile(self, signature: str, text: Optional[str]) -> None:
+        if text is None:
+            with open(signature.split(":")[0], encoding="utf-8") as file:
+                text = file.read()
+        words = sorted(
+            {
+                word.encode("utf-8")
+                for word in text.lower().split()
+                if not word.startswith("#")
+            }
+        )
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(f"#{signature}\n".encode("utf-8"))
+            file.write(b"\n".join(words))
+            file.write(b"\n")
+        os.replace(temp_path, self.cache_path)
+
+    def load(self) -> bool:
+        """Open the compiled word list, compiling it first if stale."""
+        with self.lock:
+            if self.loaded:
+                return self.available
+            self.loaded = True
+            try:
+                signature, text = self.source()
+                if not signature:
+                    return False
+                header = f"#{signature}\n".encode("utf-8")
+                try:
+                    with open(self.cache_path, "rb") as file:
+                        current = file.read(len(header)) == header
+                except OSError:
+                    current = False
+                if not current:
+                    self.compile(signature, text)
+                self.file = open(self.cache_path, "rb")
+                self.mapping = mmap.mmap(
+                    self.file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+                self.start = len(header)
+                conn = sqlite3.connect(self.settings_file)
+                self.user_words = {
+                    row[0]
+                    for row in conn.execute("SELECT word FROM user_dictionary")
+                }
+                conn.close()
+            except (OSError, ValueError, sqlite3.Error) as e:
+                logging.warning(f"Spelling dictionary unavailable: {e}")
+                return False
+            self.available = True
+            return True
+
+    def lookup(self, word: str) -> bool:
+        key = word.encode("utf-8")
+        low, high = self.start, len(self.mapping)
+        while low < high:
+            middle = (low + high) // 2
+            newline = self.mapping.rfind(b"\n", low, middle)
+            start = newline + 1 if newline != -1 else low
+            end = self.mapping.find(b"\n", start)
+            line = self.mapping[start:end]
+            if line == key:
+                return True
+            if line < key:
+                low = end + 1
+            else:
+                high = start
+        return False
+
+    def contains(self, word: str) -> bool:
+        """Check a word, ignoring case and a trailing possessive."""
+        word = word.lower().replace("’", "'")
+        known = self.memo.get(word)
+        if known is None:
+            known = (
+                word in self.user_words
+                or self.lookup(word)
+                or (word.endswith("'s") and self.lookup(word[:-2]))
+            )
+            if len(self.memo) >= SPELL_MEMO_LIMIT:
+                self.memo.clear()
+            self.memo[word] = known
+        return known
+
+    def suggestions(self, word: str) -> List[str]:
+        """Return known words one edit away from a misspelling."""
+        lower = word.lower()
+        found: Dict[str, None] = {}
+        for candidate in spell_candidates(lower):
+            if candidate != lower and self.lookup(candidate):
+                found[candidate] = None
+                if len(found) >= SPELL_SUGGESTION_LIMIT:
+                    break
+        if word[:1].isupper():
+            return [candidate.capitalize() for candidate in found]
+        return list(found)
+
+    def add_word(self, word: str) -> None:
+        """Accept a word from now on and remember it in the settings."""
+        word = word.lower().replace("’", "'")
+        self.user_words.add(word)
+        self.memo[word] = True
+        conn = sqlite3.connect(self.settings_file)
+        conn.execute(
+            "INSERT OR IGNORE INTO user_dictionary (word) VALUES (?)", (word,)
+        )
+        conn.commit()
+        conn.close()
+
+
+def misspelled_spans(
+    text: str, dictionary: SpellDictionary
+) -> List[Tuple[int, int]]:
+    """Return the UTF-16 start and length of each misspelled word."""
+    spans = []
+    for match in SPELL_WORD_PATTERN.finditer(text):
+        word = match.group()
+        if (
+            len(word) < 2
+            or any(char.isupper() for char in word[1:])
+            or dictionary.contains(word)
+        ):
+            continue
+        start = match.start()
+        if not text.isascii():
+            start = utf16_length(text[:start])
+        spans.append((start, utf16_length(word)))
+    return spans
+
+
+class SpellCheckSignals(QObject):
+    finished = pyqtSignal(object)
+
+
+class SpellCheckWorker(QRunnable):
+    """Check a batch of block texts against the dictionary."""
+
+    def __init__(self, texts: List[str], dictionary: SpellDictionary):
+        super().__init__()
+        self.texts = texts
+        self.dictionary = dictionary
+        self.signals = SpellCheckSignals()
+
+    def run(self) -> None:
+        if not self.dictionary.load():
+            self.signals.finished.emit(None)
+            return
+        self.signals.finished.emit(
+            {
+                text: misspelled_spans(text, self.dictionary)
+                for text in self.texts
+            }
+        )
+
+
+class SpellChecker(QObject):
+    """Marks misspelled words in the visible part of attached views.
+
+    Edits and scrolling only schedule a short, debounced refresh. The
+    refresh looks up each visible or recently edited block's text in a
+    cache and sends the texts it has not seen to a worker, one batch at a
+    time. Misspellings are drawn as extra selections, so checking never
+    touches the document itself.
+    """
+
+    unavailable = pyqtSignal()
+
+    def __init__(self, dictionary: SpellDictionary, parent=None):
+        super().__init__(parent)
+        self.dictionary = dictionary
+        self.views: List[QPlainTextEdit] = []
+        self.cache: Dict[str, List[Tuple[int, int]]] = {}
+        self.pending: Dict[str, None] = {}
+        self.edited: Dict[QTextDocument, Dict[int, None]] = {}
+        self.worker: Optional[SpellCheckWorker] = None
+        self.format = QTextCharFormat()
+        self.format.setUnderlineStyle(
+            QTextCharFormat.UnderlineStyle.SpellCheckUnderline
+        )
+        self.format.setUnderlineColor(Qt.GlobalColor.red)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.refresh)
+
+    def attach(self, view: QPlainTextEdit) -> None:
+        """Start checking a view."""
+        if view in self.views:
+            return
+        self.views.append(view)
+        view.verticalScrollBar().valueChanged.connect(self.schedule)
+        view.document().contentsChange.connect(self.on_contents_change)
+        view.destroyed.connect(partial(self.forget_view, view))
+        self.schedule()
+
+    def detach(self, view: QPlainTextEdit) -> None:
+        """Stop checking a view and clear its marks."""
+        if view not in self.views:
+            return
+        self.forget_view(view)
+        view.verticalScrollBar().valueChanged.disconnect(self.schedule)
+        if view.document() not in [other.document() for other in self.views]:
+            view.document().contentsChange.disconnect(self.on_contents_change)
+        view.setExtraSelections([])
+
+    def forget_view(self, view: QPlainTextEdit) -> None:
+        if view in self.views:
+            self.views.remove(view)
+
+    def schedule(self) -> None:
+        self.timer.start(SPELL_REFRESH_DELAY)
+
+    def on_contents_change(self, position: int, removed: int, added: int):
+        document = self.sender()
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(position + added).blockNumber()
+        edited = self.edited.setdefault(document, {})
+        if len(edited) < SPELL_EDITED_LIMIT:
+            for number in range(first, min(last, first + 10) + 1):
+                edited[number] = None
+        self.schedule()
+
+    def visible_blocks(self, view: QPlainTextEdit) -> List:
+        blocks = []
+        block = view.firstVisibleBlock()
+        offset = view.contentOffset()
+        height = view.viewport().height()
+        while block.isValid():
+            top = view.blockBoundingGeometry(block).translated(offset).top()
+            if top > height:
+                break
+            if block.isVisible():
+                blocks.append(block)
+            block = block.next()
+        return blocks
+
+    def refresh(self) -> None:
+        """Mark cached misspellings and queue unchecked visible text."""
+        documents = {view.document() for view in self.views}
+        for document, edited in self.edited.items():
+            if document not in documents:
+                continue
+            for number in edited:
+                text = document.findBlockByNumber(number).text()
+                if text and text not in self.cache:
+                    self.pending[text] = None
+        self.edited.clear()
+        for view in self.views:
+            if view.isVisible():
+                self.mark(view)
+        self.start_worker()
+
+    def mark(self, view: QPlainTextEdit) -> None:
+        cursor_position = view.textCursor().position()
+        selections = []
+        for block in self.visible_blocks(view):
+            text = block.text()
+            spans = self.cache.get(text)
+            if spans is None:
+                if text:
+                    self.pending[text] = None
+                continue
+            for start, length in spans:
+                position = block.position() + start
+                if position <= cursor_position <= position + length:
+                    continue
+                selection = QTextEdit.ExtraSelection()
+                selection.format = self.format
+                selection.cursor = QTextCursor(block)
+                selection.cursor.setPosition(position)
+                selection.cursor.setPosition(
+                    position + length, QTextCursor.MoveMode.KeepAnchor
+                )
+                selections.append(selection)
+        current = [
+            (
+                selection.cursor.selectionStart(),
+                selection.cursor.selectionEnd(),
+            )
+            for selection in view.extraSelections()
+        ]
+        if current != [
+            (
+                selection.cursor.selectionStart(),
+                selection.cursor.selectionEnd(),
+            )
+            for selection in selections
+        ]:
+            view.setExtraSelections(selections)
+
+    def start_worker(self) -> None:
+        if self.worker is not None or not self.pending:
+            return
+        texts = list(self.pending)[:SPELL_BATCH_LIMIT]
+        for text in texts:
+            del self.pending[text]
+        self.worker = SpellCheckWorker(texts, self.dictionary)
+        self.worker.signals.finished.connect(self.on_checked)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def on_checked(self, results: Optional[Dict]) -> None:
+        self.worker = None
+        if results is None:
+            self.pending.clear()
+            self.unavailable.emit()
+            return
+        if len(self.cache) + len(results) > SPELL_CACHE_LIMIT:
+            self.cache.clear()
+        self.cache.update(results)
+        for view in self.views:
+            if view.isVisible():
+                self.mark(view)
+        self.start_worker()
+
+    def add_word(self, word: str) -> None:
+        """Accept a word everywhere and check the visible text again."""
+        self.dictionary.add_word(word)
+        self.cache.clear()
+        self.schedule()
+
+
+def completion_words(text: str) -> Counter:
+    """Count the words of text that are worth offering as completions."""
+    return Counter(
+        word
+        for word in COMPLETION_WORD_PATTERN.findall(text)
+        if COMPLETION_MIN_LENGTH <= len(word) <= COMPLETION_MAX_LENGTH
+    )
+
+
+class CompletionWorkerSignals(QObject):
+    finished = pyqtSignal(object)
+
+
+class CompletionWorker(QRunnable):
+    """Count how the words of a large edit changed, off the GUI thread.
+
+    The texts are tokenized in chunks cut at word boundaries, so the GUI
+    thread can take the interpreter lock between them.
+    """
+
+    def __init__(self, old_text: str, new_text: str):
+        super().__init__()
+        self.old_text = old_text
+        self.new_text = new_text
+        self.signals = CompletionWorkerSignals()
+
+    def run(self) -> None:
+        words = Counter()
+        for text, count in (
+            (self.new_text, words.update),
+            (self.old_text, words.subtract),
+        ):
+            position = 0
+            while position < len(text):
+                boundary = COMPLETION_BOUNDARY_PATTERN.search(
+                    text, position + COMPLETION_INDEX_CHUNK
+                )
+                cut = boundary.end() if boundary else len(text)
+                count(completion_words(text[position:cut]))
+                position = cut
+        self.signals.finished.emit(words)
+
+
+class CompletionIndex(QObject):
+    """Word frequencies of all open editors, for prefix completion.
+
+    Unique words are kept in a large sorted list plus a small sorted list
+    of recent additions that is merged in once it grows, so a prefix
+    lookup is a bisect and a short scan. New editors are indexed in time
+    slices; after that only the text around each edit is re-tokenized,
+    from the changes their undo history reports. Large edits are counted
+    on the index's own thread pool. Editors are only added while word
+    completion is on.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.counts: Dict[str, int] = {}
+        self.document_counts: Dict[QPlainTextEdit, Counter] = {}
+        self.words: List[str] = []
+        self.new_words: List[str] = []
+        self.indexing: Dict[QPlainTextEdit, int] = {}
+        self.pending: Dict[QPlainTextEdit, List[List[Optional[Counter]]]] = {}
+        self.workers: List[CompletionWorker] = []
+        self.slots: Dict[QPlainTextEdit, Tuple[Callable, Callable]] = {}
+        self.pool = QThreadPool(self)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.index_next)
+
+    def add_document(self, editor: QPlainTextEdit) -> None:
+        """Index an editor's text and follow its edits."""
+        self.document_counts[editor] = Counter()
+        self.slots[editor] = (
+            partial(self.on_edited, editor),
+            partial(self.reindex, editor),
+        )
+        editor.undo_history.edited.connect(self.slots[editor][0])
+        editor.undo_history.lost_track.connect(self.slots[editor][1])
+        self.reindex(editor)
+
+    def remove_document(self, editor: QPlainTextEdit) -> None:
+        """Forget the words of an editor and stop following its edits."""
+        if editor not in self.document_counts:
+            return
+        on_edited, on_lost_track = self.slots.pop(editor)
+        editor.undo_history.edited.disconnect(on_edited)
+        editor.undo_history.lost_track.disconnect(on_lost_track)
+        self.update_counts(editor, self.document_counts.pop(editor), -1)
+        self.indexing.pop(editor, None)
+        self.pending.pop(editor, None)
+
+    def clear(self) -> None:
+        """Forget every editor, as when word completion is turned off."""
+        for editor in list(self.document_counts):
+            self.remove_document(editor)
+        self.words = []
+        self.new_words = []
+        self.timer.stop()
+
+    def reindex(self, editor: QPlainTextEdit) -> None:
+        """Drop an editor's words and index its whole text again."""
+        if editor not in self.document_counts:
+            return
+        counts = self.document_counts[editor]
+        self.document_counts[editor] = Counter()
+        self.update_counts(editor, counts, -1)
+        self.pending.pop(editor, None)
+        self.indexing[editor] = 0
+        if not self.timer.isActive():
+            self.timer.start(0)
+
+    def update_counts(
+        self, editor: QPlainTextEdit, words: Counter, sign: int
+    ) -> None:
+        document_counts = self.document_counts.get(editor)
+        for word, count in words.items():
+            total = self.counts.get(word, 0) + sign * count
+            if total > 0:
+                if word not in self.counts and not self.indexed(word):
+                    insort(self.new_words, word)
+                self.counts[word] = total
+            else:
+                self.counts.pop(word, None)
+            if document_counts is not None:
+                document_counts[word] += sign * count
+                if document_counts[word] <= 0:
+                    del document_counts[word]
+        if len(self.new_words) > COMPLETION_MERGE_LIMIT:
+            self.merge()
+
+    def indexed(self, word: str) -> bool:
+        for words in (self.words, self.new_words):
+            index = bisect_left(words, word)
+            if index < len(words) and words[index] == word:
+                return True
+        return False
+
+    def merge(self) -> None:
+        """Fold recent additions into the main list, dropping stale words."""
+        self.words = [
+            word
+            for word in sorted(self.words + self.new_words)
+            if word in self.counts
+        ]
+        self.new_words = []
+
+    def index_next(self) -> None:
+        """Index the next slice of text of editors not yet indexed."""
+        deadline = time.perf_counter() + COMPLETION_INDEX_SLICE
+        while self.indexing and time.perf_counter() < deadline:
+            editor, position = next(iter(self.indexing.items()))
+            document = editor.document()
+            end_block = document.findBlock(position + COMPLETION_INDEX_CHUNK)
+            if not end_block.isValid():
+                end_block = document.lastBlock()
+            end = end_block.position() + end_block.length() - 1
+            cursor = QTextCursor(document)
+            cursor.setPosition(position)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            text = selected_plain_text(cursor)
+            self.update_counts(editor, completion_words(text), 1)
+            if end + 1 >= document.characterCount():
+                del self.indexing[editor]
+            else:
+                self.indexing[editor] = end + 1
+        if not self.indexing:
+            self.timer.stop()
+
+    def on_edited(
+        self,
+        editor: QPlainTextEdit,
+        position: int,
+        removed_text: str,
+        added_text: str,
+    ) -> None:
+        """Re-count the words around the text an edit changed.
+
+        Words never contain a boundary character, so the context read on
+        either side stops at the line or at the first boundary beyond
+        ``COMPLETION_EDIT_CONTEXT`` characters, however long the line is.
+        """
+        removed = utf16_length(removed_text)
+        added = utf16_length(added_text)
+        indexed_to = self.indexing.get(editor)
+        if indexed_to is not None:
+            if position >= indexed_to:
+                return
+            if position + removed > indexed_to:
+                self.reindex(editor)
+                return
+            self.indexing[editor] = indexed_to + added - removed
+        document = editor.document()
+        line_start = document.findBlock(position).position()
+        end_block = document.findBlock(position + added)
+        line_end = end_block.position() + end_block.length() - 1
+        start = max(line_start, position - COMPLETION_EDIT_CONTEXT)
+        end = min(line_end, position + added + COMPLETION_EDIT_CONTEXT)
+        cursor = QTextCursor(document)
+        cursor.setPosition(start)
+        cursor.setPosition(position, QTextCursor.MoveMode.KeepAnchor)
+        prefix = selected_plain_text(cursor)
+        if start > line_start:
+            boundary = COMPLETION_BOUNDARY_PATTERN.search(prefix)
+            if boundary:
+                prefix = prefix[boundary.end() :]
+        cursor.setPosition(position + added)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        suffix = selected_plain_text(cursor)
+        if end < line_end:
+            boundaries = list(COMPLETION_BOUNDARY_PATTERN.finditer(suffix))
+            if boundaries:
+                suffix = suffix[: boundaries[-1].start()]
+        old_text = prefix + removed_text + suffix
+        new_text = prefix + added_text + suffix
+        if len(removed_text) + len(added_text) > COMPLETION_INDEX_CHUNK:
+            slot = [None]
+            self.pending.setdefault(editor, []).append(slot)
+            worker = CompletionWorker(old_text, new_text)
+            worker.signals.finished.connect(
+                partial(self.on_worker_finished, editor, worker, slot)
+            )
+            self.workers.append(worker)
+            self.pool.start(worker)
+            return
+        new_words = completion_words(new_text)
+        new_words.subtract(completion_words(old_text))
+        pending = self.pending.get(editor)
+        if pending:
+            pending.append([new_words])
+        else:
+            self.apply_changes(editor, new_words)
+
+    def apply_changes(self, editor: QPlainTextEdit, words: Counter) -> None:
+        self.update_counts(editor, +words, 1)
+        self.update_counts(editor, -words, -1)
+
+    def on_worker_finished(
+        self,
+        editor: QPlainTextEdit,
+        worker: CompletionWorker,
+        slot: List[Optional[Counter]],
+        words: Counter,
+    ) -> None:
+        """Apply the word changes of edits in order, once a worker is done.
+
+        Counts never go below zero, so changes queued behind a large edit
+        wait for it rather than being applied out of order.
+        """
+        self.workers.remove(worker)
+        pending = self.pending.get(editor, [])
+        if not any(item is slot for item in pending):
+            return
+        slot[0] = words
+        while pending and pending[0][0] is not None:
+            self.apply_changes(editor, pending.pop(0)[0])
+        if not pending:
+            del self.pending[editor]
+
+    def complete(
+        self, prefix: str, editor: QPlainTextEdit, cursor: QTextCursor
+    ) -> List[str]:
+        """Return the best words starting with a prefix.
+
+        Words are ranked by how often they occur in all editors and in
+        this one, with a boost for words used near the cursor.
+        """
+        candidates = []
+        for words in (self.words, self.new_words):
+            index = bisect_left(words, prefix)
+            stop = min(len(words), index + COMPLETION_SCAN_LIMIT)
+            while index < stop and words[index].startswith(prefix):
+                word = words[index]
+                if word != prefix and word in self.counts:
+                    candidates.append(word)
+                index += 1
+        if not candidates:
+            return []
+        block = cursor.block()
+        first = block
+        last = block
+        for _ in range(COMPLETION_NEARBY_BLOCKS):
+            if first.previous().isValid():
+                first = first.previous()
+            if last.next().isValid():
+                last = last.next()
+        position = cursor.position()
+        nearby_cursor = QTextCursor(editor.document())
+        nearby_cursor.setPosition(
+            max(first.position(), position - COMPLETION_NEARBY_CHARS)
+        )
+        nearby_cursor.setPosition(
+            min(
+                last.position() + last.length() - 1,
+                position + COMPLETION_NEARBY_CHARS,
+            ),
+            QTextCursor.MoveMode.KeepAnchor,
+        )
+        nearby = completion_words(selected_plain_text(nearby_cursor))
+        document_counts = self.document_counts.get(editor, {})
+
+        def score(word: str) -> float:
+            return (
+                math.log1p(self.counts[word])
+                + math.log1p(document_counts.get(word, 0))
+                + 2 * math.log1p(nearby.get(word, 0))
+            )
+
+        return heapq.nlargest(COMPLETION_LIMIT, candidates, key=score)
+
+
+class StatisticsTextSignals(QObject):
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+
+class StatisticsTextWriter(QRunnable):
+    """Write a tab's text to a temporary file for the statistics worker."""
+
+    def __init__(self, text: str):
+        super().__init__()
+        self.text = text
+        self.cancelled = False
+        self.temp_path: Optional[str] = None
+        self.signals = StatisticsTextSignals()
+
+    def run(self) -> None:
+        temp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", suffix=".txt", delete=False
+            ) as temp_file:
+                temp_path = temp_file.name
+                temp_file.write(self.text)
+        except OSError as e:
+            if temp_path is not None:
+                os.remove(temp_path)
+            self.signals.failed.emit(str(e))
+            return
+        finally:
+            self.text = ""
+        if self.cancelled:
+            os.remove(temp_path)
+            return
+        self.temp_path = temp_path
+        self.signals.finished.emit(temp_path)
+
+
+class StatisticsPanel(QDockWidget):
+    """Dock panel that shows document statistics from a worker process.
+
+    A tab's text is written to a temporary file on a thread first.
+    Stopped workers are reaped from a timer, and terminated if they do
+    not exit within STATISTICS_STOP_TIMEOUT seconds.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__("Statistics", parent)
+        self.notepad = parent
+        self.process = None
+        self.queue = None
+        self.cancelled = None
+        self.writer: Optional[StatisticsTextWriter] = None
+        self.stopping: List[Tuple] = []
+        self.temp_paths: List[str] = []
+        self.source_paths: List[str] = []
+        self.source_name = ""
+        self.pool = QThreadPool(self)
+
+        widget = QWidget()
+        layout = QVBoxLayout()
+        widget.setLayout(layout)
+        self.setWidget(widget)
+
+        self.source_layout = QHBoxLayout()
+        self.current_tab_button = QPushButton("Current Tab")
+        self.current_tab_button.clicked.connect(self.compute_current_tab)
+        self.files_button = QPushButton("Files...")
+        self.files_button.clicked.connect(self.compute_files)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel)
+        self.cancel_button.setEnabled(False)
+        self.source_layout.addWidget(self.current_tab_button)
+        self.source_layout.addWidget(self.files_button)
+        self.source_layout.addWidget(self.cancel_button)
+
+        self.options_layout = QHBoxLayout()
+        self.top_n_input = QSpinBox()
+        self.top_n_input.setRange(1, 1000)
+        self.top_n_input.setValue(20)
+        self.options_layout.addWidget(QLabel("Top:"))
+        self.options_layout.addWidget(self.top_n_input)
+        self.patterns_input = QLineEdit()
+        self.patterns_input.setPlaceholderText("Patterns, separated by ;;")
+        self.options_layout.addWidget(QLabel("Patterns:"))
+        self.options_layout.addWidget(self.patterns_input)
+
+        self.results_browser = QTextBrowser()
+
+        layout.addLayout(self.source_layout)
+        layout.addLayout(self.options_layout)
+        layout.addWidget(self.results_browser)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+        self.reap_timer = QTimer(self)
+        self.reap_timer.timeout.connect(self.reap)
+
+    def patterns(self) -> Optional[List[str]]:
+        """Return the patterns to count, or None after showing an error."""
+        patterns = [
+            pattern
+            for pattern in self.patterns_input.text().split(";;")
+            if pattern
+        ]
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                self.results_browser.setPlainText(
+                    f"Invalid pattern '{pattern}': {e}"
+                )
+                return None
+        return patterns
+
+    def compute_current_tab(self) -> None:
+        """Compute statistics for the current tab or its selection."""
+        editor = self.notepad.get_current_editor()
+        if not editor:
+            return
+        patterns = self.patterns()
+        if patterns is None:
+            return
+        cursor = self.notepad.get_current_view().textCursor()
+        file_path = editor.file_path
+        if (
+            file_path
+            and not cursor.hasSelection()
+            and not editor.document().isModified()
+            and "compression" not in editor.file_metadata
+            and os.path.isfile(file_path)
+        ):
+            encoding = editor.file_metadata.get("encoding", "utf-8")
+            self.start(
+                [(file_path, encoding)],
+                [],
+                os.path.basename(file_path),
+                patterns,
+            )
+            return
+        self.cancel()
+        text = (
+            selected_plain_text(cursor)
+            if cursor.hasSelection()
+            else editor.toPlainText()
+        )
+        name = self.notepad.tabs.tabText(self.notepad.tabs.currentIndex())
+        if cursor.hasSelection():
+            name += " (selection)"
+        writer = StatisticsTextWriter(text)
+        writer.signals.finished.connect(
+            partial(self.on_text_written, writer, name, patterns)
+        )
+        writer.signals.failed.connect(
+            partial(self.on_text_write_failed, writer)
+        )
+        self.writer = writer
+        self.cancel_button.setEnabled(True)
+        self.results_browser.setPlainText(f"Preparing {name}...")
+        self.pool.start(writer)
+
+    def on_text_written(
+        self,
+        writer: StatisticsTextWriter,
+        name: str,
+        patterns: List[str],
+        temp_path: str,
+    ) -> None:
+        if writer is not self.writer:
+            os.remove(temp_path)
+            return
+        self.writer = None
+        self.start([(temp_path, "utf-8")], [temp_path], name, patterns)
+
+    def on_text_write_failed(
+        self, writer: StatisticsTextWriter, message: str
+    ) -> None:
+        if writer is not self.writer:
+            return
+        self.writer = None
+        self.cancel_button.setEnabled(False)
+        self.results_browser.setPlainText(
+            f"Could not write a temporary file: {message}"
+        )
+
+    def compute_files(self) -> None:
+        """Compute statistics over a selection of files."""
+        options = QFileDialog.Option.DontUseNativeDialog
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Statistics for Files", "", "All Files (*)", options=options
+        )
+        if not file_paths:
+            return
+        patterns = self.patterns()
+        if patterns is None:
+            return
+        sources = []
+        for file_path in file_paths:
+            try:
+                with open(file_path, "rb") as file:
+                    encoding = detect_encoding(file.read(65536))
+            except OSError as e:
+                self.results_browser.setPlainText(
+                    f"Could not read {file_path}: {e}"
+                )
+                return
+            sources.append((file_path, encoding))
+        self.start(sources, [], f"{len(file_paths)} file(s)", patterns)
+
+    def start(
+        self,
+        sources: List[Tuple[str, str]],
+        temp_paths: List[str],
+        name: str,
+        patterns: List[str],
+    ) -> None:
+        """Start a worker process for the given (path, encoding) sources."""
+        self.cancel()
+        self.temp_paths = temp_paths
+        self.source_paths = [path for path, _ in sources]
+        self.source_name = name
+        context = multiprocessing.get_context("spawn")
+        self.queue = context.Queue()
+        self.cancelled = context.Event()
+        # The worker starts a process pool of its own, which a daemonic
+        # process is not allowed to do.
+        self.process = context.Process(
+            target=compute_statistics,
+            args=(
+                sources,
+                patterns,
+                self.top_n_input.value(),
+                self.queue,
+                self.cancelled,
+            ),
+        )
+        self.process.start()
+        self.cancel_button.setEnabled(True)
+        self.results_browser.setPlainText(
+            f"Computing statistics for {name}..."
+        )
+        self.poll_timer.start(100)
+
+    def poll(self) -> None:
+        """Render partial results and notice when the worker finishes."""
+        message = None
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except Empty:
+                break
+            kind, payload = message
+            if kind == "error":
+                self.results_browser.setPlainText(f"Error: {payload}")
+                self.finish()
+                return
+            self.render(payload, kind == "done")
+            if kind == "done":
+                self.finish()
+                return
+        if not self.process.is_alive() and message is None:
+            self.results_browser.setPlainText("Statistics worker stopped.")
+            self.finish()
+
+    def render(self, stats: Dict, done: bool) -> None:
+        progress = (
+            100
+            if done or not stats["total_bytes"]
+            else stats["bytes_done"] * 100 // stats["total_bytes"]
+        )
+        rows = [
+            ("Lines", stats["lines"]),
+            ("Blank lines", stats["blank_lines"]),
+            ("Words", stats["word_count"]),
+            ("Characters", stats["chars"]),
+            (
+                "Longest line",
+                f"{stats['longest_line']} characters "
+                f"(line {stats['longest_line_number']})",
+            ),
+        ]
+        if len(self.source_paths) > 1 and stats["longest_line_file"]:
+            rows[-1] = (
+                rows[-1][0],
+                rows[-1][1]
+                + " in "
+                + escape(os.path.basename(stats["longest_line_file"])),
+            )
+        html = [
+            f"<h3>{escape(self.source_name)}</h3>",
+            f"<p>{'Done' if done else f'Computing... {progress}%'}</p>",
+            "<table>",
+        ]
+        html += [
+            f"<tr><td>{name}</td><td>{value}</td></tr>" for name, value in rows
+        ]
+        html.append("</table>")
+        sections = [
+            ("Pattern hits", list(stats["pattern_hits"].items())),
+            ("Top words", stats["top_words"]),
+            ("Top tokens", stats["top_tokens"]),
+        ]
+        for title, items in sections:
+            if not items:
+                continue
+            html.append(f"<h4>{title}</h4><table>")
+            html += [
+                f"<tr><td>{escape(str(key))}</td><td>{count}</td></tr>"
+                for key, count in items
+            ]
+            html.append("</table>")
+        self.results_browser.setHtml("".join(html))
+
+    def cancel(self) -> None:
+        """Stop the running worker, if any."""
+        if self.writer is not None:
+            self.writer.cancelled = True
+            self.writer = None
+            self.results_browser.setPlainText("Statistics cancelled.")
+        if self.process is not None and self.process.is_alive():
+            self.cancelled.set()
+            self.results_browser.setPlainText("Statistics cancelled.")
+        self.finish()
+
+    def finish(self) -> None:
+        """Hand the worker to the reaper and stop polling it."""
+        self.poll_timer.stop()
+        self.cancel_button.setEnabled(False)
+        if self.process is not None:
+            self.stopping.append(
+                (
+                    self.process,
+                    time.monotonic() + STATISTICS_STOP_TIMEOUT,
+                    self.temp_paths,
+                )
+            )
+            self.process = None
+            self.cancelled = None
+            if not self.reap_timer.isActive():
+                self.reap_timer.start(100)
+        if self.queue is not None:
+            self.queue.close()
+            self.queue = None
+        self.temp_paths = []
+
+    def reap(self) -> None:
+        """Join workers that exited, terminating those past their time."""
+        for entry in list(self.stopping):
+            process, deadline, temp_paths = entry
+            if process.is_alive():
+                if time.monotonic() > deadline:
+                    process.terminate()
+                continue
+            process.join()
+            self.stopping.remove(entry)
+            for temp_path in temp_paths:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        if not self.stopping:
+            self.reap_timer.stop()
+
+    def shutdown(self) -> None:
+        """Cancel the work and wait for every worker to exit."""
+        writer = self.writer
+        self.cancel()
+        self.pool.waitForDone()
+        if writer is not None and writer.temp_path is not None:
+            try:
+                os.remove(writer.temp_path)
+            except OSError:
+                pass
+        for process, deadline, _ in self.stopping:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        for process, _, _ in self.stopping:
+            process.join()
+        self.reap()
+
+
+class LineOperationSignals(QObject):
+    finished = pyqtSignal(str, int)
+    failed = pyqtSignal(str)
+
+
+class LineOperationWorker(QRunnable):
+    """Run a sort, unique or filter line operation off the GUI thread."""
+
+    def __init__(self, source: Tuple, options: Dict):
+        super().__init__()
+        self.source = source
+        self.options = options
+        self.cancelled = False
+        self.signals = LineOperationSignals()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise LineOperationCancelled()
+
+    def run(self) -> None:
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", newline="\n", delete=False
+        ) as output:
+            output_path = output.name
+            try:
+                if self.source[0] == "file":
+                    lines = iter_file_lines(self.source[1], self.source[2])
+                else:
+                    lines = iter_text_lines(self.source[1])
+                count = run_line_operation(
+                    lines, self.options, output, self.check
+                )
+            except Exception as e:
+                output.close()
+                os.remove(output_path)
+                if isinstance(e, LineOperationCancelled):
+                    self.signals.failed.emit("")
+                else:
+                    self.signals.failed.emit(str(e))
+                return
+        self.signals.finished.emit(output_path, count)
+
+
+class LineOperationsDialog(QDialog):
+    OPERATIONS = [
+        ("sort", "Sort Lines"),
+        ("unique", "Unique Lines"),
+        ("keep", "Keep Matching Lines"),
+        ("remove", "Remove Matching Lines"),
+    ]
+
+    def __init__(self, parent=None, operation: str = "sort"):
+        super().__init__(parent)
+        self.setWindowTitle("Line Operations")
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.operation_input = QComboBox()
+        for key, label in self.OPERATIONS:
+            self.operation_input.addItem(label, key)
+        self.operation_input.setCurrentIndex(
+            [key for key, _ in self.OPERATIONS].index(operation)
+        )
+        self.operation_input.currentIndexChanged.connect(self.update_inputs)
+        layout.addWidget(self.operation_input)
+
+        self.numeric_input = QCheckBox("Numeric")
+        self.case_insensitive_input = QCheckBox("Case-Insensitive")
+        self.reverse_input = QCheckBox("Reversed")
+        self.unique_input = QCheckBox("Remove Duplicates")
+        self.sort_layout = QHBoxLayout()
+        for checkbox in (
+            self.numeric_input,
+            self.case_insensitive_input,
+            self.reverse_input,
+            self.unique_input,
+        ):
+            self.sort_layout.addWidget(checkbox)
+        layout.addLayout(self.sort_layout)
+
+        self.pattern_layout = QHBoxLayout()
+        self.pattern_input = QLineEdit()
+        self.pattern_layout.addWidget(QLabel("Pattern:"))
+        self.pattern_layout.addWidget(self.pattern_input)
+        layout.addLayout(self.pattern_layout)
+
+        self.output_input = QComboBox()
+        self.output_input.addItem("Replace Text", "replace")
+        self.output_input.addItem("New Tab", "new_tab")
+        layout.addWidget(self.output_input)
+
+        self.button_layout = QHBoxLayout()
+        self.ok_button = QPushButton("OK")
+        self.ok_button.setDefault(True)
+        self.ok_button.clicked.connect(self.accept)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.reject)
+        self.button_layout.addWidget(self.ok_button)
+        self.button_layout.addWidget(self.cancel_button)
+        layout.addLayout(self.button_layout)
+
+        self.update_inputs()
+
+    def update_inputs(self) -> None:
+        operation = self.operation_input.currentData()
+        for checkbox in (
+            self.numeric_input,
+            self.case_insensitive_input,
+            self.reverse_input,
+            self.unique_input,
+        ):
+            checkbox.setEnabled(operation == "sort")
+        self.pattern_input.setEnabled(operation in ("keep", "remove"))
+
+    def accept(self) -> None:
+        if self.pattern_input.isEnabled():
+            try:
+                re.compile(self.pattern_input.text())
+            except re.error as e:
+                QMessageBox.warning(self, "Line Operations", f"{e}")
+                return
+        super().accept()
+
+    def options(self) -> Dict:
+        return {
+            "operation": self.operation_input.currentData(),
+            "numeric": self.numeric_input.isChecked(),
+            "case_insensitive": self.case_insensitive_input.isChecked(),
+            "reverse": self.reverse_input.isChecked(),
+            "unique": self.unique_input.isChecked(),
+            "pattern": self.pattern_input.text(),
+            "output": self.output_input.currentData(),
+        }
+
+
+class RecentFilesValidatorSignals(QObject):
+    finished = pyqtSignal(dict)
+
+
+class RecentFilesValidator(QRunnable):
+    """Check whether recent files still exist, off the GUI thread."""
+
+    def __init__(self, paths: List[str]):
+        super().__init__()
+        self.paths = paths
+        self.signals = RecentFilesValidatorSignals()
+
+    def run(self) -> None:
+        results = {path: os.path.isfile(path) for path in self.paths}
+        self.signals.finished.emit(results)
+
+
+def content_chunks(data: bytes) -> Iterator[memoryview]:
+    """Split data into chunks that end at content-defined line breaks.
+
+    A chunk ends after a line whose CRC has its low bits clear, so an
+    edit only changes the chunks around it and the rest of the text
+    yields the same chunks however far it moves. Chunks are kept between
+    HISTORY_CHUNK_MIN and HISTORY_CHUNK_MAX bytes; long stretches without
+    a line break are cut into fixed-size pieces.
+    """
+    view = memoryview(data)
+    start = 0
+    block_start = 0
+    while block_start < len(data):
+        block_end = data.find(
+            b"\n", block_start + HISTORY_SCAN_BLOCK
+        ) + 1 or len(data)
+        lines = data[block_start:block_end].split(b"\n")
+        lines.pop()
+        ends = accumulate(
+            map((1).__add__, map(len, lines)), initial=block_start
+        )
+        next(ends)
+        boundaries = map(
+            not_,
+            map(
+                and_,
+                map(zlib.crc32, lines, repeat(HISTORY_LINE_SEED)),
+                repeat(HISTORY_LINE_MASK),
+            ),
+        )
+        for end in compress(ends, boundaries):
+            if end - start < HISTORY_CHUNK_MIN:
+                continue
+            while end - start > HISTORY_CHUNK_MAX:
+                yield view[start : start + HISTORY_CHUNK_MAX]
+                start += HISTORY_CHUNK_MAX
+            yield view[start:end]
+            start = end
+        block_start = block_end
+    while start < len(data):
+        yield view[start : start + HISTORY_CHUNK_MAX]
+        start += HISTORY_CHUNK_MAX
+
+
+def digest_groups(digests: List[bytes]) -> Iterator[bytes]:
+    """Pack chunk digests into groups that end at content-defined digests."""
+    group = []
+    for digest in digests:
+        group.append(digest)
+        if not digest[-1] & HISTORY_GROUP_MASK:
+            yield b"".join(group)
+            group = []
+    if group:
+        yield b"".join(group)
+
+
+def split_digests(data: bytes) -> List[bytes]:
+    return [
+        data[i : i + HISTORY_DIGEST_SIZE]
+        for i in range(0, len(data), HISTORY_DIGEST_SIZE)
+    ]
+
+
+class HistoryStore:
+    """Saved revisions of files, kept as deduplicated compressed chunks.
+
+    File content is split with content_chunks and every distinct chunk is
+    stored once, compressed. A revision lists its chunk digests in groups
+    that are chunks of their own, so a small edit to a large file adds a
+    few new chunks and groups plus a short row. Writes must not overlap;
+    the notepad runs them on a single-thread pool.
+    """
+
+    def __init__(self, history_file: str):
+        self.history_file = history_file
+        conn = sqlite3.connect(self.history_file)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                hash BLOB PRIMARY KEY,
+                data BLOB NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS revisions (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                saved_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                groups BLOB NOT NULL,
+                encoding TEXT
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS revisions_path
+            ON revisions (path, saved_at)
+        """
+        )
+        conn.commit()
+        conn.close()
+
+    def record(self, file_path: str, data: bytes, encoding: str) -> bool:
+        """Store a revision of a file unless it matches the latest one."""
+        data_hash = content_hash(data)
+        conn = sqlite3.connect(self.history_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT content_hash FROM revisions WHERE path = ?
+            ORDER BY saved_at DESC LIMIT 1
+        """,
+            (file_path,),
+        )
+        latest = cursor.fetchone()
+        if latest and latest[0] == data_hash:
+            conn.close()
+            return False
+        digests = self.store_chunks(cursor, content_chunks(data))
+        groups = self.store_chunks(cursor, digest_groups(digests))
+        cursor.execute(
+            """
+            INSERT INTO revisions
+            (path, saved_at, size, content_hash, groups, encoding)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """,
+            (
+                file_path,
+                time.time(),
+                len(data),
+                data_hash,
+                b"".join(groups),
+                encoding,
+            ),
+        )
+        conn.commit()
+        conn.close()
+        return True
+
+    def store_chunks(self, cursor, chunks: Iterable) -> List[bytes]:
+        """Store the chunks not stored yet and return all their digests."""
+        digests = []
+        batch = []
+        for chunk in chunks:
+            digest = hashlib.blake2b(
+                chunk, digest_size=HISTORY_DIGEST_SIZE
+            ).digest()
+            digests.append(digest)
+            batch.append((digest, chunk))
+            if len(batch) >= HISTORY_QUERY_BATCH:
+                self.insert_missing(cursor, batch)
+                batch = []
+        if batch:
+            self.insert_missing(cursor, batch)
+        return digests
+
+    def insert_missing(self, cursor, batch: List[Tuple]) -> None:
+        placeholders = ",".join("?" * len(batch))
+        cursor.execute(
+            f"SELECT hash FROM chunks WHERE hash IN ({placeholders})",
+            [digest for digest, _ in batch],
+        )
+        stored = {row[0] for row in cursor.fetchall()}
+        cursor.executemany(
+            "INSERT OR IGNORE INTO chunks VALUES (?, ?)",
+            (
+                (digest, zlib.compress(chunk))
+                for digest, chunk in batch
+                if digest not in stored
+            ),
+        )
+
+    def revisions(
+        self, file_path: str
+    ) -> List[Tuple[int, float, int, Optional[str]]]:
+        """Return the id, save time, size and encoding of a file's revisions.
+
+        The encoding is None for revisions recorded before it was stored.
+        """
+        conn = sqlite3.connect(self.history_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, saved_at, size, encoding FROM revisions WHERE path = ?
+            ORDER BY saved_at DESC
+        """,
+            (file_path,),
+        )
+        revisions = cursor.fetchall()
+        conn.close()
+        return revisions
+
+    def load(self, revision_id: int) -> bytes:
+        """Reassemble the content of a revision."""
+        conn = sqlite3.connect(self.history_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT groups FROM revisions WHERE id = ?", (revision_id,)
+        )
+        groups = cursor.fetchone()[0]
+        parts = []
+        for group in split_digests(groups):
+            for digest in split_digests(self.load_chunk(cursor, group)):
+                parts.append(self.load_chunk(cursor, digest))
+        conn.close()
+        return b"".join(parts)
+
+    def load_chunk(self, cursor, digest: bytes) -> bytes:
+        cursor.execute("SELECT data FROM chunks WHERE hash = ?", (digest,))
+        return zlib.decompress(cursor.fetchone()[0])
+
+    def collect_garbage(
+        self, keep_days: int, max_revisions: int
+    ) -> Tuple[int, int]:
+        """Apply the retention limits and delete chunks no longer used.
+
+        Returns the number of revisions and chunks deleted.
+        """
+        conn = sqlite3.connect(self.history_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM revisions WHERE saved_at < ?",
+            (time.time() - keep_days * 86400,),
+        )
+        revisions_deleted = cursor.rowcount
+        cursor.execute(
+            """
+            DELETE FROM revisions WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY path ORDER BY saved_at DESC
+                    ) AS rank
+                    FROM revisions
+                )
+                WHERE rank > ?
+            )
+        """,
+            (max_revisions,),
+        )
+        revisions_deleted += cursor.rowcount
+
+        live = set()
+        cursor.execute("SELECT groups FROM revisions")
+        for (groups,) in cursor.fetchall():
+            live.update(split_digests(groups))
+        for group in list(live):
+            live.update(split_digests(self.load_chunk(cursor, group)))
+        cursor.execute("SELECT hash FROM chunks")
+        dead = [(digest,) for (digest,) in cursor if digest not in live]
+        cursor.executemany("DELETE FROM chunks WHERE hash = ?", dead)
+        conn.commit()
+        cursor.execute("PRAGMA incremental_vacuum")
+        conn.close()
+        return revisions_deleted, len(dead)
+
+
+class HistorySignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class HistoryRecorder(QRunnable):
+    """Record a revision of a saved file off the GUI thread."""
+
+    def __init__(
+        self,
+        history: HistoryStore,
+        file_path: str,
+        data: bytes,
+        encoding: str,
+    ):
+        super().__init__()
+        self.history = history
+        self.file_path = file_path
+        self.data = data
+        self.encoding = encoding
+        self.signals = HistorySignals()
+
+    def run(self) -> None:
+        try:
+            recorded = self.history.record(
+                self.file_path, self.data, self.encoding
+            )
+        except (OSError, sqlite3.Error, zlib.error) as e:
+            self.signals.failed.emit(str(e))
+            return
+        finally:
+            self.data = b""
+        self.signals.finished.emit(recorded)
+
+
+class HistoryCollector(QRunnable):
+    """Enforce the history retention limits off the GUI thread."""
+
+    def __init__(
+        self, history: HistoryStore, keep_days: int, max_revisions: int
+    ):
+        super().__init__()
+        self.history = history
+        self.keep_days = keep_days
+        self.max_revisions = max_revisions
+        self.signals = HistorySignals()
+
+    def run(self) -> None:
+        try:
+            result = self.history.collect_garbage(
+                self.keep_days, self.max_revisions
+            )
+        except (OSError, sqlite3.Error, zlib.error) as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
+
+
+class HistoryReader(QRunnable):
+    """List the revisions of a file off the GUI thread.
+
+    Run on the history pool, it starts only once earlier recordings have
+    been written, so the list includes the latest save.
+    """
+
+    def __init__(self, history: HistoryStore, file_path: str):
+        super().__init__()
+        self.history = history
+        self.file_path = file_path
+        self.signals = HistorySignals()
+
+    def run(self) -> None:
+        try:
+            revisions = self.history.revisions(self.file_path)
+        except (OSError, sqlite3.Error) as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(revisions)
+
+
+class HistoryLoader(QRunnable):
+    """Load and decode saved revisions off the GUI thread."""
+
+    def __init__(self, history: HistoryStore, revisions: List[Tuple]):
+        super().__init__()
+        self.history = history
+        self.revisions = revisions
+        self.signals = HistorySignals()
+
+    def run(self) -> None:
+        try:
+            texts = [
+                self.history.load(revision_id)
+                .decode(encoding, errors="replace")
+                .replace("\r\n", "\n")
+                .replace("\r", "\n")
+                for revision_id, encoding in self.revisions
+            ]
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(texts)
+
+
+class HistoryDialog(QDialog):
+    """Browse the saved revisions of a file, compare and restore them.
+
+    Revisions are loaded on the history pool, with the dialog's controls
+    disabled until they arrive.
+    """
+
+    def __init__(self, parent, editor: QPlainTextEdit, revisions: List[Tuple]):
+        super().__init__(parent)
+        self.notepad = parent
+        self.editor = editor
+        self.setWindowTitle(
+            f"Local History - {os.path.basename(editor.file_path)}"
         )
-    else:
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
+        self.resize(800, 600)
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        self.revision_list = QListWidget()
+        self.revision_list.currentRowChanged.connect(self.update_buttons)
+        self.revision_list.itemActivated.connect(self.compare_with_current)
+        splitter.addWidget(self.revision_list)
+        self.diff_view = QPlainTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.diff_view.setFont(
+            QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+        )
+        splitter.addWidget(self.diff_view)
+        splitter.setStretchFactor(1, 3)
+        layout.addWidget(splitter)
+
+        self.button_layout = QHBoxLayout()
+        self.current_button = QPushButton("Compare with Current")
+        self.current_button.clicked.connect(self.compare_with_current)
+        self.previous_button = QPushButton("Compare with Previous")
+        self.previous_button.clicked.connect(self.compare_with_previous)
+        self.restore_button = QPushButton("Restore")
+        self.restore_button.clicked.connect(self.restore)
+        self.close_button = QPushButton("Close")
+        self.close_button.clicked.connect(self.reject)
+        for button in (
+            self.current_button,
+            self.previous_button,
+            self.restore_button,
+            self.close_button,
+        ):
+            self.button_layout.addWidget(button)
+        layout.addLayout(self.button_layout)
+
+        self.revisions = revisions
+        self.loader: Optional[HistoryLoader] = None
+        for revision_id, saved_at, size, encoding in self.revisions:
+            saved = datetime.fromtimestamp(saved_at).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
+            self.revision_list.addItem(f"{saved}    {size:,} bytes")
+        if self.revisions:
+            self.revision_list.setCurrentRow(0)
+        else:
+            self.diff_view.setPlainText("No saved revisions of this file.")
+        self.update_buttons()
+
+    def update_buttons(self) -> None:
+        row = self.revision_list.currentRow()
+        idle = self.loader is None
+        self.revision_list.setEnabled(idle)
+        self.current_button.setEnabled(idle and row >= 0)
+        self.restore_button.setEnabled(idle and row >= 0)
+        self.previous_button.setEnabled(
+            idle and 0 <= row < len(self.revisions) - 1
         )
 
+    def load_texts(self, rows: List[int], on_loaded: Callable) -> None:
+        """Load the text of some revisions, then pass it to on_loaded."""
+        fallback = self.editor.file_metadata.get("encoding", "utf-8")
+        loader = HistoryLoader(
+            self.notepad.history,
+            [
+                (self.revisions[row][0], self.revisions[row][3] or fallback)
+                for row in rows
+            ],
+        )
+        loader.signals.finished.connect(
+            partial(self.on_texts_loaded, loader, on_loaded)
+        )
+        loader.signals.failed.connect(partial(self.on_load_failed, loader))
+        self.loader = loader
+        self.update_buttons()
+        self.diff_view.setPlainText("Loading revision...")
+        self.notepad.history_pool.start(loader)
+
+    def on_texts_loaded(
+        self, loader: HistoryLoader, on_loaded: Callable, texts: List[str]
+    ) -> None:
+        if loader is not self.loader:
+            return
+        self.loader = None
+        self.update_buttons()
+        on_loaded(*texts)
+
+    def on_load_failed(self, loader: HistoryLoader, message: str) -> None:
+        if loader is not self.loader:
+            return
+        self.loader = None
+        self.update_buttons()
+        self.diff_view.setPlainText(f"Could not load the revision:\n{message}")
+
+    def show_diff(
+        self, old_row: int, new_text: Optional[str], new_label: str
+    ) -> None:
+        old_size = self.revisions[old_row][2]
+        new_size = (
+            self.revisions[old_row - 1][2]
+            if new_text is None
+            else len(new_text)
+        )
+        if max(old_size, new_size) > HISTORY_DIFF_LIMIT:
+            self.diff_view.setPlainText("Too large to compare.")
+            return
+        old_label = self.revision_list.item(old_row).text()
+        rows = [old_row] if new_text is not None else [old_row, old_row - 1]
+        self.load_texts(
+            rows, partial(self.write_diff, old_label, new_label, new_text)
+        )
 
-class FindReplaceDialog(QWidget):
+    def write_diff(
+        self,
+        old_label: str,
+        new_label: str,
+        new_text: Optional[str],
+        old_text: str,
+        newer_text: Optional[str] = None,
+    ) -> None:
+        if new_text is None:
+            new_text = newer_text
+        diff = "".join(
+            difflib.unified_diff(
+                old_text.splitlines(keepends=True),
+                new_text.splitlines(keepends=True),
+                old_label,
+                new_label,
+            )
+        )
+        self.diff_view.setPlainText(diff or "No differences.")
+
+    def compare_with_current(self) -> None:
+        row = self.revision_list.currentRow()
+        if row >= 0 and self.loader is None:
+            self.show_diff(row, self.editor.toPlainText(), "Current Text")
+
+    def compare_with_previous(self) -> None:
+        row = self.revision_list.currentRow()
+        if 0 <= row < len(self.revisions) - 1:
+            self.show_diff(row + 1, None, self.revision_list.item(row).text())
+
+    def restore(self) -> None:
+        """Replace the editor's text with the selected revision."""
+        row = self.revision_list.currentRow()
+        if row >= 0:
+            self.load_texts([row], self.apply_revision)
+
+    def apply_revision(self, text: str) -> None:
+        self.accept()
+        self.editor.undo_history.view.selectAll()
+        self.notepad.insert_text(self.editor, text)
+
+    def done(self, result: int) -> None:
+        self.loader = None
+        super().done(result)
+
+
+class SaveFileSignals(QObject):
+    saved = pyqtSignal(int, object, str)
+    failed = pyqtSignal(int, str)
+
+
+class SaveFileWorker(QRunnable):
+    """Encode and atomically write one editor's text off the GUI thread."""
+
+    def __init__(
+        self,
+        key: int,
+        file_path: str,
+        content: str,
+        encoding: str,
+        newline: str,
+        compression: Optional[str],
+    ):
+        super().__init__()
+        self.key = key
+        self.file_path = file_path
+        self.content = content
+        self.encoding = encoding
+        self.newline = newline
+        self.compression = compression
+        self.data = b""
+        self.signals = SaveFileSignals()
+
+    def run(self) -> None:
+        try:
+            data = encode_text(self.content, self.encoding, self.newline)
+            atomic_write(self.file_path, data, self.compression)
+            self.data = data
+            stat = os.stat(self.file_path)
+        except Exception as e:
+            self.signals.failed.emit(self.key, str(e))
+            return
+        finally:
+            self.content = ""
+        self.signals.saved.emit(self.key, stat, content_hash(data))
+
+
+class QuickOpenDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.layout = QVBoxLayout()
-        self.setLayout(self.layout)
-
-        self.find_layout = QHBoxLayout()
-        self.find_input = QLineEdit()
-        self.find_button = QPushButton("Find")
-        self.find_layout.addWidget(QLabel("Find:"))
-        self.find_layout.addWidget(self.find_input)
-        self.find_layout.addWidget(self.find_button)
+        self.notepad = parent
+        self.setWindowTitle("Quick Open")
+        self.resize(600, 400)
+        layout = QVBoxLayout()
+        self.setLayout(layout)
 
-        self.replace_layout = QHBoxLayout()
-        self.replace_input = QLineEdit()
-        self.replace_button = QPushButton("Replace")
-        self.replace_all_button = QPushButton("Replace All")
-        self.replace_layout.addWidget(QLabel("Replace:"))
-        self.replace_layout.addWidget(self.replace_input)
-        self.replace_layout.addWidget(self.replace_button)
-        self.replace_layout.addWidget(self.replace_all_button)
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Type to filter recent files")
+        self.filter_input.textChanged.connect(self.refresh)
+        layout.addWidget(self.filter_input)
 
-        self.layout.addLayout(self.find_layout)
-        self.layout.addLayout(self.replace_layout)
+        self.results_list = QListWidget()
+        self.results_list.itemActivated.connect(self.open_item)
+        self.results_list.setContextMenuPolicy(
+            Qt.ContextMenuPolicy.CustomContextMenu
+        )
+        self.results_list.customContextMenuRequested.connect(
+            self.show_context_menu
+        )
+        layout.addWidget(self.results_list)
+
+        self.refresh()
+        self.filter_input.setFocus()
+
+    def refresh(self) -> None:
+        """Re-query the recent files table for the current filter."""
+        self.results_list.clear()
+        pattern = self.filter_input.text().strip()
+        for path, pinned, file_exists in self.notepad.query_recent_files(
+            pattern
+        ):
+            label = os.path.basename(path) or path
+            if pinned:
+                label += " (pinned)"
+            if not file_exists:
+                label += " (missing)"
+            item = QListWidgetItem(f"{label}\n{path}")
+            item.setData(Qt.ItemDataRole.UserRole, path)
+            if not file_exists:
+                item.setForeground(Qt.GlobalColor.gray)
+            self.results_list.addItem(item)
+        if self.results_list.count():
+            self.results_list.setCurrentRow(0)
+
+    def open_item(self, item: QListWidgetItem) -> None:
+        path = item.data(Qt.ItemDataRole.UserRole)
+        self.accept()
+        self.notepad.open_recent_file(path)
+
+    def show_context_menu(self, position) -> None:
+        item = self.results_list.itemAt(position)
+        if not item:
+            return
+        path = item.data(Qt.ItemDataRole.UserRole)
+        menu = QMenu(self)
+        pinned = self.notepad.is_recent_file_pinned(path)
+        menu.addAction(
+            "Unpin" if pinned else "Pin",
+            lambda: self.notepad.set_recent_file_pinned(path, not pinned),
+        )
+        menu.addAction(
+            "Remove from Recent",
+            lambda: self.notepad.remove_recent_file(path),
+        )
+        menu.exec(self.results_list.viewport().mapToGlobal(position))
+        self.refresh()
 
-        self.replace_input.hide()
-        self.replace_button.hide()
-        self.replace_all_button.hide()
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key.Key_Down, Qt.Key.Key_Up):
+            row = self.results_list.currentRow()
+            row += 1 if event.key() == Qt.Key.Key_Down else -1
+            if 0 <= row < self.results_list.count():
+                self.results_list.setCurrentRow(row)
+        elif event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+            item = self.results_list.currentItem()
+            if item:
+                self.open_item(item)
+        else:
+            super().keyPressEvent(event)
 
 
 class AboutDialog(QDialog):
@@ -165,8 +5663,45 @@ class Notepad(QMainWindow):
         self.last_file_path: Optional[str] = self.settings.get("last_session")
         self.word_wrap_enabled: bool = self.settings.get("word_wrap", False)
         self.reopen_last_enabled: bool = self.settings.get("reopen_last", True)
-        self.recent_files: List[str] = self.settings.get("recent_files", [])
+        self.undo_memory_mb = int(self.settings.get("undo_memory_mb", 64))
+        self.undo_max_steps = int(self.settings.get("undo_max_steps", 1000))
+        self.undo_spill_to_disk: bool = self.settings.get(
+            "undo_spill_to_disk", True
+        )
+        self.recompress_on_save: bool = self.settings.get(
+            "recompress_on_save", False
+        )
+        self.spell_check_enabled: bool = self.settings.get(
+            "spell_check", False
+        )
+        self.word_completion_enabled: bool = self.settings.get(
+            "word_completion", False
+        )
+        self.save_all_on_close: bool = self.settings.get(
+            "save_all_on_close", False
+        )
+        self.save_pool = QThreadPool(self)
+        self.save_pool.setMaxThreadCount(SAVE_ALL_THREADS)
+        self.history_enabled: bool = self.settings.get("history_enabled", True)
+        self.history_keep_days = int(
+            self.settings.get("history_keep_days", 30)
+        )
+        self.history_max_revisions = int(
+            self.settings.get("history_max_revisions", 50)
+        )
+        self.history = HistoryStore(
+            os.path.splitext(self.settings_file)[0] + ".history"
+        )
+        self.history_pool = QThreadPool(self)
+        self.history_pool.setMaxThreadCount(1)
+        self.history_records = 0
+        QTimer.singleShot(HISTORY_GC_DELAY, self.collect_history)
         self.max_recent_files = int(self.settings.get("max_recent_files", 5))
+        self.recent_files: List[str] = []
+        self.recent_files_exist: Dict[str, bool] = {}
+        self.recent_file_actions: Dict[str, QAction] = {}
+        self.recent_files_validator: Optional[RecentFilesValidator] = None
+        self.load_recent_files()
 
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
@@ -179,6 +5714,10 @@ class Notepad(QMainWindow):
         self.char_count_label.hide()
         self.statusBar.addPermanentWidget(self.char_count_label)
 
+        self.line_count_label = QLabel("Lines: 0")
+        self.line_count_label.hide()
+        self.statusBar.addPermanentWidget(self.line_count_label)
+
         self.file_status_label = QLabel("Status: No File")
         self.statusBar.addPermanentWidget(self.file_status_label)
 
@@ -186,11 +5725,38 @@ class Notepad(QMainWindow):
         self.update_word_count_timer.timeout.connect(self.update_counts)
         self.update_word_count_timer.start(1000)
 
+        self.display_setting_handlers = {"word_wrap": self.apply_word_wrap}
+        self.statistics_panel: Optional[StatisticsPanel] = None
+        self.line_operation_worker: Optional[LineOperationWorker] = None
+        self.documents: Dict[str, QWidget] = {}
+        self.spell_checker = SpellChecker(
+            SpellDictionary(
+                os.path.splitext(self.settings_file)[0] + ".dictionary",
+                self.settings_file,
+                self.get_resource,
+            ),
+            self,
+        )
+        self.spell_checker.unavailable.connect(self.on_spell_check_unavailable)
+        self.spell_check_available = self.spell_checker.dictionary.exists()
+        if not self.spell_check_available:
+            self.spell_check_enabled = False
+        self.completion_index = CompletionIndex(self)
+        self.completion_prefix = ""
+        self.completion_editor: Optional[QPlainTextEdit] = None
+        self.completer = QCompleter(self)
+        self.completer.setModel(QStringListModel(self.completer))
+        self.completer.setCompletionMode(
+            QCompleter.CompletionMode.UnfilteredPopupCompletion
+        )
+        self.completer.activated.connect(self.insert_completion)
+
         self.file_menu = None
         self.recent_menu = None
         self.edit_menu = None
         self.create_menu()
         self.update_menu_state()
+        self.validate_recent_files()
 
         if self.reopen_last_enabled and self.last_file_path:
             self.open_file(self.last_file_path)
@@ -274,7 +5840,22 @@ class Notepad(QMainWindow):
         )
 
         self.recent_menu = QMenu("Recent", self)
+        self.recent_menu.setToolTipsVisible(True)
         self.recent_menu_action = self.file_menu.addMenu(self.recent_menu)
+        self.recent_none_action = self.create_action("(none)", lambda: None)
+        self.recent_none_action.setEnabled(False)
+        self.recent_menu.addAction(self.recent_none_action)
+        self.recent_menu.addSeparator()
+        self.recent_menu.addAction(
+            self.create_action("Clear Unpinned", self.clear_recent_files)
+        )
+        self.file_menu.addAction(
+            self.create_action(
+                "Quick Open...",
+                self.show_quick_open,
+                QKeySequence("Ctrl+P"),
+            )
+        )
 
         self.file_menu.addAction(
             self.create_action(
@@ -297,6 +5878,16 @@ class Notepad(QMainWindow):
         )
         self.file_menu.addAction(self.save_as_action)
 
+        self.save_all_action = self.create_action(
+            "Save All", self.save_all, QKeySequence("Ctrl+Alt+S")
+        )
+        self.file_menu.addAction(self.save_all_action)
+
+        self.history_action = self.create_action(
+            "Local History...", self.show_history
+        )
+        self.file_menu.addAction(self.history_action)
+
         self.file_menu.addSeparator()
 
         self.close_tab_action = self.create_action(
@@ -366,6 +5957,23 @@ class Notepad(QMainWindow):
             )
         )
 
+        view_menu = self.menuBar().addMenu("View")
+        view_menu.addAction(
+            self.create_action(
+                "Split Left/Right",
+                partial(self.split_view, Qt.Orientation.Horizontal),
+            )
+        )
+        view_menu.addAction(
+            self.create_action(
+                "Split Top/Bottom",
+                partial(self.split_view, Qt.Orientation.Vertical),
+            )
+        )
+        view_menu.addAction(
+            self.create_action("Close Split", self.close_split_view)
+        )
+
         options_menu = self.menuBar().addMenu("Options")
         word_wrap_action = self.create_action(
             "Word Wrap", self.toggle_word_wrap, checkable=True
@@ -379,6 +5987,37 @@ class Notepad(QMainWindow):
         reopen_last_action.setChecked(self.reopen_last_enabled)
         options_menu.addAction(reopen_last_action)
 
+        recompress_action = self.create_action(
+            "Edit and Recompress Compressed Files",
+            self.toggle_recompress_on_save,
+            checkable=True,
+        )
+        recompress_action.setChecked(self.recompress_on_save)
+        options_menu.addAction(recompress_action)
+
+        save_all_on_close_action = self.create_action(
+            "Save All on Close", self.toggle_save_all_on_close, checkable=True
+        )
+        save_all_on_close_action.setChecked(self.save_all_on_close)
+        options_menu.addAction(save_all_on_close_action)
+
+        self.spell_check_action = self.create_action(
+            "Check Spelling", self.toggle_spell_check, checkable=True
+        )
+        self.spell_check_action.setChecked(self.spell_check_enabled)
+        self.spell_check_action.setEnabled(self.spell_check_available)
+        if not self.spell_check_available:
+            self.spell_check_action.setStatusTip(
+                "No spelling dictionary was found"
+            )
+        options_menu.addAction(self.spell_check_action)
+
+        word_completion_action = self.create_action(
+            "Word Completion", self.toggle_word_completion, checkable=True
+        )
+        word_completion_action.setChecked(self.word_completion_enabled)
+        options_menu.addAction(word_completion_action)
+
         recent_files_menu = options_menu.addMenu("Max Recent Files")
         self.recent_files_action_group = QActionGroup(self)
         self.recent_files_action_group.setExclusive(True)
@@ -394,6 +6033,96 @@ class Notepad(QMainWindow):
 
         self.update_recent_files_menu()
 
+        undo_menu = options_menu.addMenu("Undo History")
+        undo_memory_menu = undo_menu.addMenu("Memory Limit")
+        self.undo_memory_action_group = QActionGroup(self)
+        self.undo_memory_action_group.setExclusive(True)
+        for megabytes in (8, 32, 64, 256, 1024):
+            action = self.create_action(
+                f"{megabytes} MB",
+                partial(self.set_undo_memory_limit, megabytes),
+                checkable=True,
+            )
+            action.setChecked(megabytes == self.undo_memory_mb)
+            self.undo_memory_action_group.addAction(action)
+            undo_memory_menu.addAction(action)
+
+        undo_steps_menu = undo_menu.addMenu("Step Limit")
+        self.undo_steps_action_group = QActionGroup(self)
+        self.undo_steps_action_group.setExclusive(True)
+        for steps in (100, 1000, 10000, 100000):
+            action = self.create_action(
+                str(steps),
+                partial(self.set_undo_max_steps, steps),
+                checkable=True,
+            )
+            action.setChecked(steps == self.undo_max_steps)
+            self.undo_steps_action_group.addAction(action)
+            undo_steps_menu.addAction(action)
+
+        undo_spill_action = self.create_action(
+            "Spill to Disk", self.toggle_undo_spill_to_disk, checkable=True
+        )
+        undo_spill_action.setChecked(self.undo_spill_to_disk)
+        undo_menu.addAction(undo_spill_action)
+
+        history_menu = options_menu.addMenu("Local History")
+        history_enabled_action = self.create_action(
+            "Record on Save", self.toggle_history, checkable=True
+        )
+        history_enabled_action.setChecked(self.history_enabled)
+        history_menu.addAction(history_enabled_action)
+
+        history_days_menu = history_menu.addMenu("Keep For")
+        self.history_days_action_group = QActionGroup(self)
+        self.history_days_action_group.setExclusive(True)
+        for days in (7, 30, 90, 365):
+            action = self.create_action(
+                f"{days} Days",
+                partial(self.set_history_keep_days, days),
+                checkable=True,
+            )
+            action.setChecked(days == self.history_keep_days)
+            self.history_days_action_group.addAction(action)
+            history_days_menu.addAction(action)
+
+        history_revisions_menu = history_menu.addMenu("Revisions per File")
+        self.history_revisions_action_group = QActionGroup(self)
+        self.history_revisions_action_group.setExclusive(True)
+        for revisions in (10, 50, 200, 1000):
+            action = self.create_action(
+                str(revisions),
+                partial(self.set_history_max_revisions, revisions),
+                checkable=True,
+            )
+            action.setChecked(revisions == self.history_max_revisions)
+            self.history_revisions_action_group.addAction(action)
+            history_revisions_menu.addAction(action)
+
+        tools_menu = self.menuBar().addMenu("Tools")
+        tools_menu.addAction(
+            self.create_action("Statistics", self.show_statistics)
+        )
+        tools_menu.addAction(
+            self.create_action(
+                "Table View", self.toggle_table_view, "Ctrl+Shift+T"
+            )
+        )
+        lines_menu = tools_menu.addMenu("Lines")
+        for operation, label in LineOperationsDialog.OPERATIONS:
+            lines_menu.addAction(
+                self.create_action(
+                    f"{label}...",
+                    partial(self.show_line_operations, operation),
+                )
+            )
+
+        if self.debug_enabled:
+            debug_menu = self.menuBar().addMenu("Debug")
+            debug_menu.addAction(
+                self.create_action("Undo Memory", self.show_undo_memory)
+            )
+
         help_menu = self.menuBar().addMenu("Help")
         help_menu.addAction(
             self.create_action("About CNB Notepad", self.show_about)
@@ -441,66 +6170,480 @@ class Notepad(QMainWindow):
         if file_path:
             self.open_file(file_path, read_only=True)
 
-    def open_file(self, file_path: str, read_only: bool = False) -> None:
-        """Open the specified file and create a new tab for it."""
-        if os.path.exists(file_path):
-            with open(file_path, "r") as file:
-                content = file.read()
-                editor = self.create_editor(content)
-                editor.setReadOnly(read_only)
-                self.tabs.addTab(editor, os.path.basename(file_path))
-                self.tabs.setCurrentWidget(editor)
-                self.last_file_path = file_path
-                self.settings["last_session"] = file_path
-                self.add_recent_file(file_path)
-                self.save_settings()
+    def open_file(
+        self,
+        file_path: str,
+        read_only: bool = False,
+        metadata: Optional[Dict] = None,
+    ) -> None:
+        """Open the specified file and create a new tab for it.
+
+        A file that is already open is focused instead of loaded again,
+        unless it is opened read-only while its tab is editable; the
+        read-only copy then gets a tab of its own.
+        """
+        existing = self.find_document(file_path)
+        if read_only and (
+            (
+                isinstance(existing, QPlainTextEdit)
+                and not existing.isReadOnly()
+            )
+            or (
+                isinstance(existing, LargeFileEditor)
+                and not existing.is_read_only()
+            )
+        ):
+            existing = None
+        compression = detect_compression(file_path)
+        if existing is not None:
+            self.tabs.setCurrentIndex(self.tab_index(existing))
+            self.add_recent_file(file_path)
+        elif compression:
+            self.open_compressed_file(
+                file_path,
+                compression,
+                read_only or not self.recompress_on_save,
+            )
+        elif os.path.exists(file_path) and is_binary_file(file_path):
+            self.open_hex_view(file_path)
+        elif os.path.exists(file_path) and large_text_format(file_path):
+            self.open_large_file(file_path, read_only)
+        elif os.path.exists(file_path):
+            if metadata is None:
+                metadata = self.get_file_metadata([file_path]).get(file_path)
+            stat = os.stat(file_path)
+            with open(file_path, "rb") as file:
+                raw = file.read()
+            if not self.file_metadata_matches(metadata, stat, raw):
+                metadata = None
+
+            if metadata:
+                encoding = metadata["encoding"]
+                newline = metadata["newline"]
+                content = raw.decode(encoding)
+                data_hash = metadata["content_hash"]
+            else:
+                encoding = detect_encoding(raw)
+                content = raw.decode(encoding)
+                newline = detect_newline(content)
+                data_hash = content_hash(raw)
+            if newline != "\n":
+                content = content.replace(newline, "\n")
+
+            editor = self.create_editor(content)
+            editor.setReadOnly(read_only)
+            editor.file_path = file_path
+            editor.file_metadata = {
+                "inode": stat.st_ino,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "content_hash": data_hash,
+                "encoding": encoding,
+                "newline": newline,
+            }
+            if metadata:
+                self.restore_editor_state(editor, metadata)
+            self.register_document(editor)
+            self.tabs.addTab(editor, os.path.basename(file_path))
+            self.tabs.setCurrentWidget(editor)
+            self.last_file_path = file_path
+            self.settings["last_session"] = file_path
+            self.add_recent_file(file_path)
+            self.save_settings()
         self.update_title()
         self.update_file_status()
         self.update_counts()
 
+    def open_hex_view(self, file_path: str) -> None:
+        """Open a binary file in a read-only hex view tab."""
+        try:
+            viewer = HexViewer(file_path)
+        except OSError as e:
+            QMessageBox.critical(
+                self, "Error", f"Could not open {file_path}:\n{e}"
+            )
+            return
+        self.register_document(viewer)
+        self.tabs.addTab(viewer, os.path.basename(file_path))
+        self.tabs.setCurrentWidget(viewer)
+        self.last_file_path = file_path
+        self.settings["last_session"] = file_path
+        self.add_recent_file(file_path)
+        self.save_settings()
+
+    def open_large_file(self, file_path: str, read_only: bool) -> None:
+        """Open a very large text file in a piece table editor tab."""
+        encoding, newline = large_text_format(file_path)
+        try:
+            viewer = LargeFileEditor(file_path, encoding, newline, read_only)
+        except OSError as e:
+            QMessageBox.critical(
+                self, "Error", f"Could not open {file_path}:\n{e}"
+            )
+            return
+        viewer.view.changed.connect(
+            partial(self.on_large_file_changed, viewer)
+        )
+        self.register_document(viewer)
+        self.tabs.addTab(viewer, os.path.basename(file_path))
+        self.tabs.setCurrentWidget(viewer)
+        viewer.view.setFocus()
+        self.last_file_path = file_path
+        self.settings["last_session"] = file_path
+        self.add_recent_file(file_path)
+        self.save_settings()
+
+    def on_large_file_changed(self, viewer: LargeFileEditor) -> None:
+        """Show whether a large file tab has unsaved changes."""
+        index = self.tab_index(viewer)
+        tab_name = self.tabs.tabText(index).lstrip("•")
+        if viewer.is_modified():
+            tab_name = "•" + tab_name
+        self.tabs.setTabText(index, tab_name)
+        self.update_title()
+        self.update_file_status()
+        self.update_menu_state()
+
+    def open_compressed_file(
+        self, file_path: str, compression: str, read_only: bool = True
+    ) -> None:
+        """Open a compressed file, decompressing it into a new tab.
+
+        The text streams in from a background loader; the tab stays
+        read-only until the whole file has arrived.
+        """
+        editor = self.create_editor()
+        editor.setReadOnly(True)
+        editor.file_path = file_path
+        editor.file_metadata = {"compression": compression}
+        editor.undo_history.paused = True
+        editor.blockSignals(True)
+        loader = CompressedFileLoader(file_path, compression)
+        loader.signals.chunk.connect(
+            partial(self.on_compressed_chunk, editor, loader)
+        )
+        loader.signals.finished.connect(
+            partial(self.on_compressed_file_loaded, editor, loader, read_only)
+        )
+        loader.signals.failed.connect(
+            partial(self.on_compressed_file_failed, editor, loader)
+        )
+        editor.compressed_loader = loader
+        self.register_document(editor)
+        self.tabs.addTab(editor, os.path.basename(file_path))
+        self.tabs.setCurrentWidget(editor)
+        self.last_file_path = file_path
+        self.settings["last_session"] = file_path
+        self.add_recent_file(file_path)
+        self.save_settings()
+        self.statusBar.showMessage(f"Decompressing {file_path}...")
+        QThreadPool.globalInstance().start(loader)
+
+    def on_compressed_chunk(
+        self, editor: QPlainTextEdit, loader: CompressedFileLoader, text: str
+    ) -> None:
+        """Append a decompressed chunk to the end of its tab."""
+        if editor.compressed_loader is not loader:
+            return
+        cursor = QTextCursor(editor.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        editor.document().setModified(False)
+        loader.consumed()
+
+    def finish_compressed_load(
+        self, editor: QPlainTextEdit, read_only: bool
+    ) -> None:
+        """Hand a tab back to the user once its loader has stopped."""
+        editor.compressed_loader = None
+        editor.undo_history.paused = False
+        editor.undo_history.clear()
+        self.completion_index.reindex(editor)
+        editor.document().setModified(False)
+        editor.blockSignals(False)
+        editor.setReadOnly(read_only)
+        self.statusBar.clearMessage()
+        if editor is self.get_current_editor():
+            self.text_changed()
+
+    def on_compressed_file_loaded(
+        self,
+        editor: QPlainTextEdit,
+        loader: CompressedFileLoader,
+        read_only: bool,
+        encoding: str,
+        newline: str,
+    ) -> None:
+        """Finish opening a compressed file."""
+        if editor.compressed_loader is not loader:
+            return
+        editor.file_metadata.update(encoding=encoding, newline=newline)
+        self.finish_compressed_load(editor, read_only)
+
+    def on_compressed_file_failed(
+        self, editor: QPlainTextEdit, loader: CompressedFileLoader, error: str
+    ) -> None:
+        """Keep what was decompressed, but never save it over the file."""
+        if editor.compressed_loader is not loader:
+            return
+        file_path = editor.file_path
+        self.forget_document(editor)
+        editor.file_path = None
+        editor.file_metadata = {}
+        self.finish_compressed_load(editor, True)
+        QMessageBox.warning(
+            self,
+            "Error",
+            f"Failed to decompress {file_path}:\n{error}",
+        )
+
+    def open_files(self, file_paths: List[str]) -> None:
+        """Open several files, looking up their metadata in one query."""
+        metadata = self.get_file_metadata(file_paths)
+        for file_path in file_paths:
+            self.open_file(file_path, metadata=metadata.get(file_path))
+
     def save_file(self) -> bool:
         """Save the current file."""
-        editor = self.tabs.currentWidget()
+        widget = self.tabs.currentWidget()
+        if isinstance(widget, LargeFileEditor):
+            widget.save()
+            return True
+        editor = self.get_current_editor()
         if editor:
-            file_path = self.last_file_path
-            if not file_path:
-                return self.save_file_as()
-            else:
-                self.write_to_file(file_path, editor.toPlainText())
-                self.set_tab_saved(self.tabs.currentIndex())
-                return True
+            return self.save_editor(editor)
         return False
 
     def save_file_as(self) -> bool:
         """Save the current file with a new name."""
-        editor = self.tabs.currentWidget()
+        editor = self.get_current_editor()
         if editor:
-            options = QFileDialog.Option.DontUseNativeDialog
-            file_path, _ = QFileDialog.getSaveFileName(
+            return self.save_editor_as(editor)
+        return False
+
+    def save_editor(self, editor: QPlainTextEdit) -> bool:
+        """Save an editor to its file, asking for a name if it has none."""
+        if not editor.file_path:
+            return self.save_editor_as(editor)
+        return self.write_editor(editor, editor.file_path)
+
+    def save_editor_as(self, editor: QPlainTextEdit) -> bool:
+        """Save an editor under a name the user picks."""
+        file_path = self.ask_save_path(editor)
+        if not file_path or not self.write_editor(editor, file_path):
+            return False
+        self.last_file_path = file_path
+        self.settings["last_session"] = file_path
+        self.add_recent_file(file_path)
+        self.save_settings()
+        return True
+
+    def write_editor(self, editor: QPlainTextEdit, file_path: str) -> bool:
+        """Write an editor to a file, showing an error if that fails."""
+        try:
+            self.write_to_file(file_path, editor)
+        except OSError as e:
+            QMessageBox.critical(
+                self, "Error", f"Could not save {file_path}:\n{e}"
+            )
+            return False
+        self.set_tab_saved(self.tab_index(editor))
+        return True
+
+    def ask_save_path(self, editor: QPlainTextEdit) -> Optional[str]:
+        """Ask for a file name to save an editor under."""
+        options = QFileDialog.Option.DontUseNativeDialog
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Save As",
+            "",
+            "Text Files (*.txt);;All Files (*)",
+            options=options,
+        )
+        if not file_path:
+            return None
+        if not os.path.splitext(file_path)[1]:
+            file_path += ".txt"
+        existing = self.find_document(file_path)
+        if existing is not None and existing is not editor:
+            QMessageBox.warning(
                 self,
                 "Save As",
-                "",
-                "Text Files (*.txt);;All Files (*)",
-                options=options,
-            )
-            if file_path:
-                if not os.path.splitext(file_path)[1]:
-                    file_path += ".txt"
-                self.write_to_file(file_path, editor.toPlainText())
-                self.last_file_path = file_path
-                self.settings["last_session"] = file_path
-                self.add_recent_file(file_path)
-                self.save_settings()
-                self.set_tab_saved(self.tabs.currentIndex())
-                return True
-        return False
+                f"{file_path} is open in another tab. Close that tab "
+                "before saving over the file.",
+            )
+            return None
+        compression = editor.file_metadata.get("compression")
+        if compression and not file_path.endswith(
+            COMPRESSION_SUFFIXES[compression]
+        ):
+            del editor.file_metadata["compression"]
+        return file_path
+
+    def save_all(self) -> bool:
+        """Save every modified tab, writing the files concurrently.
+
+        Untitled tabs are asked for a name first, and skipped if that is
+        cancelled. The files are then written on a bounded thread pool,
+        and large files on their own savers, while a modal progress
+        dialog waits. Tab states, file metadata, the recent files list and
+        the settings are updated in one batch once every write is done.
+        Failures are listed together; returns whether all modified tabs
+        were saved.
+        """
+        jobs = {}
+        new_paths = []
+        large_files = []
+        skipped = 0
+        for index in range(self.tabs.count()):
+            widget = self.tabs.widget(index)
+            if isinstance(widget, LargeFileEditor) and widget.is_modified():
+                large_files.append(widget)
+                continue
+            editor = self.tab_editor(widget)
+            if (
+                editor is None
+                or not editor.document().isModified()
+                or editor.compressed_loader is not None
+            ):
+                continue
+            file_path = editor.file_path
+            if not file_path:
+                self.tabs.setCurrentIndex(index)
+                file_path = self.ask_save_path(editor)
+                if not file_path:
+                    skipped += 1
+                    continue
+                new_paths.append(file_path)
+            jobs[len(jobs)] = (
+                editor,
+                file_path,
+                editor.document().revision(),
+                SaveFileWorker(
+                    len(jobs),
+                    file_path,
+                    editor.toPlainText(),
+                    editor.file_metadata.get("encoding", "utf-8"),
+                    editor.file_metadata.get("newline", os.linesep),
+                    editor.file_metadata.get("compression"),
+                ),
+            )
+        if not jobs and not large_files:
+            return not skipped
+
+        total = len(jobs) + len(large_files)
+        results = {}
+        loop = QEventLoop()
+        progress = QProgressDialog("Saving files...", None, 0, total, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        def on_result(key: int, *result) -> None:
+            results[key] = result
+            progress.setValue(len(results))
+            if len(results) == total:
+                loop.quit()
+
+        for editor, file_path, revision, worker in jobs.values():
+            worker.signals.saved.connect(on_result)
+            worker.signals.failed.connect(on_result)
+            self.save_pool.start(worker)
+        slots = []
+        for key, widget in enumerate(large_files, len(jobs)):
+            slot = partial(on_result, key)
+            widget.saved.connect(slot)
+            widget.save_failed.connect(slot)
+            slots.append(slot)
+            widget.save(report=False)
+        if len(results) < total:
+            loop.exec()
+        progress.close()
+        for widget, slot in zip(large_files, slots):
+            widget.saved.disconnect(slot)
+            widget.save_failed.disconnect(slot)
+
+        failures = []
+        for key, widget in enumerate(large_files, len(jobs)):
+            if results[key]:
+                failures.append(f"{widget.file_path}: {results[key][0]}")
+        saved = []
+        for key, (editor, file_path, revision, worker) in jobs.items():
+            result = results[key]
+            if len(result) == 1:
+                failures.append(f"{file_path}: {result[0]}")
+                if file_path in new_paths:
+                    new_paths.remove(file_path)
+                continue
+            stat, data_hash = result
+            if self.tab_index(editor) == -1:
+                self.record_history(file_path, worker.data, worker.encoding)
+                continue
+            self.update_saved_metadata(editor, file_path, stat, data_hash)
+            self.record_history(file_path, worker.data, worker.encoding)
+            worker.data = b""
+            if editor.document().revision() == revision:
+                self.set_tab_saved(self.tab_index(editor))
+            saved.append(editor)
+        self.store_file_metadata(saved)
+        if new_paths:
+            self.last_file_path = new_paths[-1]
+            self.settings["last_session"] = new_paths[-1]
+            self.add_recent_files(new_paths)
+            self.save_settings()
+        if failures:
+            QMessageBox.warning(
+                self,
+                "Save All",
+                f"{len(failures)} of {len(jobs) + len(large_files)} file(s)"
+                " could not be saved:"
+                "\n\n" + "\n".join(failures),
+            )
+        else:
+            self.statusBar.showMessage(
+                f"Saved {len(jobs) + len(large_files)} file(s)", 2000
+            )
+        return not failures and not skipped
+
+    def write_to_file(self, file_path: str, editor: QPlainTextEdit) -> None:
+        """Write the editor's content to the specified file."""
+        encoding = editor.file_metadata.get("encoding", "utf-8")
+        newline = editor.file_metadata.get("newline", os.linesep)
+        data = encode_text(editor.toPlainText(), encoding, newline)
+        atomic_write(file_path, data, editor.file_metadata.get("compression"))
+        self.update_saved_metadata(
+            editor, file_path, os.stat(file_path), content_hash(data)
+        )
+        self.store_file_metadata([editor])
+        self.record_history(file_path, data, encoding)
 
-    def write_to_file(self, file_path: str, content: str) -> None:
-        """Write the given content to the specified file."""
-        with open(file_path, "w") as file:
-            file.write(content)
+    def update_saved_metadata(
+        self,
+        editor: QPlainTextEdit,
+        file_path: str,
+        stat: os.stat_result,
+        data_hash: str,
+    ) -> None:
+        """Point an editor at the file it was just written to."""
+        encoding = editor.file_metadata.get("encoding", "utf-8")
+        newline = editor.file_metadata.get("newline", os.linesep)
+        compression = editor.file_metadata.get("compression")
+        self.forget_document(editor)
+        editor.file_path = file_path
+        self.register_document(editor)
+        editor.file_metadata = {
+            "inode": stat.st_ino,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "content_hash": data_hash,
+            "encoding": encoding,
+            "newline": newline,
+            "counts": editor.cached_counts,
+        }
+        if compression:
+            editor.file_metadata["compression"] = compression
         self.tabs.setTabText(
-            self.tabs.currentIndex(), os.path.basename(file_path)
+            self.tab_index(editor), os.path.basename(file_path)
         )
         self.update_title()
 
@@ -508,6 +6651,21 @@ class Notepad(QMainWindow):
         """Close the tab at the given index."""
         if self.maybe_save(index):
             widget = self.tabs.widget(index)
+            editor = self.tab_editor(widget)
+            if editor is not None:
+                self.forget_document(editor)
+                self.completion_index.remove_document(editor)
+                if self.completion_editor is editor:
+                    self.completer.popup().hide()
+                    self.completion_editor = None
+                self.store_file_metadata([editor])
+                if editor.compressed_loader is not None:
+                    editor.compressed_loader.cancel()
+                    editor.compressed_loader = None
+                editor.undo_history.close()
+            elif widget:
+                self.forget_document(widget)
+                widget.close_file()
             if widget:
                 widget.deleteLater()
                 self.tabs.removeTab(index)
@@ -532,11 +6690,16 @@ class Notepad(QMainWindow):
 
     def maybe_save(self, index: int) -> bool:
         """Check if the document needs saving and ask the user if necessary."""
-        editor = self.tabs.widget(index)
-        if editor and editor.document().isModified():
+        widget = self.tabs.widget(index)
+        editor = self.tab_editor(widget)
+        large_file = isinstance(widget, LargeFileEditor)
+        if (
+            editor is not None
+            and editor.document().isModified()
+            or large_file
+            and widget.is_modified()
+        ):
             tab_name = self.tabs.tabText(index)
-            is_untitled = tab_name == "Untitled" or tab_name == "•Untitled"
-
             ret = QMessageBox.warning(
                 self,
                 "Application",
@@ -550,37 +6713,62 @@ class Notepad(QMainWindow):
             )
 
             if ret == QMessageBox.StandardButton.Save:
-                if is_untitled:
-                    return self.save_file_as()
-                else:
-                    return self.save_file()
+                if large_file:
+                    try:
+                        widget.save_and_wait()
+                    except OSError as e:
+                        QMessageBox.critical(
+                            self, "Error", f"Could not save {tab_name}:\n{e}"
+                        )
+                        return False
+                    return True
+                return self.save_editor(editor)
             elif ret == QMessageBox.StandardButton.Cancel:
                 return False
         return True
 
     def closeEvent(self, event):
         """Handle the window close event."""
+        if self.save_all_on_close and not self.save_all():
+            event.ignore()
+            return
         for i in range(self.tabs.count()):
             if not self.maybe_save(i):
                 event.ignore()
                 return
+        self.store_file_metadata(self.editors())
+        self.completion_index.clear()
+        self.completion_index.pool.waitForDone()
+        if self.statistics_panel is not None:
+            self.statistics_panel.shutdown()
+        for editor in self.editors():
+            if editor.compressed_loader is not None:
+                editor.compressed_loader.cancel()
+        for index in range(self.tabs.count()):
+            widget = self.tabs.widget(index)
+            if self.tab_editor(widget) is None:
+                widget.close_file()
         event.accept()
 
     def cut_text(self) -> None:
         """Cut the selected text in the current editor."""
-        self.get_current_editor().cut()
+        editor = self.get_current_editor()
+        editor.undo_history.capture()
+        editor.undo_history.view.cut()
 
     def copy_text(self) -> None:
         """Copy the selected text in the current editor."""
-        self.get_current_editor().copy()
+        self.get_current_view().copy()
 
     def paste_text(self) -> None:
         """Paste text from the clipboard into the current editor."""
-        self.get_current_editor().paste()
+        editor = self.get_current_editor()
+        editor.undo_history.capture()
+        editor.undo_history.view.paste()
 
     def select_all_text(self) -> None:
         """Select all text in the current editor."""
-        self.get_current_editor().selectAll()
+        self.get_current_view().selectAll()
 
     def show_find(self) -> None:
         """Show the find dialog."""
@@ -598,7 +6786,7 @@ class Notepad(QMainWindow):
 
     def find_text(self) -> None:
         """Find the specified text in the current editor."""
-        editor = self.get_current_editor()
+        editor = self.get_current_view()
         if editor:
             text = self.find_replace_dialog.find_input.text()
             if editor.find(text):
@@ -612,8 +6800,9 @@ class Notepad(QMainWindow):
         if editor:
             find_text = self.find_replace_dialog.find_input.text()
             replace_text = self.find_replace_dialog.replace_input.text()
-            cursor = editor.textCursor()
+            cursor = editor.undo_history.view.textCursor()
             if cursor.hasSelection() and cursor.selectedText() == find_text:
+                editor.undo_history.capture()
                 cursor.insertText(replace_text)
                 self.statusBar.showMessage(
                     f"Replaced '{find_text}' with '{replace_text}'", 2000
@@ -632,7 +6821,12 @@ class Notepad(QMainWindow):
                 find_text, replace_text
             ), content.count(find_text)
             if count > 0:
-                editor.setPlainText(new_content)
+                editor.undo_history.capture(
+                    0, editor.document().characterCount()
+                )
+                cursor = editor.textCursor()
+                cursor.select(QTextCursor.SelectionType.Document)
+                cursor.insertText(new_content)
                 self.statusBar.showMessage(
                     f"Replaced {count} occurrence(s) of '{find_text}' "
                     f"with '{replace_text}'",
@@ -642,22 +6836,207 @@ class Notepad(QMainWindow):
                 self.statusBar.showMessage(f"'{find_text}' not found", 2000)
 
     def toggle_word_wrap(self) -> None:
-        """Toggle word wrap for the current editor."""
+        """Toggle word wrap for all editors."""
         self.word_wrap_enabled = not self.word_wrap_enabled
-        editor = self.get_current_editor()
-        if editor:
-            editor.setLineWrapMode(
-                QPlainTextEdit.LineWrapMode.WidgetWidth
-                if self.word_wrap_enabled
-                else QPlainTextEdit.LineWrapMode.NoWrap
+        self.set_display_setting("word_wrap", self.word_wrap_enabled)
+        self.settings["word_wrap"] = str(self.word_wrap_enabled)
+        self.save_settings()
+
+    def set_display_setting(self, key: str, value) -> None:
+        """Apply a display setting now to the visible tab, later to others."""
+        current = self.get_current_editor()
+        for editor in self.editors():
+            if editor is current:
+                self.display_setting_handlers[key](editor, value)
+            else:
+                editor.pending_display_settings[key] = value
+
+    def apply_pending_display_settings(self, editor: QPlainTextEdit) -> None:
+        """Apply display settings deferred while the tab was hidden."""
+        pending = editor.pending_display_settings
+        while pending:
+            key, value = pending.popitem()
+            self.display_setting_handlers[key](editor, value)
+
+    def apply_word_wrap(self, editor: QPlainTextEdit, enabled: bool) -> None:
+        """Set an editor's wrap mode, skipping the relayout if unchanged."""
+        mode = (
+            QPlainTextEdit.LineWrapMode.WidgetWidth
+            if enabled
+            else QPlainTextEdit.LineWrapMode.NoWrap
+        )
+        for view in [editor, *editor.split_views]:
+            if view.lineWrapMode() != mode:
+                view.setLineWrapMode(mode)
+
+    def toggle_reopen_last(self) -> None:
+        """Toggle the option to reopen the last file on startup."""
+        self.reopen_last_enabled = not self.reopen_last_enabled
+        self.settings["reopen_last"] = str(self.reopen_last_enabled)
+        self.save_settings()
+
+    def toggle_word_completion(self) -> None:
+        """Toggle the word completion popup."""
+        self.word_completion_enabled = not self.word_completion_enabled
+        self.settings["word_completion"] = str(self.word_completion_enabled)
+        self.save_settings()
+        self.completer.popup().hide()
+        if self.word_completion_enabled:
+            for editor in self.editors():
+                self.completion_index.add_document(editor)
+        else:
+            self.completion_index.clear()
+
+    def editor_keyPressEvent(
+        self, editor: QPlainTextEdit, view: QPlainTextEdit, event
+    ) -> None:
+        """Handle a key press in a view, leaving popup keys to the completer."""
+        if (
+            self.completer.popup().isVisible()
+            and self.completer.widget() is view
+        ):
+            if event.key() in (
+                Qt.Key.Key_Return,
+                Qt.Key.Key_Enter,
+                Qt.Key.Key_Escape,
+                Qt.Key.Key_Tab,
+                Qt.Key.Key_Backtab,
+            ):
+                event.ignore()
+                return
+            editor.undo_history.capture()
+        QPlainTextEdit.keyPressEvent(view, event)
+        if self.word_completion_enabled:
+            self.update_completion(editor, view, event.text())
+
+    def update_completion(
+        self, editor: QPlainTextEdit, view: QPlainTextEdit, typed: str
+    ) -> None:
+        """Show or hide the completion popup for the word being typed."""
+        popup = self.completer.popup()
+        cursor = view.textCursor()
+        match = None
+        if typed and (typed[-1].isalnum() or typed[-1] in "_-."):
+            match = COMPLETION_PREFIX_PATTERN.search(
+                cursor.block().text()[: cursor.positionInBlock()]
+            )
+        if match is None or len(match.group()) < COMPLETION_MIN_PREFIX:
+            popup.hide()
+            return
+        self.completion_prefix = match.group()
+        suggestions = self.completion_index.complete(
+            self.completion_prefix, editor, cursor
+        )
+        if not suggestions:
+            popup.hide()
+            return
+        self.completion_editor = editor
+        self.completer.setWidget(view)
+        self.completer.model().setStringList(suggestions)
+        rect = view.cursorRect()
+        rect.setWidth(
+            popup.sizeHintForColumn(0)
+            + popup.verticalScrollBar().sizeHint().width()
+        )
+        self.completer.complete(rect)
+        popup.setCurrentIndex(self.completer.completionModel().index(0, 0))
+
+    def insert_completion(self, word: str) -> None:
+        """Replace the word being typed with the chosen completion."""
+        view = self.completer.widget()
+        editor = self.completion_editor
+        if not isinstance(view, QPlainTextEdit) or editor is None:
+            return
+        cursor = view.textCursor()
+        cursor.movePosition(
+            QTextCursor.MoveOperation.Left,
+            QTextCursor.MoveMode.KeepAnchor,
+            utf16_length(self.completion_prefix),
+        )
+        editor.undo_history.capture()
+        cursor.insertText(word)
+        view.setTextCursor(cursor)
+
+    def toggle_spell_check(self) -> None:
+        """Toggle spell checking in all editors."""
+        self.spell_check_enabled = not self.spell_check_enabled
+        self.settings["spell_check"] = str(self.spell_check_enabled)
+        self.save_settings()
+        for editor in self.editors():
+            for view in [editor, *editor.split_views]:
+                if self.spell_check_enabled:
+                    self.spell_checker.attach(view)
+                else:
+                    self.spell_checker.detach(view)
+
+    def on_spell_check_unavailable(self) -> None:
+        """Turn spell checking off when no dictionary can be found."""
+        if self.spell_check_enabled:
+            self.spell_check_action.setChecked(False)
+            self.toggle_spell_check()
+            QMessageBox.warning(
+                self,
+                "Check Spelling",
+                "No spelling dictionary was found. Add a word list to the "
+                "spell_dictionary resource or install /usr/share/dict/words.",
+            )
+
+    def show_editor_context_menu(self, view: QPlainTextEdit, pos) -> None:
+        """Show the edit menu, with spelling suggestions for a bad word."""
+        menu = view.createStandardContextMenu(pos)
+        cursor = view.cursorForPosition(pos)
+        cursor.select(QTextCursor.SelectionType.WordUnderCursor)
+        word = cursor.selectedText()
+        dictionary = self.spell_checker.dictionary
+        if (
+            self.spell_check_enabled
+            and dictionary.available
+            and misspelled_spans(word, dictionary)
+        ):
+            first = menu.actions()[0] if menu.actions() else None
+            suggestions = dictionary.suggestions(word)
+            for suggestion in suggestions:
+                action = QAction(suggestion, menu)
+                action.triggered.connect(
+                    partial(self.replace_word, view, cursor, suggestion)
+                )
+                menu.insertAction(first, action)
+            if not suggestions:
+                action = QAction("No Suggestions", menu)
+                action.setEnabled(False)
+                menu.insertAction(first, action)
+            action = QAction("Add to Dictionary", menu)
+            action.triggered.connect(
+                partial(self.spell_checker.add_word, word)
             )
-        self.settings["word_wrap"] = str(self.word_wrap_enabled)
+            menu.insertAction(first, action)
+            menu.insertSeparator(first)
+        menu.exec(view.viewport().mapToGlobal(pos))
+        menu.deleteLater()
+
+    def replace_word(
+        self, view: QPlainTextEdit, cursor: QTextCursor, text: str
+    ) -> None:
+        """Replace a word picked from the context menu."""
+        editor = self.get_current_editor()
+        if view.isReadOnly() or editor is None:
+            return
+        editor.undo_history.capture(
+            cursor.selectionStart() - UNDO_CAPTURE_WINDOW,
+            cursor.selectionEnd() + UNDO_CAPTURE_WINDOW,
+        )
+        cursor.insertText(text)
+
+    def toggle_recompress_on_save(self) -> None:
+        """Toggle opening compressed files editable, recompressing on save."""
+        self.recompress_on_save = not self.recompress_on_save
+        self.settings["recompress_on_save"] = str(self.recompress_on_save)
         self.save_settings()
 
-    def toggle_reopen_last(self) -> None:
-        """Toggle the option to reopen the last file on startup."""
-        self.reopen_last_enabled = not self.reopen_last_enabled
-        self.settings["reopen_last"] = str(self.reopen_last_enabled)
+    def toggle_save_all_on_close(self) -> None:
+        """Toggle saving every modified tab without asking on close."""
+        self.save_all_on_close = not self.save_all_on_close
+        self.settings["save_all_on_close"] = str(self.save_all_on_close)
         self.save_settings()
 
     def load_settings(self) -> Dict:
@@ -669,16 +7048,36 @@ class Notepad(QMainWindow):
         conn = sqlite3.connect(self.settings_file)
         cursor = conn.cursor()
         cursor.execute("SELECT key, value FROM settings")
+        legacy_recent_files = None
         for key, value in cursor.fetchall():
             if key == "recent_files":
-                settings[key] = value.split(",") if value else []
-            elif key in ("word_wrap", "reopen_last", "debug_enabled"):
+                legacy_recent_files = value.split(",") if value else []
+            elif key in (
+                "word_wrap",
+                "reopen_last",
+                "debug_enabled",
+                "undo_spill_to_disk",
+                "recompress_on_save",
+                "spell_check",
+                "word_completion",
+                "save_all_on_close",
+                "history_enabled",
+            ):
                 settings[key] = value == "True"
-            elif key == "max_recent_files":
+            elif key in (
+                "max_recent_files",
+                "undo_memory_mb",
+                "undo_max_steps",
+            ):
                 settings[key] = int(value)
             else:
                 settings[key] = value
         conn.close()
+        self.create_recent_files_table()
+        self.create_file_metadata_table()
+        self.create_user_dictionary_table()
+        if legacy_recent_files is not None:
+            self.migrate_legacy_recent_files(legacy_recent_files)
         return settings
 
     def save_settings(self) -> None:
@@ -686,8 +7085,6 @@ class Notepad(QMainWindow):
         conn = sqlite3.connect(self.settings_file)
         cursor = conn.cursor()
         for key, value in self.settings.items():
-            if key == "recent_files":
-                value = ",".join(value)
             cursor.execute(
                 "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
                 (key, str(value)),
@@ -711,12 +7108,21 @@ class Notepad(QMainWindow):
             "last_session": None,
             "word_wrap": "False",
             "reopen_last": "True",
-            "recent_files": "",
             "max_recent_files": "5",
             "version": "",
             "date": "",
             "last_checked": "",
             "debug_enabled": "False",
+            "undo_memory_mb": "64",
+            "undo_max_steps": "1000",
+            "undo_spill_to_disk": "True",
+            "recompress_on_save": "False",
+            "spell_check": "False",
+            "word_completion": "False",
+            "save_all_on_close": "False",
+            "history_enabled": "True",
+            "history_keep_days": "30",
+            "history_max_revisions": "50",
         }
         for key, value in default_settings.items():
             cursor.execute(
@@ -726,10 +7132,384 @@ class Notepad(QMainWindow):
         conn.commit()
         conn.close()
 
+    def create_recent_files_table(self) -> None:
+        """Create the recent files table and its ranking index."""
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS recent_files (
+                path TEXT PRIMARY KEY,
+                open_count INTEGER NOT NULL DEFAULT 0,
+                last_opened REAL NOT NULL DEFAULT 0,
+                frecency REAL NOT NULL DEFAULT 0,
+                pinned INTEGER NOT NULL DEFAULT 0,
+                file_exists INTEGER NOT NULL DEFAULT 1
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS recent_files_rank
+            ON recent_files (pinned DESC, frecency DESC)
+        """
+        )
+        conn.commit()
+        conn.close()
+
+    def migrate_legacy_recent_files(self, paths: List[str]) -> None:
+        """Move the old comma-joined recent files setting into its table."""
+        now = time.time()
+        rows = [
+            (path, now - index, frecency_boost(now - index))
+            for index, path in enumerate(paths)
+            if path
+        ]
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO recent_files
+                (path, open_count, last_opened, frecency)
+            VALUES (?, 1, ?, ?)
+        """,
+            rows,
+        )
+        cursor.execute("DELETE FROM settings WHERE key = 'recent_files'")
+        conn.commit()
+        conn.close()
+        logging.debug(f"Migrated {len(rows)} legacy recent files")
+
+    def load_recent_files(self) -> None:
+        """Load the top-ranked recent files shown in the Recent menu."""
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT path, file_exists FROM recent_files
+            ORDER BY pinned DESC, frecency DESC
+            LIMIT ?
+        """,
+            (max(0, self.max_recent_files),),
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        self.recent_files = [path for path, _ in rows]
+        self.recent_files_exist = {
+            path: bool(file_exists) for path, file_exists in rows
+        }
+
+    def query_recent_files(
+        self, pattern: str = "", limit: int = QUICK_OPEN_LIMIT
+    ) -> List[tuple]:
+        """Return (path, pinned, exists) rows fuzzy-matching the pattern."""
+        like = (
+            "%"
+            + "%".join(
+                char.replace("\\", "\\\\")
+                .replace("%", "\\%")
+                .replace("_", "\\_")
+                for char in pattern
+            )
+            + "%"
+        )
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT path, pinned, file_exists FROM recent_files
+            WHERE path LIKE ? ESCAPE '\\'
+            ORDER BY pinned DESC, frecency DESC
+            LIMIT ?
+        """,
+            (like, limit * 5 if pattern else limit),
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        if not pattern:
+            return rows
+        scored = []
+        for rank, row in enumerate(rows):
+            score = fuzzy_score(pattern, row[0])
+            if score is not None:
+                scored.append((-score, rank, row))
+        scored.sort()
+        return [row for _, _, row in scored[:limit]]
+
+    def is_recent_file_pinned(self, file_path: str) -> bool:
+        """Return whether the given recent file is pinned."""
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT pinned FROM recent_files WHERE path = ?", (file_path,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        return bool(row and row[0])
+
+    def set_recent_file_pinned(self, file_path: str, pinned: bool) -> None:
+        """Pin or unpin a recent file so it always ranks first."""
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE recent_files SET pinned = ? WHERE path = ?",
+            (int(pinned), file_path),
+        )
+        conn.commit()
+        conn.close()
+        self.load_recent_files()
+        self.update_recent_files_menu()
+
+    def remove_recent_file(self, file_path: str) -> None:
+        """Forget a file from the recent files table."""
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM recent_files WHERE path = ?", (file_path,))
+        conn.commit()
+        conn.close()
+        self.load_recent_files()
+        self.update_recent_files_menu()
+
+    def clear_recent_files(self) -> None:
+        """Forget all recent files that are not pinned."""
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM recent_files WHERE pinned = 0")
+        conn.commit()
+        conn.close()
+        self.load_recent_files()
+        self.update_recent_files_menu()
+
+    def validate_recent_files(self) -> None:
+        """Check recent file existence on a worker thread."""
+        if self.recent_files_validator is not None:
+            return
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute("SELECT path FROM recent_files")
+        paths = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        if not paths:
+            return
+        self.recent_files_validator = RecentFilesValidator(paths)
+        self.recent_files_validator.signals.finished.connect(
+            self.on_recent_files_validated
+        )
+        QThreadPool.globalInstance().start(self.recent_files_validator)
+
+    def on_recent_files_validated(self, results: Dict[str, bool]) -> None:
+        """Store the existence results and refresh the Recent menu."""
+        self.recent_files_validator = None
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.executemany(
+            "UPDATE recent_files SET file_exists = ? WHERE path = ?",
+            [(int(exists), path) for path, exists in results.items()],
+        )
+        conn.commit()
+        conn.close()
+        for path in self.recent_files:
+            if path in results:
+                self.recent_files_exist[path] = results[path]
+        self.update_recent_files_menu()
+
+    def show_quick_open(self) -> None:
+        """Show the fuzzy-filter quick open palette."""
+        quick_open_dialog = QuickOpenDialog(self)
+        quick_open_dialog.exec()
+
+    def open_recent_file(self, file_path: str) -> None:
+        """Open a file from the recent files list."""
+        if not os.path.isfile(file_path):
+            self.statusBar.showMessage(f"'{file_path}' no longer exists", 2000)
+            conn = sqlite3.connect(self.settings_file)
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE recent_files SET file_exists = 0 WHERE path = ?",
+                (file_path,),
+            )
+            conn.commit()
+            conn.close()
+            if file_path in self.recent_files_exist:
+                self.recent_files_exist[file_path] = False
+                self.update_recent_files_menu()
+            return
+        self.open_file(file_path)
+
+    def create_user_dictionary_table(self) -> None:
+        """Create the table of words added to the spelling dictionary."""
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_dictionary (
+                word TEXT PRIMARY KEY
+            )
+        """
+        )
+        conn.commit()
+        conn.close()
+
+    def create_file_metadata_table(self) -> None:
+        """Create the per-file metadata table used to restore file state."""
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_metadata (
+                path TEXT NOT NULL,
+                inode INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                encoding TEXT NOT NULL,
+                newline TEXT NOT NULL,
+                cursor_position INTEGER NOT NULL DEFAULT 0,
+                scroll_position INTEGER NOT NULL DEFAULT 0,
+                word_wrap INTEGER,
+                word_count INTEGER,
+                char_count INTEGER,
+                line_count INTEGER,
+                last_seen REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (path, inode)
+            )
+        """
+        )
+        conn.commit()
+        conn.close()
+
+    def get_file_metadata(self, file_paths: List[str]) -> Dict[str, Dict]:
+        """Look up cached metadata for the given paths in a single query."""
+        if not file_paths:
+            return {}
+        conn = sqlite3.connect(self.settings_file)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        placeholders = ",".join("?" * len(file_paths))
+        cursor.execute(
+            f"SELECT * FROM file_metadata WHERE path IN ({placeholders})",
+            list(file_paths),
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        metadata = {}
+        for row in rows:
+            entry = dict(row)
+            current = metadata.get(entry["path"])
+            if not current or entry["last_seen"] > current["last_seen"]:
+                metadata[entry["path"]] = entry
+        return metadata
+
+    def file_metadata_matches(
+        self, metadata: Optional[Dict], stat: os.stat_result, raw: bytes
+    ) -> bool:
+        """Check whether cached metadata still describes the file on disk."""
+        if not metadata or metadata["size"] != stat.st_size:
+            return False
+        if (
+            metadata["inode"] == stat.st_ino
+            and metadata["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return True
+        return metadata["content_hash"] == content_hash(raw)
+
+    def store_file_metadata(self, editors: List[QPlainTextEdit]) -> None:
+        """Remember the state of the given editors' files in one batch."""
+        rows = []
+        for editor in editors:
+            file_path = getattr(editor, "file_path", None)
+            if (
+                not file_path
+                or not editor.file_metadata
+                or "compression" in editor.file_metadata
+            ):
+                continue
+            counts = (
+                editor.cached_counts
+                if not editor.document().isModified()
+                else None
+            )
+            if counts is None:
+                counts = editor.file_metadata.get("counts")
+            if counts is None:
+                counts = (None, None, None)
+            editor.file_metadata["counts"] = counts
+            rows.append(
+                (
+                    file_path,
+                    editor.file_metadata["inode"],
+                    editor.file_metadata["mtime_ns"],
+                    editor.file_metadata["size"],
+                    editor.file_metadata["content_hash"],
+                    editor.file_metadata["encoding"],
+                    editor.file_metadata["newline"],
+                    editor.textCursor().position(),
+                    editor.verticalScrollBar().value(),
+                    int(
+                        editor.lineWrapMode()
+                        != QPlainTextEdit.LineWrapMode.NoWrap
+                    ),
+                    *counts,
+                    time.time(),
+                )
+            )
+        if not rows:
+            return
+        conn = sqlite3.connect(self.settings_file)
+        cursor = conn.cursor()
+        cursor.executemany(
+            "DELETE FROM file_metadata WHERE path = ? AND inode != ?",
+            [(row[0], row[1]) for row in rows],
+        )
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO file_metadata VALUES
+                (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            rows,
+        )
+        cursor.execute(
+            """
+            DELETE FROM file_metadata WHERE rowid NOT IN (
+                SELECT rowid FROM file_metadata
+                ORDER BY last_seen DESC LIMIT ?
+            )
+        """,
+            (FILE_METADATA_LIMIT,),
+        )
+        conn.commit()
+        conn.close()
+
+    def restore_editor_state(
+        self, editor: QPlainTextEdit, metadata: Dict
+    ) -> None:
+        """Restore cursor, scroll, wrap and counts from cached metadata."""
+        if metadata["word_wrap"] is not None:
+            self.apply_word_wrap(editor, bool(metadata["word_wrap"]))
+        counts = (
+            metadata["word_count"],
+            metadata["char_count"],
+            metadata["line_count"],
+        )
+        if None not in counts:
+            editor.cached_counts = counts
+            editor.file_metadata["counts"] = counts
+        cursor = editor.textCursor()
+        cursor.setPosition(
+            min(
+                metadata["cursor_position"],
+                editor.document().characterCount() - 1,
+            )
+        )
+        editor.setTextCursor(cursor)
+        scroll_position = metadata["scroll_position"]
+        QTimer.singleShot(
+            0, lambda: editor.verticalScrollBar().setValue(scroll_position)
+        )
+
     def update_title(self) -> None:
         """Update the window title based on the current tab."""
-        editor = self.get_current_editor()
-        if editor:
+        if self.tabs.currentWidget():
             tab_name = self.tabs.tabText(self.tabs.currentIndex())
             if tab_name.startswith("•"):
                 tab_name = tab_name[1:]
@@ -760,101 +7540,296 @@ class Notepad(QMainWindow):
         tab_name = self.tabs.tabText(index)
         if tab_name.startswith("•"):
             self.tabs.setTabText(index, tab_name[1:])
-        editor = self.tabs.widget(index)
+        editor = self.tab_editor(self.tabs.widget(index))
         if editor:
+            editor.undo_history.set_clean()
             editor.document().setModified(False)
         self.update_title()
         self.update_file_status()
 
     def create_editor(self, content: str = "") -> QPlainTextEdit:
         """Create a new text editor widget."""
-        editor = QPlainTextEdit(content)
-        editor.setLineWrapMode(
-            QPlainTextEdit.LineWrapMode.WidgetWidth
-            if self.word_wrap_enabled
-            else QPlainTextEdit.LineWrapMode.NoWrap
+        editor = QPlainTextEdit()
+        editor.split_views = []
+        self.apply_word_wrap(editor, self.word_wrap_enabled)
+        editor.setPlainText(content)
+        editor.pending_display_settings = {}
+        editor.file_path = None
+        editor.file_metadata = {}
+        editor.cached_counts = None
+        editor.chunked_insert = None
+        editor.compressed_loader = None
+        editor.undo_history = UndoHistory(
+            editor,
+            self.undo_memory_mb * 1024 * 1024,
+            self.undo_max_steps,
+            self.undo_spill_to_disk,
         )
+        editor.undo_history.lost_track.connect(
+            partial(self.on_undo_lost_track, editor)
+        )
+        editor.modificationChanged.connect(
+            partial(self.on_modification_changed, editor)
+        )
+        editor.textChanged.connect(partial(self.invalidate_counts, editor))
         editor.textChanged.connect(self.text_changed)
         editor.textChanged.connect(self.update_file_status)
 
         editor.setAcceptDrops(True)
-        editor.dragEnterEvent = self.editor_dragEnterEvent
-        editor.dropEvent = self.editor_dropEvent
+        editor.dragEnterEvent = partial(self.editor_dragEnterEvent, editor)
+        editor.dropEvent = partial(self.editor_dropEvent, editor)
+        editor.insertFromMimeData = partial(
+            self.editor_insertFromMimeData, editor, editor
+        )
+        editor.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        editor.customContextMenuRequested.connect(
+            partial(self.show_editor_context_menu, editor)
+        )
+        if self.spell_check_enabled:
+            self.spell_checker.attach(editor)
+        editor.keyPressEvent = partial(
+            self.editor_keyPressEvent, editor, editor
+        )
+        if self.word_completion_enabled:
+            self.completion_index.add_document(editor)
 
         return editor
 
+    def on_modification_changed(
+        self, editor: QPlainTextEdit, modified: bool
+    ) -> None:
+        """Clear the tab's modified marker when undo returns to clean."""
+        index = self.tab_index(editor)
+        tab_name = self.tabs.tabText(index)
+        if index != -1 and not modified and tab_name.startswith("•"):
+            self.tabs.setTabText(index, tab_name[1:])
+            self.update_title()
+            self.update_file_status()
+
+    def on_undo_lost_track(self, editor: QPlainTextEdit) -> None:
+        """Tell the user the undo history had to be cleared."""
+        if editor is self.get_current_editor():
+            self.statusBar.showMessage(
+                "Undo history cleared after an edit it could not follow",
+                5000,
+            )
+
+    def invalidate_counts(self, editor: QPlainTextEdit) -> None:
+        """Drop the editor's cached counts after its text changes."""
+        editor.cached_counts = None
+
+    def tab_editor(self, widget: QWidget) -> Optional[QPlainTextEdit]:
+        """Get the editor shown by a tab, whether or not it is split."""
+        if isinstance(widget, QSplitter):
+            widget = widget.widget(0)
+        return widget if isinstance(widget, QPlainTextEdit) else None
+
+    def tab_index(self, widget: QWidget) -> int:
+        """Get the index of the tab showing an editor or viewer, or -1."""
+        for index in range(self.tabs.count()):
+            tab = self.tabs.widget(index)
+            if tab is widget or self.tab_editor(tab) is widget:
+                return index
+        return -1
+
     def get_current_editor(self) -> Optional[QPlainTextEdit]:
         """Get the currently active editor widget."""
-        return self.tabs.currentWidget()
+        return self.tab_editor(self.tabs.currentWidget())
+
+    def get_current_view(self) -> Optional[QPlainTextEdit]:
+        """Get the split view of the current editor that was last used."""
+        editor = self.get_current_editor()
+        return editor.undo_history.view if editor else None
+
+    def editors(self) -> List[QPlainTextEdit]:
+        """Get the editor widgets of all open text tabs."""
+        editors = map(
+            self.tab_editor, map(self.tabs.widget, range(self.tabs.count()))
+        )
+        return [editor for editor in editors if editor is not None]
+
+    def register_document(self, widget: QWidget) -> None:
+        """Remember which tab holds the file at a path.
+
+        A tab already holding the path keeps it, so a read-only copy
+        opened alongside an editable tab never takes its place.
+        """
+        if widget.file_path and self.find_document(widget.file_path) is None:
+            self.documents[canonical_path(widget.file_path)] = widget
+
+    def forget_document(self, widget: QWidget) -> None:
+        if widget.file_path:
+            key = canonical_path(widget.file_path)
+            if self.documents.get(key) is widget:
+                del self.documents[key]
+
+    def find_document(self, file_path: str) -> Optional[QWidget]:
+        """Get the editor or viewer already showing a file, if any."""
+        widget = self.documents.get(canonical_path(file_path))
+        if widget is not None and self.tab_index(widget) == -1:
+            return None
+        return widget
+
+    def split_view(self, orientation: Qt.Orientation) -> None:
+        """Add a view of the current document in a split pane.
+
+        The view shares the editor's QTextDocument and undo history, so
+        edits show up in every pane at once without copying the text.
+        """
+        editor = self.get_current_editor()
+        if not editor:
+            return
+        index = self.tabs.currentIndex()
+        splitter = self.tabs.widget(index)
+        if splitter is editor:
+            text = self.tabs.tabText(index)
+            self.tabs.blockSignals(True)
+            self.tabs.removeTab(index)
+            splitter = QSplitter(orientation)
+            splitter.addWidget(editor)
+            self.tabs.insertTab(index, splitter, text)
+            self.tabs.setCurrentIndex(index)
+            self.tabs.blockSignals(False)
+        splitter.setOrientation(orientation)
+
+        view = QPlainTextEdit()
+        view.setDocument(editor.document())
+        view.setReadOnly(editor.isReadOnly())
+        view.setLineWrapMode(editor.lineWrapMode())
+        view.setTextCursor(editor.undo_history.view.textCursor())
+        view.dragEnterEvent = partial(self.editor_dragEnterEvent, view)
+        view.dropEvent = partial(self.editor_dropEvent, view)
+        view.insertFromMimeData = partial(
+            self.editor_insertFromMimeData, editor, view
+        )
+        view.keyPressEvent = partial(self.editor_keyPressEvent, editor, view)
+        view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        view.customContextMenuRequested.connect(
+            partial(self.show_editor_context_menu, view)
+        )
+        if self.spell_check_enabled:
+            self.spell_checker.attach(view)
+        editor.split_views.append(view)
+        editor.undo_history.add_view(view)
+        splitter.addWidget(view)
+        splitter.setSizes([1] * splitter.count())
+        view.setFocus()
+        view.centerCursor()
+
+    def close_split_view(self) -> None:
+        """Close the split pane in use, or the last one added."""
+        editor = self.get_current_editor()
+        if not editor or not editor.split_views:
+            return
+        view = editor.undo_history.view
+        if view not in editor.split_views:
+            view = editor.split_views[-1]
+        editor.split_views.remove(view)
+        editor.undo_history.remove_view(view)
+        self.spell_checker.detach(view)
+        view.setParent(None)
+        view.deleteLater()
+        if not editor.split_views:
+            index = self.tab_index(editor)
+            splitter = self.tabs.widget(index)
+            text = self.tabs.tabText(index)
+            self.tabs.blockSignals(True)
+            self.tabs.removeTab(index)
+            self.tabs.insertTab(index, editor, text)
+            self.tabs.setCurrentIndex(index)
+            self.tabs.blockSignals(False)
+            splitter.deleteLater()
+        editor.undo_history.view.setFocus()
 
     def on_tab_changed(self) -> None:
         """Handle tab change events."""
+        editor = self.get_current_editor()
+        if editor and editor.pending_display_settings:
+            self.apply_pending_display_settings(editor)
+        if editor and self.spell_check_enabled:
+            self.spell_checker.schedule()
         self.update_title()
         self.update_file_status()
         self.update_counts()
         self.update_menu_state()
 
     def add_recent_file(self, file_path: str) -> None:
-        """Add a file to the recent files list."""
-        if file_path in self.recent_files:
-            self.recent_files.remove(file_path)
-        self.recent_files.insert(0, file_path)
-        self.recent_files = self.recent_files[: self.max_recent_files]
-        self.settings["recent_files"] = self.recent_files
-        self.save_settings()
+        """Record an open of the file and update its frecency rank."""
+        self.add_recent_files([file_path])
+
+    def add_recent_files(self, file_paths: List[str]) -> None:
+        """Record opens of several files in one transaction."""
+        now = time.time()
+        conn = sqlite3.connect(self.settings_file)
+        conn.create_function("logaddexp", 2, logaddexp, deterministic=True)
+        cursor = conn.cursor()
+        cursor.executemany(
+            """
+            INSERT INTO recent_files
+                (path, open_count, last_opened, frecency, file_exists)
+            VALUES (?, 1, ?, ?, 1)
+            ON CONFLICT (path) DO UPDATE SET
+                open_count = open_count + 1,
+                last_opened = excluded.last_opened,
+                frecency = logaddexp(frecency, excluded.frecency),
+                file_exists = 1
+        """,
+            [
+                (file_path, now, frecency_boost(now))
+                for file_path in file_paths
+            ],
+        )
+        cursor.execute(
+            """
+            DELETE FROM recent_files WHERE pinned = 0 AND path NOT IN (
+                SELECT path FROM recent_files WHERE pinned = 0
+                ORDER BY frecency DESC LIMIT ?
+            )
+        """,
+            (RECENT_FILES_LIMIT,),
+        )
+        conn.commit()
+        conn.close()
+        self.load_recent_files()
         self.update_recent_files_menu()
 
     def update_recent_files_menu(self) -> None:
-        """Update the recent files menu."""
-        self.recent_menu.clear()
-
-        recent_action = next(
-            (
-                action
-                for action in self.file_menu.actions()
-                if action.menu() == self.recent_menu
-            ),
-            None,
+        """Update the recent files menu in place."""
+        show_recent = self.max_recent_files > 0
+        self.recent_menu_action.setVisible(show_recent)
+        paths = (
+            self.recent_files[: self.max_recent_files] if show_recent else []
         )
 
-        if self.max_recent_files == 0:
-
-            if recent_action:
-                self.file_menu.removeAction(recent_action)
-            self.recent_menu_action.setMenu(None)
-        else:
-
-            self.recent_menu_action.setMenu(self.recent_menu)
-            if self.recent_files:
-                for file_path in self.recent_files[: self.max_recent_files]:
-                    action = self.create_action(
-                        os.path.basename(file_path),
-                        lambda file_path=file_path: self.open_file(file_path),
-                    )
-                    self.recent_menu.addAction(action)
-            else:
-                action = self.create_action("(none)", lambda: None)
-                action.setEnabled(False)
-                self.recent_menu.addAction(action)
-
-            if recent_action:
-                self.file_menu.removeAction(recent_action)
-            self.file_menu.insertMenu(
-                self.file_menu.actions()[2], self.recent_menu
-            )
-
+        for file_path in list(self.recent_file_actions):
+            if file_path not in paths:
+                action = self.recent_file_actions.pop(file_path)
+                self.recent_menu.removeAction(action)
+                action.deleteLater()
+
+        for index, file_path in enumerate(paths):
+            action = self.recent_file_actions.get(file_path)
+            if action is None:
+                action = self.create_action(
+                    os.path.basename(file_path) or file_path,
+                    partial(self.open_recent_file, file_path),
+                )
+                action.setToolTip(file_path)
+                self.recent_file_actions[file_path] = action
+            menu_actions = self.recent_menu.actions()
+            if menu_actions[index] is not action:
+                self.recent_menu.insertAction(menu_actions[index], action)
+            action.setEnabled(self.recent_files_exist.get(file_path, True))
+
+        self.recent_none_action.setVisible(not paths)
         self.update_menu_state()
 
     def set_max_recent_files(self, value: int) -> None:
-        """Set the maximum number of recent files to remember."""
+        """Set the maximum number of recent files to show."""
         self.max_recent_files = max(0, min(int(value), 10))
         self.settings["max_recent_files"] = str(self.max_recent_files)
-        if self.max_recent_files > 0:
-            self.recent_files = self.recent_files[: self.max_recent_files]
-        else:
-            self.recent_files = []
-        self.settings["recent_files"] = ",".join(self.recent_files)
         self.save_settings()
+        self.load_recent_files()
         self.update_recent_files_menu()
 
         for action in self.recent_files_action_group.actions():
@@ -864,16 +7839,26 @@ class Notepad(QMainWindow):
         """Update the word and character count labels."""
         editor = self.get_current_editor()
         if editor:
-            text = editor.toPlainText()
-            word_count = len(text.split())
-            char_count = len(text)
+            if editor.compressed_loader is not None:
+                return
+            if editor.cached_counts is None:
+                text = editor.toPlainText()
+                editor.cached_counts = (
+                    len(text.split()),
+                    len(text),
+                    editor.blockCount(),
+                )
+            word_count, char_count, line_count = editor.cached_counts
             self.word_count_label.setText(f"Words: {word_count}")
             self.char_count_label.setText(f"Characters: {char_count}")
+            self.line_count_label.setText(f"Lines: {line_count}")
             self.word_count_label.show()
             self.char_count_label.show()
+            self.line_count_label.show()
         else:
             self.word_count_label.hide()
             self.char_count_label.hide()
+            self.line_count_label.hide()
 
     def update_file_status(self) -> None:
         """Update the file status label with the current file status."""
@@ -886,6 +7871,17 @@ class Notepad(QMainWindow):
             else:
                 status = "Saved"
             self.file_status_label.setText(f"Status: {status}")
+        elif isinstance(self.tabs.currentWidget(), LargeFileEditor):
+            viewer = self.tabs.currentWidget()
+            if viewer.is_read_only():
+                status = "Read-Only"
+            elif viewer.is_modified():
+                status = "Modified"
+            else:
+                status = "Saved"
+            self.file_status_label.setText(f"Status: {status}")
+        elif self.tabs.currentWidget():
+            self.file_status_label.setText("Status: Read-Only")
         else:
             self.file_status_label.setText("Status: No File")
 
@@ -897,71 +7893,426 @@ class Notepad(QMainWindow):
     def dropEvent(self, event: QDropEvent) -> None:
         """Handle drop events for the main window."""
         urls = event.mimeData().urls()
-        for url in urls:
-            file_path = url.toLocalFile()
-            if os.path.isfile(file_path):
-                self.open_file(file_path)
+        self.open_files(
+            [
+                url.toLocalFile()
+                for url in urls
+                if os.path.isfile(url.toLocalFile())
+            ]
+        )
 
-    def editor_dragEnterEvent(self, event: QDragEnterEvent) -> None:
+    def editor_dragEnterEvent(
+        self, editor: QPlainTextEdit, event: QDragEnterEvent
+    ) -> None:
         """Handle drag enter events for the editor."""
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
+        else:
+            QPlainTextEdit.dragEnterEvent(editor, event)
 
-    def editor_dropEvent(self, event: QDropEvent) -> None:
+    def editor_dropEvent(
+        self, editor: QPlainTextEdit, event: QDropEvent
+    ) -> None:
         """Handle drop events for the editor."""
+        if not event.mimeData().hasUrls():
+            QPlainTextEdit.dropEvent(editor, event)
+            return
         urls = event.mimeData().urls()
-        for url in urls:
-            file_path = url.toLocalFile()
-            if os.path.isfile(file_path):
-                self.open_file(file_path)
+        self.open_files(
+            [
+                url.toLocalFile()
+                for url in urls
+                if os.path.isfile(url.toLocalFile())
+            ]
+        )
+
+    def editor_insertFromMimeData(
+        self, editor: QPlainTextEdit, view: QPlainTextEdit, source
+    ):
+        """Insert text pasted or dropped into a view, chunking large inserts."""
+        text = source.text() if source.hasText() else ""
+        if len(text) < LARGE_INSERT_THRESHOLD:
+            QPlainTextEdit.insertFromMimeData(view, source)
+            return
+        editor.undo_history.view = view
+        self.insert_text(editor, text)
+
+    def insert_text(self, editor: QPlainTextEdit, text: str) -> None:
+        """Replace the selection of the editor's view in use with text."""
+        if len(text) < LARGE_INSERT_THRESHOLD:
+            editor.undo_history.capture()
+            editor.undo_history.view.textCursor().insertText(text)
+            return
+        chunked_insert = ChunkedInsert(editor, text, self)
+        chunked_insert.finished.connect(
+            partial(self.on_chunked_insert_finished, editor)
+        )
+        editor.chunked_insert = chunked_insert
+        chunked_insert.start()
+
+    def on_chunked_insert_finished(
+        self, editor: QPlainTextEdit, completed: bool
+    ) -> None:
+        """Refresh counters, status and title once a large insert ends."""
+        editor.chunked_insert.deleteLater()
+        editor.chunked_insert = None
+        self.invalidate_counts(editor)
+        self.on_modification_changed(editor, editor.document().isModified())
+        self.text_changed()
+        if not completed:
+            self.statusBar.showMessage("Insert cancelled", 2000)
 
     def undo(self) -> None:
         """Undo the last action in the current editor."""
         editor = self.get_current_editor()
         if editor:
-            editor.undo()
+            editor.undo_history.undo()
 
     def redo(self) -> None:
         """Redo the last undone action in the current editor."""
         editor = self.get_current_editor()
         if editor:
-            editor.redo()
+            editor.undo_history.redo()
+
+    def set_undo_memory_limit(self, megabytes: int) -> None:
+        """Set the per-tab undo history memory budget."""
+        self.undo_memory_mb = megabytes
+        self.settings["undo_memory_mb"] = str(megabytes)
+        self.save_settings()
+        self.apply_undo_limits()
+
+    def set_undo_max_steps(self, steps: int) -> None:
+        """Set the maximum number of undo steps kept per tab."""
+        self.undo_max_steps = steps
+        self.settings["undo_max_steps"] = str(steps)
+        self.save_settings()
+        self.apply_undo_limits()
+
+    def toggle_undo_spill_to_disk(self) -> None:
+        """Toggle spilling old undo steps to disk instead of dropping them."""
+        self.undo_spill_to_disk = not self.undo_spill_to_disk
+        self.settings["undo_spill_to_disk"] = str(self.undo_spill_to_disk)
+        self.save_settings()
+        self.apply_undo_limits()
+
+    def toggle_history(self) -> None:
+        """Toggle recording a history revision on every save."""
+        self.history_enabled = not self.history_enabled
+        self.settings["history_enabled"] = str(self.history_enabled)
+        self.save_settings()
+
+    def set_history_keep_days(self, days: int) -> None:
+        """Set how many days history revisions are kept."""
+        self.history_keep_days = days
+        self.settings["history_keep_days"] = str(days)
+        self.save_settings()
+        self.collect_history()
+
+    def set_history_max_revisions(self, revisions: int) -> None:
+        """Set how many history revisions are kept per file."""
+        self.history_max_revisions = revisions
+        self.settings["history_max_revisions"] = str(revisions)
+        self.save_settings()
+        self.collect_history()
+
+    def record_history(
+        self, file_path: str, data: bytes, encoding: str
+    ) -> None:
+        """Record a revision of a saved file in the background."""
+        if not self.history_enabled:
+            return
+        recorder = HistoryRecorder(self.history, file_path, data, encoding)
+        recorder.signals.finished.connect(self.on_history_recorded)
+        recorder.signals.failed.connect(self.on_history_failed)
+        self.history_pool.start(recorder)
+
+    def on_history_recorded(self, recorded: bool) -> None:
+        if recorded:
+            self.history_records += 1
+            if self.history_records >= HISTORY_GC_INTERVAL:
+                self.collect_history()
+
+    def collect_history(self) -> None:
+        """Apply the history retention limits in the background."""
+        self.history_records = 0
+        collector = HistoryCollector(
+            self.history, self.history_keep_days, self.history_max_revisions
+        )
+        collector.signals.finished.connect(self.on_history_collected)
+        collector.signals.failed.connect(self.on_history_failed)
+        self.history_pool.start(collector)
+
+    def on_history_collected(self, result: Tuple[int, int]) -> None:
+        revisions, chunks = result
+        logging.debug(
+            f"History cleanup removed {revisions} revision(s)"
+            f" and {chunks} chunk(s)"
+        )
+
+    def on_history_failed(self, message: str) -> None:
+        logging.warning(f"Local history failed: {message}")
+
+    def show_history(self) -> None:
+        """Show the saved revisions of the current file."""
+        editor = self.get_current_editor()
+        if editor is None or not editor.file_path:
+            return
+        self.statusBar.showMessage("Loading local history...")
+        reader = HistoryReader(self.history, editor.file_path)
+        reader.signals.finished.connect(partial(self.on_history_read, editor))
+        reader.signals.failed.connect(self.on_history_read_failed)
+        self.history_pool.start(reader)
+
+    def on_history_read(self, editor: QPlainTextEdit, revisions: List) -> None:
+        """Open the history dialog once the revision list has loaded."""
+        self.statusBar.clearMessage()
+        if self.tab_index(editor) == -1:
+            return
+        dialog = HistoryDialog(self, editor, revisions)
+        dialog.exec()
+
+    def on_history_read_failed(self, message: str) -> None:
+        self.statusBar.clearMessage()
+        QMessageBox.warning(
+            self, "Local History", f"Could not read the history:\n{message}"
+        )
+
+    def apply_undo_limits(self) -> None:
+        """Apply the undo history limits to every open tab."""
+        for editor in self.editors():
+            editor.undo_history.set_limits(
+                self.undo_memory_mb * 1024 * 1024,
+                self.undo_max_steps,
+                self.undo_spill_to_disk,
+            )
+        self.update_menu_state()
+
+    def show_undo_memory(self) -> None:
+        """Show the undo history memory used by each tab."""
+        lines = []
+        for editor in self.editors():
+            index = self.tab_index(editor)
+            usage = editor.undo_history.usage()
+            lines.append(
+                f"{self.tabs.tabText(index)}: "
+                f"{usage['memory'] / 1024:.1f} KB in {usage['steps']} steps, "
+                f"{usage['spilled_bytes'] / 1024:.1f} KB spilled in "
+                f"{usage['spilled_steps']} steps"
+            )
+            logging.debug(lines[-1])
+        QMessageBox.information(
+            self, "Undo Memory", "\n".join(lines) or "No open tabs."
+        )
 
     def update_menu_state(self):
         """Update the state of menu items based on the current context."""
         editor = self.get_current_editor()
         has_tabs = self.tabs.count() > 0
+        has_editor = editor is not None
 
+        widget = self.tabs.currentWidget()
         self.save_action.setEnabled(
-            has_tabs and editor and editor.document().isModified()
+            has_editor
+            and editor.document().isModified()
+            or isinstance(widget, LargeFileEditor)
+            and widget.is_modified()
+        )
+        self.save_as_action.setEnabled(has_editor)
+        self.save_all_action.setEnabled(has_tabs)
+        self.history_action.setEnabled(
+            has_editor and editor.file_path is not None
         )
-        self.save_as_action.setEnabled(has_tabs)
         self.close_tab_action.setEnabled(has_tabs)
         self.close_all_action.setEnabled(has_tabs)
 
-        has_selection = (
-            editor and editor.textCursor().hasSelection()
-            if has_tabs
-            else False
-        )
+        has_selection = has_editor and editor.textCursor().hasSelection()
         self.edit_menu.actions()[0].setEnabled(
-            has_tabs and editor and editor.document().isUndoAvailable()
+            has_editor and editor.undo_history.can_undo()
         )
         self.edit_menu.actions()[1].setEnabled(
-            has_tabs and editor and editor.document().isRedoAvailable()
+            has_editor and editor.undo_history.can_redo()
         )
         self.edit_menu.actions()[3].setEnabled(has_selection)
         self.edit_menu.actions()[4].setEnabled(has_selection)
-        self.edit_menu.actions()[5].setEnabled(has_tabs)
+        self.edit_menu.actions()[5].setEnabled(has_editor)
         self.edit_menu.actions()[6].setEnabled(
-            has_tabs and editor and not editor.document().isEmpty()
+            has_editor and not editor.document().isEmpty()
         )
-        self.edit_menu.actions()[8].setEnabled(has_tabs)
-        self.edit_menu.actions()[9].setEnabled(has_tabs)
+        self.edit_menu.actions()[8].setEnabled(has_editor)
+        self.edit_menu.actions()[9].setEnabled(has_editor)
+
+        self.recent_menu_action.setEnabled(self.max_recent_files > 0)
+
+    def show_statistics(self) -> None:
+        """Show the statistics panel and compute stats for the current tab."""
+        if self.statistics_panel is None:
+            self.statistics_panel = StatisticsPanel(self)
+            self.addDockWidget(
+                Qt.DockWidgetArea.RightDockWidgetArea, self.statistics_panel
+            )
+        self.statistics_panel.show()
+        self.statistics_panel.compute_current_tab()
+
+    def toggle_table_view(self) -> None:
+        """Switch the current tab between its text and a table view."""
+        widget = self.tabs.currentWidget()
+        if isinstance(widget, TableViewer):
+            editor = widget.source_editor
+            if self.tab_index(editor) != -1:
+                self.tabs.setCurrentIndex(self.tab_index(editor))
+            elif widget.file_path and not widget.temp_path:
+                self.open_file(widget.file_path)
+            return
+        editor = self.get_current_editor()
+        if not editor:
+            return
+        for index in range(self.tabs.count()):
+            viewer = self.tabs.widget(index)
+            if (
+                isinstance(viewer, TableViewer)
+                and viewer.source_editor is editor
+            ):
+                if viewer.temp_path and editor.document().isModified():
+                    self.close_tab(index)
+                    break
+                self.tabs.setCurrentWidget(viewer)
+                return
+        self.open_table_view(editor)
+
+    def open_table_view(self, editor: QPlainTextEdit) -> None:
+        """Open a table view of an editor's file, or of its unsaved text."""
+        file_path = editor.file_path
+        encoding = editor.file_metadata.get("encoding", "utf-8")
+        temp_path = None
+        if (
+            not file_path
+            or editor.document().isModified()
+            or "compression" in editor.file_metadata
+            or codecs.lookup(encoding).name not in ASCII_COMPATIBLE_ENCODINGS
+            or not os.path.isfile(file_path)
+        ):
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", suffix=".txt", delete=False
+            ) as temp_file:
+                temp_file.write(editor.toPlainText())
+            temp_path = temp_file.name
+            encoding = "utf-8"
+        name = self.tabs.tabText(self.tab_index(editor)).lstrip("•")
+        try:
+            viewer = TableViewer(
+                file_path or name, encoding, editor, temp_path
+            )
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Could not open table:\n{e}")
+            return
+        self.tabs.addTab(viewer, f"{name} (Table)")
+        self.tabs.setCurrentWidget(viewer)
+
+    def show_line_operations(self, operation: str) -> None:
+        """Ask for line operation options and run them on the current tab."""
+        editor = self.get_current_editor()
+        if not editor:
+            return
+        dialog = LineOperationsDialog(self, operation)
+        if dialog.exec():
+            self.run_line_operation(editor, dialog.options())
 
-        self.recent_menu_action.setEnabled(
-            bool(self.recent_files) and self.max_recent_files > 0
+    def run_line_operation(self, editor: QPlainTextEdit, options: Dict):
+        """Run a line operation on the editor's selection or whole text.
+
+        The range to replace is held by a cursor on the document, which
+        follows any edits made while the operation runs.
+        """
+        cursor = QTextCursor(editor.undo_history.view.textCursor())
+        if cursor.hasSelection():
+            text = selected_plain_text(cursor)
+            source = ("text", text)
+            trailing_newline = text.endswith("\n")
+        else:
+            document = editor.document()
+            trailing_newline = (
+                document.blockCount() > 1 and not document.lastBlock().text()
+            )
+            if (
+                editor.file_path
+                and not document.isModified()
+                and "compression" not in editor.file_metadata
+                and os.path.isfile(editor.file_path)
+            ):
+                source = (
+                    "file",
+                    editor.file_path,
+                    editor.file_metadata.get("encoding", "utf-8"),
+                )
+            else:
+                source = ("text", editor.toPlainText())
+            cursor.select(QTextCursor.SelectionType.Document)
+
+        worker = LineOperationWorker(source, options)
+        progress = QProgressDialog("Processing lines...", "Cancel", 0, 0, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(300)
+        progress.canceled.connect(lambda: setattr(worker, "cancelled", True))
+        worker.signals.finished.connect(
+            partial(
+                self.on_line_operation_finished,
+                editor,
+                cursor,
+                options,
+                trailing_newline,
+                progress,
+            )
         )
+        worker.signals.failed.connect(
+            partial(self.on_line_operation_failed, progress)
+        )
+        self.line_operation_worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def on_line_operation_finished(
+        self,
+        editor: QPlainTextEdit,
+        cursor: QTextCursor,
+        options: Dict,
+        trailing_newline: bool,
+        progress: QProgressDialog,
+        output_path: str,
+        count: int,
+    ) -> None:
+        """Put the result of a line operation into the editor or a new tab."""
+        self.line_operation_worker = None
+        progress.close()
+        with open(output_path, "r", encoding="utf-8", newline="\n") as file:
+            text = file.read()
+        os.remove(output_path)
+        if text and not trailing_newline:
+            text = text[:-1]
+        if options["output"] == "new_tab":
+            new_editor = self.create_editor(text)
+            self.tabs.addTab(new_editor, "Untitled")
+            self.tabs.setCurrentWidget(new_editor)
+            self.update_title()
+            self.update_menu_state()
+            self.update_counts()
+        elif self.tab_index(editor) == -1:
+            self.statusBar.showMessage(
+                "Line operation discarded, its tab was closed", 2000
+            )
+            return
+        else:
+            editor.undo_history.view.setTextCursor(cursor)
+            self.insert_text(editor, text)
+        self.statusBar.showMessage(f"{count} line(s)", 2000)
+
+    def on_line_operation_failed(
+        self, progress: QProgressDialog, message: str
+    ) -> None:
+        self.line_operation_worker = None
+        progress.close()
+        if message:
+            QMessageBox.warning(self, "Line Operations", message)
+        else:
+            self.statusBar.showMessage("Line operation cancelled", 2000)
 
     def show_about(self) -> None:
         """Show the About dialog."""
@@ -984,6 +8335,7 @@ def resource_path(relative_path):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     parser = argparse.ArgumentParser(description="CNB Notepad")
     parser.add_argument(
         "--enabledebug", action="store_true", help="Enable debug mode"